@@ -0,0 +1,248 @@
+"""Listas de vigilância mantidas a cada escrita: estoque baixo e mais vendidos
+
+Para saber o que repor, era preciso listar o catálogo inteiro e procurar os
+estoques baixos de olho. Aqui duas listas ficam sempre em ordem e são
+atualizadas pelos avisos de registro salvo/removido da LivrariaAPI (venda
+criada, alterada ou cancelada, livro alterado), sem recontar nada:
+
+- livros com estoque no limite de reposição ou abaixo dele (um limite geral
+  e, se quiser, um por categoria), do menor estoque ao maior;
+- livros por unidades vendidas nos últimos `dias` dias. A janela anda
+  sozinha: ao virar o dia, só as vendas do dia que saiu dela são descontadas.
+
+Os k primeiros de cada lista saem em O(k). A carga inicial percorre o
+catálogo e as vendas da janela uma vez; escritas de outros clientes entram
+pelos avisos da réplica, quando houver, ou ao carregar de novo.
+
+Com um caminho, as listas ficam gravadas entre uma execução e outra junto
+com a versão da réplica em que foram salvas: se a réplica não mudou desde
+então, basta sincronizá-la para as mudanças chegarem pelos avisos, sem
+recarregar nada (é o que o `watch` da linha de comando faz).
+"""
+import json
+import os
+import threading
+from datetime import datetime, timedelta
+
+from indice import ListaOrdenada
+
+ARQUIVO_ALERTAS = ".livraria_alertas.json"
+LIMITE_ESTOQUE = 5  # repor quando o estoque chega a 5 unidades ou menos
+DIAS = 30           # janela dos mais vendidos (None: desde sempre)
+
+
+def _chave(livro_id):
+    # O db.json mistura livro_id numérico e texto ("1" e 1 são o mesmo livro)
+    return str(livro_id)
+
+
+class ListasVigiadas:
+    """Livros com estoque baixo e ranking de unidades vendidas, em ordem a cada escrita"""
+    
+    def __init__(self, limite=LIMITE_ESTOQUE, limites=None, dias=DIAS, caminho=None):
+        self.limite = limite
+        self.limites = dict(limites or {})  # categoria -> limite próprio
+        self.dias = dias
+        self.caminho = caminho
+        self._trava = threading.RLock()
+        self._zerar()
+        if caminho and os.path.exists(caminho):
+            self._carregar()
+    
+    def _zerar(self):
+        self.livros = {}                # id -> título, categoria e estoque
+        self.baixo = ListaOrdenada()    # (estoque, id) dos livros no limite de reposição
+        self.unidades = {}              # id -> unidades vendidas na janela
+        self.ranking = ListaOrdenada()  # (-unidades, id): o mais vendido primeiro
+        self.por_dia = {}               # dia -> {id: unidades}, para descontar o dia que sai
+        self.titulos = {}               # id -> título copiado na venda (livros já removidos)
+        self.inicio = ""                # primeiro dia da janela
+        self.versao_replica = None      # versão da réplica quando as listas foram gravadas
+        self.carregado = False
+    
+    # ==================== PERSISTÊNCIA ====================
+    
+    def _carregar(self):
+        with open(self.caminho, encoding="utf-8") as f:
+            dados = json.load(f)
+        if dados["dias"] != self.dias:
+            return  # outra janela: as unidades gravadas não servem
+        self.livros = dados["livros"]
+        self.unidades = dados["unidades"]
+        self.por_dia = dados["por_dia"]
+        self.titulos = dados["titulos"]
+        self.inicio = dados["inicio"]
+        self.versao_replica = dados["versao_replica"]
+        # O limite pode ter mudado desde a gravação: a lista de estoque baixo é refeita com o atual
+        self.baixo = self._lista_baixo()
+        self.ranking = ListaOrdenada((-u, i) for i, u in self.unidades.items() if u > 0)
+        self.carregado = True
+    
+    def salvar(self, api):
+        """Gravar as listas no arquivo local, com a versão atual da réplica da API"""
+        if not self.caminho or not self.carregado or api.replica is None:
+            return  # sem réplica, nada diria o que mudou no servidor até a próxima execução
+        with self._trava:
+            dados = {
+                "dias": self.dias,
+                "livros": self.livros,
+                "unidades": self.unidades,
+                "por_dia": self.por_dia,
+                "titulos": self.titulos,
+                "inicio": self.inicio,
+                "versao_replica": api.replica.versao,
+            }
+            temporario = self.caminho + ".tmp"
+            with open(temporario, "w", encoding="utf-8") as f:
+                json.dump(dados, f, ensure_ascii=False)
+            os.replace(temporario, self.caminho)
+    
+    # ==================== CONSTRUÇÃO ====================
+    
+    def carregar(self, api):
+        """Montar as duas listas a partir do catálogo e das vendas da janela"""
+        with self._trava:
+            self._zerar()
+            self._avancar()
+            for livro in api.iterar_livros(fluxo=True):
+                self._guardar_livro(_chave(livro['id']), livro)
+            # Pela réplica as vendas já estão na memória; do servidor, só as da janela
+            params = {"data_gte": self.inicio} if self.inicio and api.replica is None else None
+            for venda in api._consultar_fluxo("/vendas", params):
+                self._somar(venda)  # confere a janela: o servidor pode ignorar o filtro
+            # Listas ordenadas montadas de uma vez, com um único sort
+            self.baixo = self._lista_baixo()
+            self.ranking = ListaOrdenada((-u, i) for i, u in self.unidades.items() if u > 0)
+            self.carregado = True
+    
+    def preparar(self, api):
+        """Carregar na primeira consulta, a menos que as listas gravadas ainda valham
+        
+        As gravadas valem se a réplica está na mesma versão de quando foram salvas;
+        se ela mudou sem as listas verem (outro comando sincronizou ou escreveu),
+        tudo é carregado de novo.
+        """
+        with self._trava:
+            if self.versao_replica is not None:
+                if api.replica is None or api.replica.versao != self.versao_replica:
+                    self._zerar()
+                self.versao_replica = None  # daqui em diante, os avisos mantêm as listas
+            if not self.carregado:
+                self.carregar(api)
+    
+    def definir_limite(self, limite, categoria=None):
+        """Trocar o limite geral (ou o de uma categoria) e refazer a lista de estoque baixo"""
+        with self._trava:
+            if categoria is None:
+                self.limite = limite
+            else:
+                self.limites[categoria] = limite
+            if self.carregado:
+                self.baixo = self._lista_baixo()
+    
+    def limite_de(self, livro):
+        return self.limites.get(livro.get('categoria'), self.limite)
+    
+    def _em_falta(self, livro):
+        estoque = livro.get('estoque')
+        return estoque is not None and estoque <= self.limite_de(livro)
+    
+    def _lista_baixo(self):
+        return ListaOrdenada((l['estoque'], i) for i, l in self.livros.items() if self._em_falta(l))
+    
+    # ==================== ATUALIZAÇÃO ====================
+    
+    def _guardar_livro(self, livro_id, livro):
+        """Trocar (ou, com livro None, remover) o livro, mudando só a sua posição na lista"""
+        anterior = self.livros.pop(livro_id, None)
+        if self.carregado and anterior is not None and self._em_falta(anterior):
+            self.baixo.remover((anterior['estoque'], livro_id))
+        if livro is None:
+            return
+        livro = {campo: livro.get(campo) for campo in ("titulo", "categoria", "estoque")}
+        self.livros[livro_id] = livro
+        if self.carregado and self._em_falta(livro):
+            self.baixo.adicionar((livro['estoque'], livro_id))
+    
+    def _mudar_unidades(self, livro_id, delta):
+        atual = self.unidades.get(livro_id, 0)
+        novo = atual + delta
+        if novo:
+            self.unidades[livro_id] = novo
+        else:
+            self.unidades.pop(livro_id, None)
+        if self.carregado:  # na carga, o ranking é montado de uma vez no final
+            if atual > 0:
+                self.ranking.remover((-atual, livro_id))
+            if novo > 0:
+                self.ranking.adicionar((-novo, livro_id))
+    
+    def _somar(self, venda, sinal=1):
+        """Somar (ou subtrair, com sinal -1) as unidades da venda, se ela cai na janela"""
+        dia = venda['data'][:10]
+        if dia < self.inicio:
+            return
+        livro_id = _chave(venda['livro_id'])
+        quantidade = venda['quantidade'] * sinal
+        do_dia = self.por_dia.setdefault(dia, {})
+        do_dia[livro_id] = do_dia.get(livro_id, 0) + quantidade
+        if sinal > 0:
+            self.titulos[livro_id] = venda['titulo_livro']
+        self._mudar_unidades(livro_id, quantidade)
+    
+    def _avancar(self, hoje=None):
+        """Mover a janela até hoje, descontando os dias que ficaram para trás"""
+        if self.dias is None:
+            return
+        inicio = ((hoje or datetime.now()) - timedelta(days=self.dias - 1)).strftime("%Y-%m-%d")
+        if inicio <= self.inicio:
+            return
+        self.inicio = inicio
+        for dia in [dia for dia in self.por_dia if dia < inicio]:
+            for livro_id, quantidade in self.por_dia.pop(dia).items():
+                self._mudar_unidades(livro_id, -quantidade)
+    
+    # ==================== AVISOS DA LIVRARIAAPI ====================
+    
+    def registro_salvo(self, colecao, registro, anterior=None):
+        if not self.carregado:
+            return
+        with self._trava:
+            if colecao == "livros":
+                self._guardar_livro(_chave(registro['id']), registro)
+            elif colecao == "vendas":
+                self._avancar()
+                if anterior is not None:
+                    self._somar(anterior, -1)
+                self._somar(registro)
+    
+    def registro_removido(self, colecao, item_id, anterior=None):
+        if not self.carregado:
+            return
+        with self._trava:
+            if colecao == "livros":
+                self._guardar_livro(_chave(item_id), None)
+            elif colecao == "vendas" and anterior is not None:
+                self._avancar()
+                self._somar(anterior, -1)
+    
+    # ==================== CONSULTAS ====================
+    
+    def estoque_baixo(self, k=None):
+        """Até k livros no limite de reposição, do menor estoque ao maior"""
+        with self._trava:
+            return [{"livro_id": livro_id, "titulo": self.livros[livro_id]['titulo'],
+                     "categoria": self.livros[livro_id]['categoria'], "estoque": estoque,
+                     "limite": self.limite_de(self.livros[livro_id])}
+                    for estoque, livro_id in self.baixo.primeiros(k)]
+    
+    def mais_vendidos(self, k=10, hoje=None):
+        """Até k livros por unidades vendidas na janela, do mais vendido ao menos"""
+        with self._trava:
+            self._avancar(hoje)
+            return [{"livro_id": livro_id, "titulo": self._titulo(livro_id), "unidades": -unidades}
+                    for unidades, livro_id in self.ranking.primeiros(k)]
+    
+    def _titulo(self, livro_id):
+        livro = self.livros.get(livro_id)
+        return livro['titulo'] if livro is not None else self.titulos.get(livro_id, livro_id)
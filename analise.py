@@ -0,0 +1,234 @@
+"""Agregados de vendas mantidos de forma incremental, para gráficos e relatórios
+
+Em vez de baixar todas as vendas a cada gráfico, os totais ficam guardados
+(por livro, categoria, dia e mês) e são atualizados só com o que mudou:
+vendas novas são buscadas a partir de uma marca de data, e as escritas da
+própria LivrariaAPI (e, com réplica, as dos outros clientes) chegam pelos
+avisos de registro salvo/removido.
+"""
+import json
+import os
+import threading
+from collections import Counter, defaultdict
+from datetime import datetime, timedelta
+
+from juncao import por_titulo
+
+ARQUIVO_ANALISE = ".livraria_analise.json"
+SEM_CATEGORIA = "Sem categoria"
+
+
+def _chave(livro_id):
+    # O db.json mistura livro_id numérico e texto ("1" e 1 são o mesmo livro)
+    return str(livro_id)
+
+
+class AgregadosVendas:
+    """Totais de vendas por livro, categoria, dia e mês, atualizados por diferença"""
+    
+    def __init__(self, caminho=ARQUIVO_ANALISE):
+        self.caminho = caminho
+        self._trava = threading.RLock()
+        self._zerar()
+        if caminho and os.path.exists(caminho):
+            self._carregar()
+    
+    def _zerar(self):
+        self.marca = ""            # data da venda mais recente já somada
+        self.ids_na_marca = set()  # vendas somadas com data igual à marca
+        self.pendentes = set()     # vendas somadas pelo aviso, ainda acima da marca
+        self.por_livro = defaultdict(lambda: [0.0, 0])  # livro_id -> [total, quantidade]
+        self.titulos = {}
+        self.por_categoria = Counter()
+        self.por_dia = Counter()
+        self.por_mes = Counter()
+        self.por_dia_livro = defaultdict(Counter)  # dia -> {livro_id: total}
+        self.categorias = {}       # livro_id -> categoria (catálogo)
+        self.contagem_categorias = Counter()
+        self.catalogo_carregado = False
+    
+    # ==================== PERSISTÊNCIA ====================
+    
+    def _carregar(self):
+        with open(self.caminho, encoding="utf-8") as f:
+            dados = json.load(f)
+        self.marca = dados["marca"]
+        self.ids_na_marca = set(dados["ids_na_marca"])
+        self.pendentes = set(dados["pendentes"])
+        self.por_livro.update({k: list(v) for k, v in dados["por_livro"].items()})
+        self.titulos = dados["titulos"]
+        self.por_categoria.update(dados["por_categoria"])
+        self.por_dia.update(dados["por_dia"])
+        self.por_mes.update(dados["por_mes"])
+        for dia, totais in dados["por_dia_livro"].items():
+            self.por_dia_livro[dia].update(totais)
+        self.categorias = dados["categorias"]
+        self.contagem_categorias.update(dados["contagem_categorias"])
+        self.catalogo_carregado = dados["catalogo_carregado"]
+    
+    def salvar(self):
+        """Gravar os agregados no arquivo local"""
+        if not self.caminho:
+            return
+        with self._trava:
+            dados = {
+                "marca": self.marca,
+                "ids_na_marca": sorted(self.ids_na_marca),
+                "pendentes": sorted(self.pendentes),
+                "por_livro": self.por_livro,
+                "titulos": self.titulos,
+                "por_categoria": self.por_categoria,
+                "por_dia": self.por_dia,
+                "por_mes": self.por_mes,
+                "por_dia_livro": self.por_dia_livro,
+                "categorias": self.categorias,
+                "contagem_categorias": self.contagem_categorias,
+                "catalogo_carregado": self.catalogo_carregado,
+            }
+            temporario = self.caminho + ".tmp"
+            with open(temporario, "w", encoding="utf-8") as f:
+                json.dump(dados, f, ensure_ascii=False)
+            os.replace(temporario, self.caminho)
+    
+    # ==================== ATUALIZAÇÃO ====================
+    
+    def _somar(self, venda, sinal=1):
+        """Somar (ou subtrair, com sinal -1) a venda em todos os agrupamentos"""
+        livro_id = _chave(venda['livro_id'])
+        total = venda['total'] * sinal
+        dia = venda['data'][:10]
+        categoria = self.categorias.get(livro_id, SEM_CATEGORIA)
+        
+        acumulado = self.por_livro[livro_id]
+        acumulado[0] += total
+        acumulado[1] += venda['quantidade'] * sinal
+        self.titulos[livro_id] = venda['titulo_livro']
+        self.por_categoria[categoria] += total
+        self.por_dia[dia] += total
+        self.por_mes[dia[:7]] += total
+        self.por_dia_livro[dia][livro_id] += total
+    
+    def _ja_somada(self, venda):
+        data = venda['data']
+        if venda['id'] in self.pendentes:
+            return True
+        return data < self.marca or (data == self.marca and venda['id'] in self.ids_na_marca)
+    
+    def atualizar(self, api):
+        """Somar as vendas novas desde a marca; retorna quantas entraram"""
+        with self._trava:
+            if not self.catalogo_carregado:
+                self.carregar_catalogo(api)
+            
+            # Com réplica, as vendas vêm dela: a sincronização avisa as novas antes de
+            # elas serem lidas aqui, e ficam pendentes em vez de somadas duas vezes
+            params = {"data_gte": self.marca} if self.marca and api.replica is None else None
+            status, vendas = api._consultar("/vendas", params)
+            if status != 200:
+                from livraria import ErroAPI
+                raise ErroAPI(status)
+            
+            # Conferência local: o servidor pode ignorar o filtro data_gte
+            novas = [v for v in vendas if v['data'] >= self.marca and not self._ja_somada(v)]
+            for venda in novas:
+                self._somar(venda)
+            if novas:
+                marca = max(v['data'] for v in novas)
+                if marca > self.marca:
+                    self.marca, self.ids_na_marca = marca, set()
+                self.ids_na_marca.update(v['id'] for v in novas if v['data'] == self.marca)
+            
+            # Vendas avisadas que já ficaram para trás da marca não precisam mais de registro
+            for venda_id, data in list(self._datas_pendentes(vendas)):
+                if data < self.marca:
+                    self.pendentes.discard(venda_id)
+                elif data == self.marca:
+                    self.pendentes.discard(venda_id)
+                    self.ids_na_marca.add(venda_id)
+            self.salvar()
+            return len(novas)
+    
+    def _datas_pendentes(self, vendas):
+        for venda in vendas:
+            if venda['id'] in self.pendentes:
+                yield venda['id'], venda['data']
+    
+    def carregar_catalogo(self, api):
+        """Montar categoria por livro e a contagem por categoria a partir de /livros"""
+        with self._trava:
+            self.categorias = {}
+            self.contagem_categorias = Counter()
+            for livro in api.iterar_livros():
+                self.categorias[_chave(livro['id'])] = livro['categoria']
+                self.contagem_categorias[livro['categoria']] += 1
+            self.catalogo_carregado = True
+    
+    def reconstruir(self, api):
+        """Descartar tudo e somar de novo (útil se outro sistema apagou vendas)"""
+        with self._trava:
+            self._zerar()
+            return self.atualizar(api)
+    
+    # ==================== AVISOS DA LIVRARIAAPI ====================
+    
+    def registro_salvo(self, colecao, registro, anterior=None):
+        with self._trava:
+            if colecao == "livros":
+                livro_id = _chave(registro['id'])
+                nova = registro.get('categoria')
+                antiga = self.categorias.get(livro_id)
+                if nova != antiga:
+                    if antiga is not None:
+                        self.contagem_categorias[antiga] -= 1
+                        if self.contagem_categorias[antiga] <= 0:
+                            del self.contagem_categorias[antiga]
+                    self.contagem_categorias[nova] += 1
+                    self.categorias[livro_id] = nova
+                if 'titulo' in registro and livro_id in self.titulos:
+                    self.titulos[livro_id] = registro['titulo']  # gráfico mostra o título atual
+            elif colecao == "vendas":
+                if anterior is not None and self._ja_somada(anterior):
+                    self._somar(anterior, -1)
+                self._somar(registro)
+                if registro['data'] >= self.marca and registro['id'] not in self.ids_na_marca:
+                    self.pendentes.add(registro['id'])
+    
+    def registro_removido(self, colecao, item_id, anterior=None):
+        with self._trava:
+            if colecao == "livros":
+                categoria = self.categorias.pop(_chave(item_id), None)
+                if categoria is not None:
+                    self.contagem_categorias[categoria] -= 1
+                    if self.contagem_categorias[categoria] <= 0:
+                        del self.contagem_categorias[categoria]
+            elif colecao == "vendas" and anterior is not None:
+                if self._ja_somada(anterior):
+                    self._somar(anterior, -1)
+                self.pendentes.discard(anterior['id'])
+                self.ids_na_marca.discard(anterior['id'])
+    
+    # ==================== CONSULTAS ====================
+    
+    def atualizar_titulos(self, livros):
+        """Trocar os títulos copiados nas vendas pelos atuais ({livro_id: livro})"""
+        with self._trava:
+            for livro_id, livro in livros.items():
+                if livro_id in self.titulos:
+                    self.titulos[livro_id] = livro['titulo']
+    
+    def totais_por_titulo(self):
+        """Total vendido por título, como no gráfico de vendas por livro"""
+        return por_titulo({livro_id: (self.titulos.get(livro_id, livro_id), total)
+                           for livro_id, (total, _) in self.por_livro.items() if total > 0})
+    
+    def mais_vendidos(self, dias=30, n=10, hoje=None):
+        """Top N livros por valor vendido nos últimos dias: [(livro_id, titulo, total)]"""
+        hoje = hoje or datetime.now()
+        totais = Counter()
+        # Percorre só os dias da janela: custo proporcional aos grupos, não às vendas
+        for i in range(dias):
+            dia = (hoje - timedelta(days=i)).strftime("%Y-%m-%d")
+            if dia in self.por_dia_livro:
+                totais.update(self.por_dia_livro[dia])
+        return [(livro_id, self.titulos.get(livro_id, livro_id), total)
+                for livro_id, total in totais.most_common(n) if total > 0]
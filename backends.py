@@ -0,0 +1,497 @@
+"""Backends de armazenamento da LivrariaAPI
+
+A LivrariaAPI fala o dialeto REST do json-server (/livros, /vendas, filtros
+campo_like/_lte/_gte, _sort, _page/_limit, ETag e If-Match). Um backend é
+qualquer objeto com requisicao(metodo, caminho, params=, json=, headers=,
+stream=) que devolva uma resposta com status_code, headers, json() e
+iter_content() (lida aos pedaços quando stream=True):
+
+- BackendJsonServer: o json-server via HTTP, com pool de conexões
+- BackendSQLite: banco embutido, com índices e transações de verdade
+
+Migração do db.json:
+    python backends.py migrar db.json livraria.sqlite
+"""
+import hashlib
+import json
+import os
+import re
+import secrets
+import sqlite3
+import sys
+import threading
+from contextlib import contextmanager, nullcontext
+
+from fluxo import PEDACO
+
+# Configuração padrão do pool de conexões HTTP
+POOL_CONEXOES = 10
+TIMEOUT = (3.05, 10)  # (conexão, leitura) em segundos
+TENTATIVAS = 3
+BACKOFF = 0.3  # espera entre tentativas: 0.3s, 0.6s, 1.2s...
+
+COLECOES = ("livros", "vendas", "remocoes")  # remocoes: registros apagados, para a réplica
+
+# Campos copiados do JSON para colunas próprias (filtros e ordenação sem reler o JSON)
+COLUNAS = {
+    "livros": ["titulo", "autor", "categoria", "preco", "estoque", "atualizado_em"],
+    "vendas": ["livro_id", "data", "atualizado_em"],
+    "remocoes": ["atualizado_em"],
+}
+# Colunas com índice
+INDICES = {
+    "livros": ["autor", "categoria", "preco", "atualizado_em"],
+    "vendas": ["livro_id", "data", "atualizado_em"],
+    "remocoes": ["atualizado_em"],
+}
+
+ARQUIVO_SQLITE = "livraria.sqlite"
+
+
+class ServidorIndisponivel(ConnectionError):
+    """O servidor não responde (ou o disjuntor do modo offline está aberto)
+    
+    Com enviada, o erro veio depois de a requisição sair (resposta perdida,
+    timeout de leitura): uma escrita pode ter chegado ao servidor.
+    """
+    
+    def __init__(self, *args, enviada=False):
+        super().__init__(*args)
+        self.enviada = enviada
+
+
+# ==================== JSON-SERVER (HTTP) ====================
+
+def criar_sessao(pool=POOL_CONEXOES, tentativas=TENTATIVAS, backoff=BACKOFF):
+    """Criar sessão HTTP com conexões keep-alive reaproveitadas e retry"""
+    import requests
+    from requests.adapters import HTTPAdapter
+    from urllib3.util.retry import Retry
+    
+    # Só repete erros de conexão: a requisição não chegou ao servidor,
+    # então é seguro tentar de novo mesmo para POST/PUT/DELETE
+    retry = Retry(total=tentativas, connect=tentativas, read=0, redirect=0,
+                  status=0, other=0, backoff_factor=backoff)
+    adaptador = HTTPAdapter(pool_connections=1, pool_maxsize=pool, max_retries=retry)
+    sessao = requests.Session()
+    sessao.mount("http://", adaptador)
+    sessao.mount("https://", adaptador)
+    return sessao
+
+
+class BackendJsonServer:
+    """json-server acessado por HTTP, com uma sessão de conexões keep-alive"""
+    
+    def __init__(self, base_url, pool=POOL_CONEXOES, timeout=TIMEOUT,
+                 tentativas=TENTATIVAS, backoff=BACKOFF, sessao=None):
+        self.base_url = base_url
+        self.timeout = timeout
+        self._opcoes = (pool, tentativas, backoff)
+        self._sessao = sessao
+        self._trava = threading.Lock()
+    
+    @property
+    def sessao(self):
+        """Sessão HTTP, criada só na primeira requisição (importar o requests leva ~0,2s)"""
+        if self._sessao is None:
+            with self._trava:
+                if self._sessao is None:
+                    self._sessao = criar_sessao(*self._opcoes)
+        return self._sessao
+    
+    def requisicao(self, metodo, caminho, **kwargs):
+        """Enviar requisição reaproveitando as conexões da sessão"""
+        kwargs.setdefault("timeout", self.timeout)
+        return self.sessao.request(metodo, f"{self.base_url}{caminho}", **kwargs)
+    
+    @staticmethod
+    def antes_de_enviar(erro):
+        """Se o erro foi ao conectar, antes de a requisição sair (o servidor nada recebeu)"""
+        from requests.exceptions import ConnectionError as ErroConexao, ConnectTimeout
+        from urllib3.exceptions import ConnectTimeoutError, MaxRetryError, NewConnectionError
+        
+        if isinstance(erro, ConnectTimeout):
+            return True
+        motivo = erro.args[0] if isinstance(erro, ErroConexao) and erro.args else None
+        if isinstance(motivo, MaxRetryError):
+            motivo = motivo.reason
+        return isinstance(motivo, (NewConnectionError, ConnectTimeoutError))
+    
+    def fechar(self):
+        if self._sessao is not None:
+            self._sessao.close()
+
+
+# ==================== SQLITE ====================
+
+class Resposta:
+    """Resposta no formato do requests, para o BackendSQLite"""
+    
+    def __init__(self, status_code, texto=None, headers=None):
+        self.status_code = status_code
+        self.headers = headers or {}
+        self.text = texto if texto is not None else ""
+        self.content = self.text.encode("utf-8")
+    
+    def json(self):
+        return json.loads(self.text)
+    
+    def iter_content(self, chunk_size=PEDACO):
+        for inicio in range(0, len(self.content), chunk_size):
+            yield self.content[inicio:inicio + chunk_size]
+    
+    def close(self):
+        pass
+
+
+class RespostaFluxo(Resposta):
+    """Lista lida do cursor só quando consumida, para requisições com stream=True"""
+    
+    def __init__(self, linhas, conexao):
+        super().__init__(200)
+        self._linhas = linhas
+        self._conexao = conexao
+    
+    def iter_content(self, chunk_size=PEDACO):
+        partes, tamanho = ["["], 1
+        for posicao, (texto,) in enumerate(self._linhas):
+            if posicao:
+                partes.append(",")
+            partes.append(texto)
+            tamanho += len(texto) + 1
+            if tamanho >= chunk_size:
+                yield "".join(partes).encode("utf-8")
+                partes, tamanho = [], 0
+        partes.append("]")
+        yield "".join(partes).encode("utf-8")
+        self.close()
+    
+    def json(self):
+        return json.loads(b"".join(self.iter_content()))
+    
+    def close(self):
+        self._conexao.close()
+
+
+def _etag(texto):
+    return 'W/"%s"' % hashlib.md5(texto.encode("utf-8")).hexdigest()
+
+
+def _regexp(padrao, valor):
+    # Mesmo comportamento do campo_like do json-server: regex sem diferenciar maiúsculas
+    return valor is not None and re.search(padrao, str(valor), re.IGNORECASE) is not None
+
+
+def _literal_ascii(padrao):
+    """Texto do padrão quando ele é só um literal escapado (re.escape) em ASCII"""
+    literal = re.sub(r"\\(.)", r"\1", padrao)
+    if literal.isascii() and re.escape(literal) == padrao:
+        return literal
+    return None
+
+
+def _expressao(colecao, campo):
+    """Coluna do campo, ou leitura direto do JSON para os demais"""
+    if not re.fullmatch(r"[A-Za-z_][A-Za-z0-9_]*", campo):
+        raise ValueError(f"campo inválido: {campo}")
+    if campo == "id" or campo in COLUNAS[colecao]:
+        return campo
+    return f"json_extract(dados, '$.{campo}')"
+
+
+def _valor(texto):
+    """Valores da query chegam como texto; números são comparados como números"""
+    try:
+        return float(texto)
+    except (TypeError, ValueError):
+        return texto
+
+
+def _montar_consulta(colecao, params):
+    """Traduzir os parâmetros do json-server para SQL"""
+    condicoes, argumentos = [], []
+    consulta = {k: (v if isinstance(v, (list, tuple)) else [v]) for k, v in (params or {}).items()}
+    for chave, valores in consulta.items():
+        if chave.startswith("_"):
+            continue
+        campo, _, operador = chave.rpartition("_")
+        if operador == "like" and campo:
+            padrao = str(valores[-1])
+            literal = _literal_ascii(padrao)
+            if literal is not None:
+                # LIKE do SQLite já ignora maiúsculas em ASCII e roda sem chamar o Python
+                literal = re.sub(r"([\\%_])", r"\\\1", literal)
+                condicoes.append(f"{_expressao(colecao, campo)} LIKE ? ESCAPE '\\'")
+                argumentos.append(f"%{literal}%")
+            else:
+                condicoes.append(f"{_expressao(colecao, campo)} REGEXP ?")
+                argumentos.append(padrao)
+        elif operador in ("lte", "gte", "ne") and campo:
+            sinal = {"lte": "<=", "gte": ">=", "ne": "!="}[operador]
+            # Com busca de texto todas as linhas são lidas de qualquer forma: o "+"
+            # tira o índice da faixa, e a leitura sequencial evita saltos pela tabela
+            prefixo = "+" if any(k.endswith("_like") for k in consulta) else ""
+            condicoes.append(f"{prefixo}{_expressao(colecao, campo)} {sinal} ?")
+            argumentos.append(_valor(valores[-1]))
+        else:
+            # Igualdade do json-server compara como texto ("1" casa com 1); a lista
+            # leva as duas formas para que o índice da expressão seja usado
+            alternativas = set()
+            for valor in valores:
+                alternativas.update({str(valor), _valor(valor)})
+            marcadores = ", ".join("?" * len(alternativas))
+            condicoes.append(f"{_expressao(colecao, chave)} IN ({marcadores})")
+            argumentos.extend(alternativas)
+    
+    sql = f"SELECT dados FROM {colecao}"
+    if condicoes:
+        sql += " WHERE " + " AND ".join(condicoes)
+    if "_sort" in consulta:
+        ordem = "DESC" if str(consulta.get("_order", ["asc"])[-1]).lower() == "desc" else "ASC"
+        sql += f" ORDER BY {_expressao(colecao, consulta['_sort'][-1])} {ordem}"
+    else:
+        sql += " ORDER BY rowid"
+    if "_page" in consulta or "_limit" in consulta:
+        limite = int(consulta.get("_limit", [10])[-1])
+        pagina = int(consulta.get("_page", [1])[-1])
+        sql += " LIMIT ? OFFSET ?"
+        argumentos.extend([limite, (pagina - 1) * limite])
+    return sql, argumentos
+
+
+class BackendSQLite:
+    """Armazenamento embutido em SQLite, com índices e transações
+    
+    Cada registro fica como JSON numa coluna; os campos de filtro e ordenação
+    são colunas geradas a partir dele, com índice. Campos novos no JSON não
+    exigem migração.
+    """
+    
+    def __init__(self, caminho=ARQUIVO_SQLITE):
+        self.caminho = caminho
+        self._memoria = caminho == ":memory:"
+        # Em memória, as conexões das várias threads precisam do mesmo banco compartilhado
+        self._alvo = f"file:livraria-{id(self)}?mode=memory&cache=shared" if self._memoria else caminho
+        self._local = threading.local()
+        self._conexoes = []
+        self._trava = threading.Lock()
+        # O cache compartilhado em memória trava tabelas sem esperar (busy_timeout não vale);
+        # nesse modo o acesso é serializado aqui
+        self._trava_memoria = threading.RLock() if self._memoria else nullcontext()
+        self._criar_esquema()
+    
+    def _abrir(self):
+        conexao = sqlite3.connect(self._alvo, uri=self._memoria, timeout=30,
+                                  isolation_level=None, check_same_thread=False)
+        if not self._memoria:
+            conexao.execute("PRAGMA journal_mode=WAL")
+            conexao.execute("PRAGMA synchronous=NORMAL")
+        conexao.create_function("regexp", 2, _regexp, deterministic=True)
+        return conexao
+    
+    def _conexao(self):
+        conexao = getattr(self._local, "conexao", None)
+        if conexao is None:
+            conexao = self._abrir()
+            self._local.conexao = conexao
+            with self._trava:
+                self._conexoes.append(conexao)
+        return conexao
+    
+    def _criar_esquema(self):
+        conexao = self._conexao()
+        for colecao in COLECOES:
+            colunas = "".join(f", {campo} GENERATED ALWAYS AS (json_extract(dados, '$.{campo}')) STORED"
+                              for campo in COLUNAS[colecao])
+            conexao.execute(f"CREATE TABLE IF NOT EXISTS {colecao} "
+                            f"(id TEXT PRIMARY KEY, dados TEXT NOT NULL{colunas})")
+            # Bancos criados por versões anteriores: colunas novas entram como VIRTUAL
+            # (o SQLite não acrescenta coluna STORED a uma tabela existente)
+            existentes = {linha[1] for linha in conexao.execute(f"PRAGMA table_xinfo({colecao})")}
+            for campo in COLUNAS[colecao]:
+                if campo not in existentes:
+                    conexao.execute(f"ALTER TABLE {colecao} ADD COLUMN {campo} GENERATED ALWAYS AS "
+                                    f"(json_extract(dados, '$.{campo}')) VIRTUAL")
+            for campo in INDICES[colecao]:
+                conexao.execute(f"CREATE INDEX IF NOT EXISTS {colecao}_{campo} ON {colecao}({campo})")
+    
+    @contextmanager
+    def _transacao(self):
+        """BEGIN IMMEDIATE: a escrita fica com o banco desde a leitura"""
+        conexao = self._conexao()
+        with self._trava_memoria:
+            conexao.execute("BEGIN IMMEDIATE")
+            try:
+                yield conexao
+            except BaseException:
+                conexao.execute("ROLLBACK")
+                raise
+            conexao.execute("COMMIT")
+    
+    def fechar(self):
+        with self._trava:
+            for conexao in self._conexoes:
+                conexao.close()
+            self._conexoes.clear()
+        self._local = threading.local()
+    
+    # ==================== DIALETO REST ====================
+    
+    def requisicao(self, metodo, caminho, params=None, json=None, headers=None, stream=False, **_):
+        """Atender a requisição como o json-server atenderia"""
+        partes = [p for p in caminho.split("?")[0].split("/") if p]
+        if not partes or partes[0] not in COLECOES or len(partes) > 2:
+            return Resposta(404, "{}")
+        colecao, item_id = partes[0], (partes[1] if len(partes) == 2 else None)
+        headers = headers or {}
+        
+        try:
+            if metodo == "GET":
+                return self._ler(colecao, item_id, params, headers, stream)
+            if metodo == "POST" and item_id is None:
+                return self._criar(colecao, json or {})
+            if metodo in ("PUT", "PATCH") and item_id is not None:
+                return self._alterar(colecao, item_id, json or {}, metodo == "PATCH", headers)
+            if metodo == "DELETE" and item_id is not None:
+                return self._remover(colecao, item_id, headers)
+        except ValueError:
+            return Resposta(400, "{}")
+        return Resposta(404, "{}")
+    
+    def _ler(self, colecao, item_id, params, headers, fluxo=False):
+        if fluxo and item_id is None and not self._memoria:
+            # Conexão própria: as linhas saem do cursor conforme a resposta é lida,
+            # sem montar o texto da lista inteira (e sem ETag, que dependeria dele)
+            sql, argumentos = _montar_consulta(colecao, params)
+            conexao = self._abrir()
+            try:
+                return RespostaFluxo(conexao.execute(sql, argumentos), conexao)
+            except Exception:
+                conexao.close()
+                raise
+        conexao = self._conexao()
+        with self._trava_memoria:
+            if item_id is not None:
+                linha = conexao.execute(f"SELECT dados FROM {colecao} WHERE id = ?",
+                                        (item_id,)).fetchone()
+                if linha is None:
+                    return Resposta(404, "{}")
+                texto = linha[0]
+            else:
+                sql, argumentos = _montar_consulta(colecao, params)
+                texto = "[" + ",".join(l[0] for l in conexao.execute(sql, argumentos)) + "]"
+        etag = _etag(texto)
+        if headers.get("If-None-Match") == etag:
+            return Resposta(304, "", {"ETag": etag})
+        return Resposta(200, texto, {"ETag": etag})
+    
+    def _criar(self, colecao, registro):
+        registro = dict(registro)
+        registro["id"] = str(registro.get("id") or secrets.token_hex(4))
+        texto = json.dumps(registro, ensure_ascii=False)
+        try:
+            with self._transacao() as conexao:
+                conexao.execute(f"INSERT INTO {colecao} (id, dados) VALUES (?, ?)", (registro["id"], texto))
+        except sqlite3.IntegrityError:
+            return Resposta(409, "{}")
+        return Resposta(201, texto, {"ETag": _etag(texto)})
+    
+    def _alterar(self, colecao, item_id, dados, parcial, headers):
+        with self._transacao() as conexao:
+            linha = conexao.execute(f"SELECT dados FROM {colecao} WHERE id = ?", (item_id,)).fetchone()
+            if linha is None:
+                return Resposta(404, "{}")
+            # If-Match: só altera se o registro ainda é o que o cliente leu
+            if "If-Match" in headers and headers["If-Match"] != _etag(linha[0]):
+                return Resposta(412, "{}")
+            registro = dict(json.loads(linha[0]), **dados) if parcial else dict(dados)
+            registro["id"] = item_id
+            texto = json.dumps(registro, ensure_ascii=False)
+            conexao.execute(f"UPDATE {colecao} SET dados = ? WHERE id = ?", (texto, item_id))
+        return Resposta(200, texto, {"ETag": _etag(texto)})
+    
+    def _remover(self, colecao, item_id, headers):
+        with self._transacao() as conexao:
+            linha = conexao.execute(f"SELECT dados FROM {colecao} WHERE id = ?", (item_id,)).fetchone()
+            if linha is None:
+                return Resposta(404, "{}")
+            if "If-Match" in headers and headers["If-Match"] != _etag(linha[0]):
+                return Resposta(412, "{}")
+            conexao.execute(f"DELETE FROM {colecao} WHERE id = ?", (item_id,))
+        return Resposta(200, linha[0])
+    
+    # ==================== TRANSAÇÕES ====================
+    
+    def registrar_venda(self, livro_id, quantidade, cliente, data=None):
+        """Conferir estoque, gravar a venda e baixar o estoque numa só transação
+        
+        Retorna (venda, livro_antes, livro_depois).
+        """
+        from livraria import EstoqueInsuficiente, RegistroNaoEncontrado, carimbo, nova_venda
+        
+        with self._transacao() as conexao:
+            linha = conexao.execute("SELECT dados FROM livros WHERE id = ?", (str(livro_id),)).fetchone()
+            if linha is None:
+                raise RegistroNaoEncontrado()
+            livro = json.loads(linha[0])
+            if livro['estoque'] < quantidade:
+                raise EstoqueInsuficiente(livro['estoque'])
+            
+            venda = nova_venda(livro_id, livro, quantidade, cliente, data)
+            venda["id"] = secrets.token_hex(4)
+            venda["atualizado_em"] = carimbo()
+            conexao.execute("INSERT INTO vendas (id, dados) VALUES (?, ?)",
+                            (venda["id"], json.dumps(venda, ensure_ascii=False)))
+            novo = dict(livro, estoque=livro['estoque'] - quantidade,
+                        versao=livro.get('versao', 0) + 1, atualizado_em=venda["atualizado_em"])
+            conexao.execute("UPDATE livros SET dados = ? WHERE id = ?",
+                            (json.dumps(novo, ensure_ascii=False), livro["id"]))
+        return venda, livro, novo
+    
+    # ==================== MIGRAÇÃO ====================
+    
+    def importar_db(self, db):
+        """Gravar as coleções de um dict no formato do db.json; retorna as quantidades"""
+        quantidades = {}
+        with self._transacao() as conexao:
+            for colecao in COLECOES:
+                registros = db.get(colecao, [])
+                conexao.executemany(
+                    f"INSERT OR REPLACE INTO {colecao} (id, dados) VALUES (?, ?)",
+                    ((str(r["id"]), json.dumps(dict(r, id=str(r["id"])), ensure_ascii=False))
+                     for r in registros))
+                quantidades[colecao] = len(registros)
+        # Estatísticas dos índices para o planejador de consultas
+        self._conexao().execute("ANALYZE")
+        return quantidades
+
+
+def migrar_db_json(origem="db.json", destino=ARQUIVO_SQLITE):
+    """Copiar livros e vendas do db.json do json-server para o SQLite"""
+    with open(origem, encoding="utf-8") as f:
+        db = json.load(f)
+    backend = BackendSQLite(destino)
+    try:
+        return backend.importar_db(db)
+    finally:
+        backend.fechar()
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if not argv or argv[0] != "migrar":
+        print("Uso: python backends.py migrar [db.json] [livraria.sqlite]")
+        return 2
+    origem = argv[1] if len(argv) > 1 else "db.json"
+    destino = argv[2] if len(argv) > 2 else ARQUIVO_SQLITE
+    if not os.path.exists(origem):
+        print(f"✗ Arquivo {origem} não encontrado.")
+        return 1
+    quantidades = migrar_db_json(origem, destino)
+    print(f"✓ {quantidades['livros']} livro(s) e {quantidades['vendas']} venda(s) "
+          f"migrados para {destino}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,99 @@
+"""Benchmark: estoque baixo e mais vendidos recontados x listas mantidas a cada escrita
+
+Recontar é o que o operador faz hoje: baixar o catálogo (ou as vendas)
+inteiro a cada consulta, filtrar e ordenar. As ListasVigiadas (alertas.py)
+são carregadas uma vez e depois só respondem os k primeiros; mede-se também
+o custo que cada escrita passa a ter, o aviso de venda e de livro alterado.
+Confere que as duas formas dão o mesmo resultado.
+
+Uso: python -m benchmarks.bench_alertas [livros] [vendas] [k]
+"""
+import argparse
+import random
+import statistics
+import sys
+import time
+
+from alertas import ListasVigiadas
+from livraria import LivrariaAPI
+from benchmarks.gerador import gerar_db
+from benchmarks.servidor_fake import ServidorFake
+
+LIMITE = 5
+REPETICOES = 5
+
+
+def recontar_estoque(api, k):
+    livros = [l for l in api.iterar_livros(fluxo=True) if l['estoque'] <= LIMITE]
+    livros.sort(key=lambda l: (l['estoque'], str(l['id'])))
+    return [(l['estoque'], str(l['id'])) for l in livros[:k]]
+
+
+def recontar_vendidos(api, k):
+    unidades = {}
+    for venda in api.iterar_vendas(fluxo=True):
+        livro_id = str(venda['livro_id'])
+        unidades[livro_id] = unidades.get(livro_id, 0) + venda['quantidade']
+    return sorted((-u, i) for i, u in unidades.items() if u > 0)[:k]
+
+
+def cronometrar(funcao, repeticoes=REPETICOES):
+    """Mediana (ms) e o último resultado"""
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        resultado = funcao()
+        tempos.append((time.perf_counter() - inicio) * 1000)
+    return statistics.median(tempos), resultado
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.bench_alertas",
+                                     description=__doc__.splitlines()[0])
+    parser.add_argument("livros", type=int, nargs="?", default=20000)
+    parser.add_argument("vendas", type=int, nargs="?", default=200000)
+    parser.add_argument("k", type=int, nargs="?", default=20, help="tamanho das listas")
+    args = parser.parse_args(argv)
+    qtd_livros, qtd_vendas, k = args.livros, args.vendas, args.k
+    
+    db = gerar_db(qtd_livros, qtd_vendas)
+    with ServidorFake(db) as servidor:
+        api = LivrariaAPI(base_url=servidor.url, cache_ttl=0)  # cada recontagem baixa tudo
+        alertas = ListasVigiadas(LIMITE, dias=None)
+        carga, _ = cronometrar(lambda: alertas.carregar(api), 1)
+        
+        print(f"{qtd_livros} livros, {qtd_vendas} vendas, top {k}; carga inicial das listas: "
+              f"{carga:.0f} ms\n")
+        print(f"{'Consulta':<36} {'Recontando (ms)':>16} {'Lista (ms)':>12} {'Ganho':>10}  Iguais")
+        ok = True
+        for nome, recontar, consultar in [
+            ("estoque baixo", lambda: recontar_estoque(api, k),
+             lambda: [(l['estoque'], l['livro_id']) for l in alertas.estoque_baixo(k)]),
+            ("mais vendidos em unidades", lambda: recontar_vendidos(api, k),
+             lambda: [(-l['unidades'], l['livro_id']) for l in alertas.mais_vendidos(k)]),
+        ]:
+            lento, esperado = cronometrar(recontar)
+            rapido, resultado = cronometrar(consultar, 1000)
+            iguais = resultado == esperado
+            ok &= iguais
+            print(f"{nome:<36} {lento:>16.1f} {rapido:>12.4f} {lento / rapido:>9.0f}x  "
+                  f"{'✓' if iguais else '✗ DIFERENTE'}")
+        api.fechar()
+    
+    # Custo por escrita: os avisos que a LivrariaAPI manda a cada venda e livro alterado
+    livros = [str(l['id']) for l in db['livros']]
+    venda = dict(db['vendas'][-1])
+    escritas = 20000
+    inicio = time.perf_counter()
+    for i in range(escritas):
+        livro_id = random.choice(livros)
+        alertas.registro_salvo("livros", {"id": livro_id, "titulo": "x", "categoria": "y",
+                                          "estoque": random.randint(0, 2 * LIMITE)})
+        alertas.registro_salvo("vendas", dict(venda, id=f"b{i}", livro_id=livro_id))
+    custo = (time.perf_counter() - inicio) / escritas * 1e6
+    print(f"\nAviso de venda + livro alterado: {custo:.1f} µs por escrita")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,71 @@
+"""Benchmark: gráfico de vendas com varredura completa x agregados incrementais
+
+Uso: python -m benchmarks.bench_analise [vendas]
+"""
+import argparse
+import contextlib
+import io
+import random
+import time
+from datetime import datetime, timedelta
+
+from analise import AgregadosVendas
+from livraria import LivrariaAPI
+from benchmarks.servidor_fake import ServidorFake
+
+
+def historico(quantidade, livros=500):
+    aleatorio = random.Random(3)
+    inicio = datetime(2020, 1, 1)
+    for i in range(quantidade):
+        livro_id = aleatorio.randint(1, livros)
+        qtd = aleatorio.randint(1, 3)
+        data = inicio + timedelta(minutes=5 * i)
+        yield {"id": str(i + 1), "livro_id": str(livro_id), "titulo_livro": f"Livro {livro_id}",
+               "quantidade": qtd, "preco_unitario": 20.0, "total": 20.0 * qtd,
+               "cliente": "Cliente", "data": data.strftime("%Y-%m-%d %H:%M:%S")}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.bench_analise",
+                                     description=__doc__.splitlines()[0])
+    parser.add_argument("vendas", type=int, nargs="?", default=100000)
+    args = parser.parse_args(argv)
+    quantidade = args.vendas
+    livros = [{"id": str(i), "titulo": f"Livro {i}", "autor": "Autor", "preco": 20.0,
+               "estoque": 10**6, "categoria": f"Categoria {i % 12}"} for i in range(1, 501)]
+    with ServidorFake({"livros": livros, "vendas": list(historico(quantidade))}) as servidor:
+        completo = LivrariaAPI(base_url=servidor.url, cache_ttl=0)
+        incremental = LivrariaAPI(base_url=servidor.url, cache_ttl=0,
+                                  analise=AgregadosVendas(caminho=None))
+        saida = io.StringIO()
+        with contextlib.redirect_stdout(saida):
+            inicio = time.perf_counter()
+            incremental.grafico_vendas_por_livro()
+            carga_inicial = time.perf_counter() - inicio
+            
+            # Algumas vendas novas entre um gráfico e outro
+            for _ in range(10):
+                completo.criar_venda("1", 1, "Novo")
+            
+            inicio = time.perf_counter()
+            completo.grafico_vendas_por_livro()
+            t_completo = time.perf_counter() - inicio
+            
+            inicio = time.perf_counter()
+            incremental.grafico_vendas_por_livro()
+            t_incremental = time.perf_counter() - inicio
+            
+            inicio = time.perf_counter()
+            top = incremental.analise.mais_vendidos(dias=30, n=10)
+            t_top = time.perf_counter() - inicio
+    
+    print(f"Histórico: {quantidade} vendas")
+    print(f"Carga inicial dos agregados:        {carga_inicial * 1000:9.1f} ms")
+    print(f"Gráfico com varredura completa:     {t_completo * 1000:9.1f} ms")
+    print(f"Gráfico com agregados (+10 vendas): {t_incremental * 1000:9.1f} ms")
+    print(f"Top 10 dos últimos 30 dias:         {t_top * 1000:9.3f} ms ({len(top)} livros)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""Benchmark: vazão da LivrariaAPI síncrona x AsyncLivrariaAPI
+
+Cada chamador faz buscas de livro e vendas; o síncrono usa uma thread por
+chamador, o assíncrono uma tarefa por chamador.
+Uso: python -m benchmarks.bench_async [operacoes_por_chamador] [latencia_ms]
+"""
+import argparse
+import asyncio
+import threading
+import time
+
+from cliente_async import AsyncLivrariaAPI
+from livraria import LivrariaAPI
+from benchmarks.servidor_fake import ServidorFake
+
+
+def sincrono(url, chamadores, operacoes):
+    api = LivrariaAPI(base_url=url, pool=chamadores, cache_ttl=0)
+    
+    def chamador():
+        for i in range(operacoes):
+            api.buscar_livro("1") if i % 2 else api.buscar_venda("1")
+    
+    threads = [threading.Thread(target=chamador) for _ in range(chamadores)]
+    inicio = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    duracao = time.perf_counter() - inicio
+    api.fechar()
+    return chamadores * operacoes / duracao
+
+
+async def assincrono(url, chamadores, operacoes):
+    async with AsyncLivrariaAPI(base_url=url, pool=chamadores, cache_ttl=0) as api:
+        async def chamador():
+            for i in range(operacoes):
+                await (api.buscar_livro("1") if i % 2 else api.buscar_venda("1"))
+        
+        inicio = time.perf_counter()
+        await asyncio.gather(*(chamador() for _ in range(chamadores)))
+        return chamadores * operacoes / (time.perf_counter() - inicio)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.bench_async",
+                                     description=__doc__.splitlines()[0])
+    parser.add_argument("operacoes_por_chamador", type=int, nargs="?", default=20)
+    parser.add_argument("latencia_ms", type=float, nargs="?", default=5.0,
+                        help="atraso somado a cada resposta do servidor")
+    args = parser.parse_args(argv)
+    operacoes = args.operacoes_por_chamador
+    latencia = args.latencia_ms / 1000
+    print(f"{'Chamadores':>10} {'Síncrono (op/s)':>17} {'Assíncrono (op/s)':>19}")
+    print("-" * 48)
+    for chamadores in (1, 10, 100):
+        with ServidorFake(latencia=latencia) as servidor:
+            # o servidor de teste aceita no máximo 5 conexões em espera por padrão
+            servidor.httpd.socket.listen(256)
+            taxa_sync = sincrono(servidor.url, chamadores, operacoes)
+            taxa_async = asyncio.run(assincrono(servidor.url, chamadores, operacoes))
+        print(f"{chamadores:>10} {taxa_sync:>17.0f} {taxa_async:>19.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""Benchmark: json-server (arquivo JSON em memória) x SQLite com índices
+
+Uso: python -m benchmarks.bench_backends [tamanhos...]
+     python -m benchmarks.bench_backends 10000 100000 1000000
+
+Acima de LIMITE_JSON_SERVER registros só o SQLite é medido: o stand-in do
+json-server percorre a lista inteira a cada consulta.
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+
+from backends import BackendSQLite
+from livraria import LivrariaAPI
+from benchmarks.servidor_fake import ServidorFake
+
+CATEGORIAS = ["Programação", "Ficção", "História", "Romance", "Ciência"]
+AUTORES = ["Robert C. Martin", "J.R.R. Tolkien", "Luciano Ramalho", "Yuval Noah Harari"]
+LIMITE_JSON_SERVER = 100000
+OPERACOES = 50
+
+
+def gerar_db(quantidade):
+    """Catálogo e vendas sintéticos, no formato do db.json"""
+    aleatorio = random.Random(42)
+    livros = [{"id": str(i), "titulo": f"Livro {i}", "autor": aleatorio.choice(AUTORES) + f" {i % 500}",
+               "preco": round(aleatorio.uniform(10, 200), 2), "estoque": 1000000,
+               "categoria": aleatorio.choice(CATEGORIAS), "versao": 1}
+              for i in range(1, quantidade + 1)]
+    vendas = [{"id": f"v{i}", "livro_id": str(aleatorio.randint(1, quantidade)),
+               "titulo_livro": "", "quantidade": 1, "preco_unitario": 10.0, "total": 10.0,
+               "cliente": "Cliente", "data": f"2024-{i % 12 + 1:02d}-{i % 28 + 1:02d} 10:00:00"}
+              for i in range(1, quantidade + 1)]
+    return {"livros": livros, "vendas": vendas}
+
+
+def medir(api, quantidade):
+    """Tempo médio (ms) de cada operação típica do menu"""
+    aleatorio = random.Random(7)
+    ids = [str(aleatorio.randint(1, quantidade)) for _ in range(OPERACOES)]
+    cenarios = {
+        "buscar livro por id": lambda i: api._consultar(f"/livros/{i}"),
+        "pesquisa autor+preço": lambda i: list(api.iterar_pesquisa_livros(
+            autor=f"Tolkien {int(i) % 500}", preco_max=100)),
+        "vendas de um livro": lambda i: api._consultar("/vendas", {"livro_id": i}),
+        "vendas do mês": lambda i: api._consultar("/vendas", {"data_gte": "2024-03-01",
+                                                              "data_lte": "2024-03-31 23:59:59"}),
+        "registrar venda": lambda i: api.registrar_venda(i, 1, "Bench"),
+    }
+    tempos = {}
+    for nome, operacao in cenarios.items():
+        repeticoes = ids[:5] if nome == "vendas do mês" else ids
+        inicio = time.perf_counter()
+        for livro_id in repeticoes:
+            operacao(livro_id)
+        tempos[nome] = (time.perf_counter() - inicio) * 1000 / len(repeticoes)
+    return tempos
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.bench_backends",
+                                     description=__doc__.splitlines()[0])
+    parser.add_argument("tamanhos", type=int, nargs="*", default=[10000, 100000],
+                        help="quantidades de livros a medir")
+    args = parser.parse_args(argv)
+    tamanhos = args.tamanhos
+    for quantidade in tamanhos:
+        db = gerar_db(quantidade)
+        resultados = {}
+        
+        with tempfile.TemporaryDirectory() as pasta:
+            backend = BackendSQLite(os.path.join(pasta, "bench.sqlite"))
+            inicio = time.perf_counter()
+            backend.importar_db(db)
+            carga = time.perf_counter() - inicio
+            with LivrariaAPI(backend=backend, cache_ttl=0) as api:
+                resultados["SQLite"] = medir(api, quantidade)
+        
+        if quantidade <= LIMITE_JSON_SERVER:
+            with ServidorFake(db) as servidor:
+                with LivrariaAPI(base_url=servidor.url, cache_ttl=0) as api:
+                    resultados["json-server"] = medir(api, quantidade)
+        
+        print(f"\n{quantidade} livros e {quantidade} vendas (carga no SQLite: {carga:.1f}s)")
+        print(f"{'Operação (ms)':<24}" + "".join(f"{nome:>14}" for nome in resultados))
+        for cenario in resultados["SQLite"]:
+            print(f"{cenario:<24}" + "".join(f"{r[cenario]:>14.2f}" for r in resultados.values()))
+
+
+if __name__ == "__main__":
+    main()
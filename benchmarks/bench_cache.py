@@ -0,0 +1,56 @@
+"""Benchmark: idas ao servidor economizadas pelo cache numa sessão de menu
+
+Uso: python -m benchmarks.bench_cache
+"""
+import contextlib
+import io
+import time
+
+from livraria import LivrariaAPI
+from benchmarks.servidor_fake import ServidorFake
+
+
+def sessao_de_menu(api):
+    """Sequência de leituras e escritas de um operador no menu"""
+    for _ in range(5):
+        api.listar_livros()
+        api.pesquisa_avancada_livros(categoria="ficção")
+        api.grafico_livros_por_categoria()
+        api.buscar_livro("1")
+        api.listar_vendas()
+        api.grafico_vendas_por_livro()
+    api.criar_venda("1", 1, "Cliente")
+    api.listar_livros()
+    api.listar_vendas()
+
+
+def medir(cache_ttl):
+    with ServidorFake() as servidor:
+        api = LivrariaAPI(base_url=servidor.url, cache_ttl=cache_ttl)
+        requisicoes = 0
+        original = api._requisicao
+        
+        def contar(*args, **kwargs):
+            nonlocal requisicoes
+            requisicoes += 1
+            return original(*args, **kwargs)
+        
+        api._requisicao = contar
+        inicio = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            sessao_de_menu(api)
+        duracao = (time.perf_counter() - inicio) * 1000
+        api.fechar()
+        return requisicoes, duracao, api.cache.estatisticas()
+
+
+def main():
+    for rotulo, ttl in (("Sem cache (TTL 0)", 0), ("Cache TTL 30s", 30)):
+        requisicoes, duracao, stats = medir(ttl)
+        print(f"{rotulo:<20} requisições: {requisicoes:>3}  tempo: {duracao:7.2f} ms  "
+              f"acertos: {stats['acertos']}  revalidações: {stats['revalidacoes']}  "
+              f"downloads: {stats['falhas']}")
+
+
+if __name__ == "__main__":
+    main()
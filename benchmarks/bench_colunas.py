@@ -0,0 +1,118 @@
+"""Benchmark: catálogo e vendas em colunas x lista de dicts
+
+Mede a memória ocupada (tracemalloc, a partir do JSON como chega da API)
+e o tempo dos filtros da pesquisa avançada e das somas dos gráficos.
+
+Uso: python -m benchmarks.bench_colunas [livros] [vendas]
+"""
+import argparse
+import gc
+import json
+import time
+import tracemalloc
+from collections import Counter
+
+import colunas
+from colunas import LivrosColunares, VendasColunares
+from livraria import filtro_pesquisa
+from benchmarks.gerador import gerar_livros, gerar_vendas, perfil
+
+CONSULTAS = [
+    {"autor": "silva", "preco_max": 60},
+    {"categoria": "poesia"},
+    {"autor": "ana", "categoria": "romance", "preco_max": 40},
+    {"titulo": "sertão", "preco_max": 30},
+]
+
+
+def memoria(montar):
+    """(objeto, bytes que continuam alocados depois de montado)"""
+    gc.collect()
+    tracemalloc.start()
+    objeto = montar()
+    gc.collect()
+    atual, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return objeto, atual
+
+
+def cronometrar(funcao, repeticoes=3):
+    """Menor tempo (ms) entre as repetições"""
+    melhor = None
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        resultado = funcao()
+        decorrido = (time.perf_counter() - inicio) * 1000
+        melhor = decorrido if melhor is None else min(melhor, decorrido)
+    return resultado, melhor
+
+
+def totais_por_titulo(vendas):
+    """O agrupamento feito por desenhar_grafico_vendas"""
+    totais = {}
+    for venda in vendas:
+        totais[venda['titulo_livro']] = totais.get(venda['titulo_livro'], 0) + venda['total']
+    return totais
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.bench_colunas",
+                                     description=__doc__.splitlines()[0])
+    parser.add_argument("livros", type=int, nargs="?", default=200000)
+    parser.add_argument("vendas", type=int, nargs="?", default=1000000)
+    args = parser.parse_args(argv)
+    qtd_livros, qtd_vendas = args.livros, args.vendas
+    base = perfil()
+    livros = gerar_livros(qtd_livros, base=base)
+    texto_livros = json.dumps(livros, ensure_ascii=False)
+    texto_vendas = json.dumps(gerar_vendas(qtd_vendas, livros, base=base), ensure_ascii=False)
+    del livros
+    print(f"{qtd_livros} livros, {qtd_vendas} vendas — NumPy: "
+          f"{'sim' if colunas.np is not None else 'não (módulo array)'}\n")
+    
+    # Memória: o que sobra alocado depois de carregar a resposta da API
+    dicts_livros, mem_dicts_livros = memoria(lambda: json.loads(texto_livros))
+    col_livros, mem_col_livros = memoria(lambda: LivrosColunares.de_registros(json.loads(texto_livros)))
+    dicts_vendas, mem_dicts_vendas = memoria(lambda: json.loads(texto_vendas))
+    col_vendas, mem_col_vendas = memoria(lambda: VendasColunares.de_registros(json.loads(texto_vendas)))
+    
+    print(f"{'Memória':<44} {'Dicts (MB)':>12} {'Colunas (MB)':>13} {'Redução':>9}")
+    for nome, antes, depois in (("livros", mem_dicts_livros, mem_col_livros),
+                                ("vendas", mem_dicts_vendas, mem_col_vendas)):
+        print(f"{nome:<44} {antes / 2**20:>12.1f} {depois / 2**20:>13.1f} {antes / depois:>8.1f}x")
+    
+    print(f"\n{'Varredura':<44} {'Dicts (ms)':>12} {'Colunas (ms)':>13} {'Ganho':>9}")
+    for consulta in CONSULTAS:
+        atende = filtro_pesquisa(consulta.get("autor"), consulta.get("categoria"),
+                                 consulta.get("preco_max"), consulta.get("titulo"))
+        esperado, t_dicts = cronometrar(lambda: [l for l in dicts_livros if atende(l)])
+        posicoes, t_colunas = cronometrar(lambda: col_livros.filtrar(**consulta))
+        assert [l['id'] for l in esperado] == [col_livros.ids[i] for i in posicoes]
+        descricao = ", ".join(f"{k}={v}" for k, v in consulta.items())
+        print(f"{descricao:<44} {t_dicts:>12.1f} {t_colunas:>13.1f} {t_dicts / t_colunas:>8.1f}x")
+    
+    agrupamentos = [
+        ("livros por categoria",
+         lambda: Counter(l['categoria'] for l in dicts_livros), col_livros.contagem_categorias),
+        ("vendas: total por título",
+         lambda: totais_por_titulo(dicts_vendas), col_vendas.totais_por_titulo),
+        ("vendas: total por mês",
+         lambda: _por_mes(dicts_vendas), col_vendas.totais_por_mes),
+    ]
+    for descricao, com_dicts, com_colunas in agrupamentos:
+        esperado, t_dicts = cronometrar(com_dicts)
+        obtido, t_colunas = cronometrar(com_colunas)
+        assert esperado.keys() == obtido.keys()
+        assert all(abs(esperado[k] - obtido[k]) < 1e-6 * max(1, abs(esperado[k])) for k in esperado)
+        print(f"{descricao:<44} {t_dicts:>12.1f} {t_colunas:>13.1f} {t_dicts / t_colunas:>8.1f}x")
+
+
+def _por_mes(vendas):
+    meses = {}
+    for venda in vendas:
+        meses[venda['data'][:7]] = meses.get(venda['data'][:7], 0) + venda['total']
+    return meses
+
+
+if __name__ == "__main__":
+    main()
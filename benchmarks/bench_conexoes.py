@@ -0,0 +1,74 @@
+"""Benchmark: conexões abertas e latência por operação, com e sem pool
+
+Uso: python -m benchmarks.bench_conexoes [repeticoes]
+"""
+import argparse
+import contextlib
+import io
+import time
+
+import requests
+
+from livraria import LivrariaAPI
+from benchmarks.servidor_fake import ServidorFake
+
+
+class SessaoSemPool:
+    """Imita o comportamento antigo: uma conexão nova por requisição"""
+    
+    def request(self, metodo, url, **kwargs):
+        return requests.request(metodo, url, **kwargs)
+    
+    def close(self):
+        pass
+
+
+def _operacoes(api):
+    """Sequência de operações típica de uma sessão no menu"""
+    livro = api.criar_livro("Benchmark", "Autor Teste", 10.0, 1000, "Teste")
+    livro_id = livro["id"]
+    yield "criar_livro", lambda: api.criar_livro("Outro", "Autor Teste", 12.0, 5, "Teste")
+    yield "buscar_livro", lambda: api.buscar_livro(livro_id)
+    yield "atualizar_livro", lambda: api.atualizar_livro(livro_id, preco=11.0)
+    yield "listar_livros", api.listar_livros
+    yield "criar_venda", lambda: api.criar_venda(livro_id, 1, "Cliente")
+    yield "listar_vendas", api.listar_vendas
+    yield "pesquisa_avancada", lambda: api.pesquisa_avancada_livros(autor="teste")
+    yield "grafico_categorias", api.grafico_livros_por_categoria
+    yield "grafico_vendas", api.grafico_vendas_por_livro
+
+
+def medir(sessao, repeticoes):
+    """Executar as operações e devolver latência média (ms) e conexões"""
+    resultados = {}
+    with ServidorFake() as servidor:
+        api = LivrariaAPI(base_url=servidor.url, sessao=sessao, cache_ttl=0)
+        with contextlib.redirect_stdout(io.StringIO()):
+            for nome, operacao in _operacoes(api):
+                inicio = time.perf_counter()
+                for _ in range(repeticoes):
+                    operacao()
+                resultados[nome] = (time.perf_counter() - inicio) * 1000 / repeticoes
+        api.fechar()
+        return resultados, servidor.conexoes
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.bench_conexoes",
+                                     description=__doc__.splitlines()[0])
+    parser.add_argument("repeticoes", type=int, nargs="?", default=50)
+    args = parser.parse_args(argv)
+    repeticoes = args.repeticoes
+    sem_pool, conexoes_sem = medir(SessaoSemPool(), repeticoes)
+    com_pool, conexoes_com = medir(None, repeticoes)
+    
+    print(f"{'Operação':<22} {'Sem pool (ms)':>14} {'Com pool (ms)':>14}")
+    print("-" * 52)
+    for nome in sem_pool:
+        print(f"{nome:<22} {sem_pool[nome]:>14.3f} {com_pool[nome]:>14.3f}")
+    print("-" * 52)
+    print(f"{'Conexões abertas':<22} {conexoes_sem:>14} {conexoes_com:>14}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+"""Benchmark: resposta inteira com json() x leitura em fluxo, em respostas grandes
+
+Serve /livros e /vendas de ~100MB cada por um http.server em outro processo
+(assim a memória do servidor não entra na conta) e mede, nos dois modos:
+pico de memória (tracemalloc), tempo até a primeira linha exibida e tempo
+total da listagem, do gráfico de vendas e da pesquisa avançada. O http.server
+ignora filtros e paginação, como um json-server antigo: a pesquisa recebe o
+catálogo inteiro e filtra no cliente.
+
+Uso: python -m benchmarks.bench_fluxo [MB por coleção]
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+import urllib.request
+
+from livraria import LivrariaAPI
+from renderizacao import Renderizador
+from benchmarks.gerador import gerar_livros, gerar_vendas, perfil
+
+
+class SaidaNula(io.TextIOBase):
+    """Descarta o texto, anotando quando chegou a primeira escrita"""
+    
+    def __init__(self):
+        self.primeira = None
+    
+    def write(self, texto):
+        if self.primeira is None:
+            self.primeira = time.perf_counter()
+        return len(texto)
+
+
+def gravar(caminho, registros):
+    with open(caminho, "w", encoding="utf-8") as f:
+        json.dump(registros, f, ensure_ascii=False, indent=2)  # indentado como o json-server
+    return os.path.getsize(caminho)
+
+
+def gerar_arquivos(pasta, mb):
+    """livros e vendas com cerca de mb megabytes cada"""
+    base = perfil()
+    amostra = gerar_livros(1000, base=base)
+    por_livro = len(json.dumps(amostra, ensure_ascii=False, indent=2)) / 1000
+    por_venda = len(json.dumps(gerar_vendas(1000, amostra, base=base), ensure_ascii=False, indent=2)) / 1000
+    livros = gerar_livros(int(mb * 2**20 / por_livro), base=base)
+    tam_livros = gravar(os.path.join(pasta, "livros"), livros)
+    tam_vendas = gravar(os.path.join(pasta, "vendas"),
+                        gerar_vendas(int(mb * 2**20 / por_venda), livros, base=base))
+    return tam_livros, tam_vendas
+
+
+@contextlib.contextmanager
+def servidor(pasta):
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        porta = s.getsockname()[1]
+    processo = subprocess.Popen([sys.executable, "-m", "http.server", str(porta), "--bind",
+                                 "127.0.0.1", "--directory", pasta],
+                                stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    url = f"http://127.0.0.1:{porta}"
+    try:
+        for _ in range(100):
+            try:
+                urllib.request.urlopen(url + "/livros", timeout=1).close()
+                break
+            except OSError:
+                time.sleep(0.1)
+        yield url
+    finally:
+        processo.terminate()
+        processo.wait()
+
+
+def medir(url, operacao, memoria):
+    """(segundos até a primeira escrita, segundos no total, pico de MB ou None)"""
+    saida = SaidaNula()
+    with LivrariaAPI(base_url=url, cache_ttl=0) as api, contextlib.redirect_stdout(saida):
+        if memoria:
+            tracemalloc.start()
+        inicio = time.perf_counter()
+        operacao(api, Renderizador(saida=saida))
+        fim = time.perf_counter()
+        pico = None
+        if memoria:
+            pico = tracemalloc.get_traced_memory()[1] / 2**20
+            tracemalloc.stop()
+    primeira = (saida.primeira or fim) - inicio
+    return primeira, fim - inicio, pico
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.bench_fluxo",
+                                     description=__doc__.splitlines()[0])
+    parser.add_argument("mb", type=float, nargs="?", default=100, help="MB por coleção")
+    args = parser.parse_args(argv)
+    mb = args.mb
+    with tempfile.TemporaryDirectory() as pasta:
+        tam_livros, tam_vendas = gerar_arquivos(pasta, mb)
+        print(f"/livros: {tam_livros / 2**20:.0f} MB, /vendas: {tam_vendas / 2**20:.0f} MB\n")
+        cenarios = [
+            ("listar_vendas", lambda api, r, fluxo: api.listar_vendas(r, fluxo=fluxo)),
+            ("grafico_vendas_por_livro", lambda api, r, fluxo: api.grafico_vendas_por_livro(fluxo=fluxo)),
+            ("pesquisa_avancada_livros", lambda api, r, fluxo: api.pesquisa_avancada_livros(
+                autor="Silva", preco_max=60, renderizador=r, fluxo=fluxo)),
+        ]
+        print(f"{'Operação':<26} {'Modo':<7} {'1ª linha (s)':>13} {'Total (s)':>10} {'Pico (MB)':>10}")
+        with servidor(pasta) as url:
+            for nome, operacao in cenarios:
+                for fluxo in (False, True):
+                    executar = lambda api, r: operacao(api, r, fluxo)
+                    primeira, total, _ = medir(url, executar, memoria=False)
+                    _, _, pico = medir(url, executar, memoria=True)  # tracemalloc deixa tudo mais lento
+                    modo = "fluxo" if fluxo else "json()"
+                    print(f"{nome:<26} {modo:<7} {primeira:>13.2f} {total:>10.2f} {pico:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
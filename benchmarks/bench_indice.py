@@ -0,0 +1,87 @@
+"""Benchmark: pesquisa pelo índice local x varredura linear do catálogo
+
+Uso: python -m benchmarks.bench_indice [quantidade_de_livros]
+"""
+import argparse
+import random
+import time
+
+from indice import IndiceLivros, normalizar
+
+PALAVRAS = ["amor", "guerra", "história", "código", "ciência", "mar", "sertão", "cidade",
+            "noite", "tempo", "memórias", "viagem", "segredo", "jardim", "máquina", "estrela"]
+SOBRENOMES = ["Silva", "Assis", "Amado", "Lispector", "Tolkien", "Martin", "Ramalho", "Harari",
+              "Rosa", "Queiroz", "Veríssimo", "Andrade"]
+CATEGORIAS = ["Programação", "Ficção", "História", "Romance", "Ciência", "Poesia"]
+CONSULTAS = [
+    {"titulo": "sert", "preco_max": 40},
+    {"autor": "lispector", "categoria": "ficcao"},
+    {"titulo": "memorias viagem"},
+    {"autor": "verissimo", "estoque_max": 2},
+    {"categoria": "poesia", "preco_min": 150, "preco_max": 151},
+    {"autor": "amado 42", "preco_max": 50},
+    {"titulo": "jardim 123456"},
+    {"preco_min": 99.5, "preco_max": 99.51, "estoque_max": 10},
+]
+
+
+def catalogo(quantidade):
+    aleatorio = random.Random(42)
+    return [{"id": str(i),
+             "titulo": " ".join(aleatorio.sample(PALAVRAS, 3)) + f" {i}",
+             "autor": f"{aleatorio.choice(SOBRENOMES)} {aleatorio.choice(SOBRENOMES)} {i % 1000}",
+             "preco": round(aleatorio.uniform(10, 200), 2), "estoque": aleatorio.randint(0, 50),
+             "categoria": aleatorio.choice(CATEGORIAS)} for i in range(1, quantidade + 1)]
+
+
+def varredura(livros, titulo=None, autor=None, categoria=None, preco_min=None, preco_max=None,
+              estoque_max=None):
+    """Sem índice: percorrer tudo, com as mesmas regras de prefixo e acentos"""
+    def casa(valor, consulta):
+        termos = normalizar(valor).split()
+        return all(any(t.startswith(p) for t in termos) for p in normalizar(consulta).split())
+    return [l for l in livros
+            if (not titulo or casa(l['titulo'], titulo))
+            and (not autor or casa(l['autor'], autor))
+            and (not categoria or casa(l['categoria'], categoria))
+            and (preco_min is None or l['preco'] >= preco_min)
+            and (preco_max is None or l['preco'] <= preco_max)
+            and (estoque_max is None or l['estoque'] <= estoque_max)]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.bench_indice",
+                                     description=__doc__.splitlines()[0])
+    parser.add_argument("quantidade_de_livros", type=int, nargs="?", default=1000000)
+    args = parser.parse_args(argv)
+    quantidade = args.quantidade_de_livros
+    livros = catalogo(quantidade)
+    indice = IndiceLivros()
+    
+    inicio = time.perf_counter()
+    indice.carregar(livros)
+    print(f"Catálogo: {quantidade} livros, índice montado em {time.perf_counter() - inicio:.1f}s\n")
+    print(f"{'Consulta':<52} {'Resultados':>10} {'Índice (ms)':>12} {'Varredura (ms)':>15}")
+    
+    for consulta in CONSULTAS:
+        inicio = time.perf_counter()
+        achados = indice.buscar(ordenar=None, **consulta)
+        t_indice = (time.perf_counter() - inicio) * 1000
+        
+        inicio = time.perf_counter()
+        esperado = varredura(livros, **consulta)
+        t_varredura = (time.perf_counter() - inicio) * 1000
+        
+        assert sorted(l['id'] for l in achados) == sorted(l['id'] for l in esperado)
+        descricao = ", ".join(f"{k}={v}" for k, v in consulta.items())
+        print(f"{descricao:<52} {len(achados):>10} {t_indice:>12.3f} {t_varredura:>15.1f}")
+    
+    inicio = time.perf_counter()
+    for i in range(1, 101):
+        livro = dict(livros[i], titulo=f"sertão novo {i}", preco=livros[i]['preco'] + 1)
+        indice.registro_salvo("livros", livro)
+    print(f"\nAtualização incremental: {(time.perf_counter() - inicio) * 10:.3f} ms por livro")
+
+
+if __name__ == "__main__":
+    main()
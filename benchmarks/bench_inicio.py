@@ -0,0 +1,92 @@
+"""Benchmark: tempo de partida da linha de comando (python livraria.py ...)
+
+Cada comando roda num processo novo, como num script ou no cron, e mede-se
+o tempo de parede do processo inteiro: o interpretador vazio como
+referência, comandos respondidos pela réplica local ainda nova (sem
+importar o requests nem ir ao servidor) e os mesmos comandos indo ao
+servidor a cada vez (--sem-replica).
+
+Uso: python -m benchmarks.bench_inicio [livros] [vendas] [repetições]
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks.gerador import gerar_db
+from benchmarks.servidor_fake import ServidorFake
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+COMANDOS = [
+    ("livros get 3", ["livros", "get", "3", "--formato", "json"]),
+    ("search --autor silva", ["search", "--autor", "silva", "--formato", "csv"]),
+    ("livros list", ["livros", "list", "--formato", "json"]),
+]
+
+
+def cronometrar(argv, repeticoes):
+    """Mediana e p95 (ms) do tempo de parede do processo; None se algum falhou"""
+    tempos = []
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        resultado = subprocess.run(argv, cwd=RAIZ, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        tempos.append((time.perf_counter() - inicio) * 1000)
+        if resultado.returncode != 0:
+            return None
+    tempos.sort()
+    return statistics.median(tempos), tempos[int(len(tempos) * 0.95) - 1]
+
+
+def requests_importado(argv):
+    """Se o comando chegou a importar o requests (pelo -X importtime)"""
+    resultado = subprocess.run([argv[0], "-X", "importtime"] + argv[1:], cwd=RAIZ,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+    return any(linha.rstrip().endswith("| requests") for linha in resultado.stderr.splitlines())
+
+
+def linha(nome, medida, requests=None):
+    if medida is None:
+        print(f"{nome:<40} {'falhou':>10}")
+        return
+    mediana, p95 = medida
+    extra = "" if requests is None else ("sim" if requests else "não")
+    print(f"{nome:<40} {mediana:>10.1f} {p95:>10.1f}  {extra}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.bench_inicio",
+                                     description=__doc__.splitlines()[0])
+    parser.add_argument("livros", type=int, nargs="?", default=2000)
+    parser.add_argument("vendas", type=int, nargs="?", default=10000)
+    parser.add_argument("repeticoes", type=int, nargs="?", default=15, help="execuções por comando")
+    args = parser.parse_args(argv)
+    qtd_livros, qtd_vendas, repeticoes = args.livros, args.vendas, args.repeticoes
+    
+    with tempfile.TemporaryDirectory() as pasta, ServidorFake(gerar_db(qtd_livros, qtd_vendas)) as servidor:
+        livraria = [sys.executable, "livraria.py", "--url", servidor.url,
+                    "--replica", os.path.join(pasta, "replica.json")]
+        # Cópia inicial da réplica, fora da medida
+        subprocess.run(livraria + ["livros", "list", "--formato", "json"], cwd=RAIZ,
+                       stdout=subprocess.DEVNULL, check=True)
+        
+        print(f"{qtd_livros} livros, {qtd_vendas} vendas, {repeticoes} execuções por comando\n")
+        print(f"{'Comando':<40} {'p50 (ms)':>10} {'p95 (ms)':>10}  requests")
+        linha("python -c pass (interpretador)", cronometrar([sys.executable, "-c", "pass"], repeticoes))
+        linha("python livraria.py --help", cronometrar(livraria + ["--help"], repeticoes),
+              requests_importado(livraria + ["--help"]))
+        for nome, argv in COMANDOS:
+            pela_replica = livraria + ["--max-idade", "3600"] + argv
+            linha(f"{nome} (réplica)", cronometrar(pela_replica, repeticoes),
+                  requests_importado(pela_replica))
+        for nome, argv in COMANDOS:
+            pelo_servidor = livraria + ["--sem-replica"] + argv
+            linha(f"{nome} (servidor)", cronometrar(pelo_servidor, repeticoes),
+                  requests_importado(pelo_servidor))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""Benchmark: livro de cada venda buscado venda a venda x junção em lote
+
+Cruza todas as vendas com o livro atual de cada uma (título, autor,
+categoria) de quatro formas: um GET /livros/{id} por venda sem cache, o
+mesmo com o cache local (um GET por livro distinto), a junção em lote
+(/livros?id=...&id=..., até 100 ids por consulta) e a junção pela réplica
+local. As vendas em si são baixadas antes e não entram na conta.
+
+Uso: python -m benchmarks.bench_juncao [livros] [vendas] [latência ms do servidor]
+"""
+import argparse
+import time
+
+from juncao import enriquecer, juntar_vendas
+from livraria import LivrariaAPI
+from metricas import Metricas
+from replica import Replica
+from benchmarks.gerador import gerar_db
+from benchmarks.servidor_fake import ServidorFake
+
+
+def por_venda(api, vendas):
+    for venda in vendas:
+        status, livro = api._consultar(f"/livros/{venda['livro_id']}")
+        yield enriquecer(venda, livro if status == 200 else None)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.bench_juncao",
+                                     description=__doc__.splitlines()[0])
+    parser.add_argument("livros", type=int, nargs="?", default=2000)
+    parser.add_argument("vendas", type=int, nargs="?", default=10000)
+    parser.add_argument("latencia_ms", type=float, nargs="?", default=1.0,
+                        help="atraso somado a cada resposta do servidor")
+    args = parser.parse_args(argv)
+    qtd_livros, qtd_vendas = args.livros, args.vendas
+    latencia = args.latencia_ms / 1000
+    db = gerar_db(qtd_livros, qtd_vendas)
+    distintos = len({str(v["livro_id"]) for v in db["vendas"]})
+    
+    with ServidorFake(db, latencia=latencia) as servidor:
+        vendas = list(LivrariaAPI(base_url=servidor.url).iterar_vendas())
+        modos = [
+            ("GET por venda", LivrariaAPI(base_url=servidor.url, cache_ttl=0), por_venda),
+            ("GET por venda + cache", LivrariaAPI(base_url=servidor.url), por_venda),
+            ("junção em lote", LivrariaAPI(base_url=servidor.url), juntar_vendas),
+            ("junção pela réplica", LivrariaAPI(base_url=servidor.url,
+                                                replica=Replica(caminho=None)), juntar_vendas),
+        ]
+        print(f"{qtd_vendas} vendas de {distintos} livros distintos, "
+              f"latência do servidor {latencia * 1000:.0f} ms\n")
+        print(f"{'Modo':<24} {'Requisições':>12} {'KB':>9} {'Tempo (s)':>10}  Títulos atuais")
+        esperados = {str(l["id"]): l["titulo"] for l in db["livros"]}
+        for nome, api, juntar in modos:
+            if api.replica is not None:
+                api.replica.reconstruir(api)  # cópia inicial fora da medida
+            api.metricas = Metricas()
+            inicio = time.perf_counter()
+            resultado = list(juntar(api, vendas))
+            duracao = time.perf_counter() - inicio
+            linhas = api.metricas.resumo()
+            requisicoes = sum(l["requisicoes"] for l in linhas)
+            kb = sum(l["bytes_recebidos"] for l in linhas) / 1024
+            ok = all(v["titulo_livro"] == esperados[str(v["livro_id"])] and "autor" in v
+                     for v in resultado)
+            print(f"{nome:<24} {requisicoes:>12} {kb:>9.0f} {duracao:>10.2f}  {'✓' if ok else '✗'}")
+            api.fechar()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+"""Benchmark: importação em lote de um catálogo de fornecedor
+
+Uso: python -m benchmarks.bench_lote [linhas] [trabalhadores] [latencia_ms]
+"""
+import argparse
+import csv
+import os
+import random
+import tempfile
+import time
+
+import lote
+from livraria import LivrariaAPI
+from benchmarks.servidor_fake import ServidorFake
+
+
+def gerar_csv(caminho, linhas):
+    aleatorio = random.Random(7)
+    with open(caminho, "w", encoding="utf-8", newline="") as f:
+        escritor = csv.writer(f)
+        escritor.writerow(["titulo", "autor", "preco", "estoque", "categoria"])
+        for i in range(linhas):
+            escritor.writerow([f"Livro {i}", f"Autor {i % 500}", f"{aleatorio.uniform(10, 200):.2f}",
+                               aleatorio.randint(0, 50), aleatorio.choice(["Ficção", "História"])])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.bench_lote",
+                                     description=__doc__.splitlines()[0])
+    parser.add_argument("linhas", type=int, nargs="?", default=5000)
+    parser.add_argument("trabalhadores", type=int, nargs="?", default=16)
+    parser.add_argument("latencia_ms", type=float, nargs="?", default=5.0,
+                        help="atraso somado a cada resposta do servidor")
+    args = parser.parse_args(argv)
+    linhas, trabalhadores = args.linhas, args.trabalhadores
+    latencia = args.latencia_ms / 1000
+    with tempfile.TemporaryDirectory() as pasta:
+        caminho = os.path.join(pasta, "catalogo.csv")
+        gerar_csv(caminho, linhas)
+        for n in (1, trabalhadores):
+            with ServidorFake({"livros": [], "vendas": [], "remocoes": []}, latencia=latencia) as servidor:
+                with LivrariaAPI(base_url=servidor.url, pool=n) as api:
+                    inicio = time.perf_counter()
+                    resumo = lote.importar(api, "livros", caminho, n, retomar=False,
+                                           exibir_progresso=False)
+                    duracao = time.perf_counter() - inicio
+                print(f"{n:>3} trabalhador(es): {resumo.sucesso} livros em {duracao:.2f}s "
+                      f"({resumo.sucesso / duracao:.0f} livros/s), erros: {sum(resumo.erros.values())}")
+
+
+if __name__ == "__main__":
+    main()
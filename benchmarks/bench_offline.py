@@ -0,0 +1,134 @@
+"""Benchmark: operações com o json-server fora do ar, sem e com o modo offline
+
+Derruba o servidor local e mede o que o caixa sente a cada operação (buscar
+livro, listar, vender): sem o modo offline, cada chamada espera as novas
+tentativas de conexão para terminar em "✗ Erro de conexão"; com ele, o
+disjuntor abre na primeira falha, as leituras saem da réplica e as vendas
+vão para o diário.
+
+Depois o servidor volta na mesma porta, com os mesmos dados, e mede-se o
+reenvio do diário. Enquanto estava "fora", outro caixa vendeu as últimas
+unidades de um dos livros: cada venda offline desse livro tem de virar
+conflito, e as outras têm de chegar ao estoque do servidor.
+
+Uso: python -m benchmarks.bench_offline [livros] [vendas] [operações]
+"""
+import argparse
+import contextlib
+import io
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+from livraria import LivrariaAPI
+from offline import DiarioOffline, ModoOffline
+from replica import Replica
+from benchmarks.gerador import gerar_db
+from benchmarks.servidor_fake import ServidorFake
+
+ESPERA = 0.2  # disjuntor aberto antes de sondar de novo (curto, para o benchmark)
+
+
+def _silencio():
+    return contextlib.redirect_stdout(io.StringIO())
+
+
+def religar(servidor):
+    """Outro ServidorFake na mesma porta, com os dados e a sequência de ids do anterior"""
+    novo = ServidorFake({}, porta=servidor.httpd.server_address[1])
+    novo.httpd.db = servidor.httpd.db
+    novo.httpd.proximo_id = servidor.httpd.proximo_id
+    return novo.iniciar()
+
+
+def cronometrar(operacoes):
+    """Tempos (ms) de cada operação, com as mensagens descartadas"""
+    tempos = []
+    for operacao in operacoes:
+        inicio = time.perf_counter()
+        with _silencio():
+            operacao()
+        tempos.append((time.perf_counter() - inicio) * 1000)
+    return tempos
+
+
+def linha(nome, tempos):
+    print(f"{nome:<26} {len(tempos):>10} {statistics.median(tempos):>10.1f} "
+          f"{max(tempos):>10.1f} {sum(tempos) / 1000:>10.2f}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.bench_offline",
+                                     description=__doc__.splitlines()[0])
+    parser.add_argument("livros", type=int, nargs="?", default=2000)
+    parser.add_argument("vendas", type=int, nargs="?", default=10000)
+    parser.add_argument("operacoes", type=int, nargs="?", default=30)
+    args = parser.parse_args(argv)
+    qtd_livros, qtd_vendas, qtd_operacoes = args.livros, args.vendas, args.operacoes
+    
+    db = gerar_db(qtd_livros, qtd_vendas)
+    livros = sorted(db["livros"], key=lambda l: l["estoque"], reverse=True)[:3]
+    esgotado = livros[0]  # o outro caixa leva as últimas unidades deste
+    
+    def operacoes(api):
+        lista = []
+        for i in range(qtd_operacoes):
+            livro = livros[i // 3 % len(livros)]
+            lista.append([lambda l=livro: api.buscar_livro(l["id"]),
+                          lambda: api.listar_livros(fluxo=True),
+                          lambda l=livro: api.criar_venda(l["id"], 1, "Offline")][i % 3])
+        return lista
+    
+    with tempfile.TemporaryDirectory() as pasta:
+        servidor = ServidorFake(db).iniciar()
+        url = servidor.url
+        sem = LivrariaAPI(base_url=url, replica=Replica(os.path.join(pasta, "r1.json")))
+        offline = ModoOffline(DiarioOffline(os.path.join(pasta, "diario.jsonl")), espera=ESPERA,
+                              conflitos=os.path.join(pasta, "conflitos.jsonl"))
+        com = LivrariaAPI(base_url=url, replica=Replica(os.path.join(pasta, "r2.json")),
+                          offline=offline)
+        with _silencio():
+            sem.listar_livros()
+            com.listar_livros()
+        servidor.parar()
+        for api in (sem, com):
+            api.backend.fechar()  # sem isso, as conexões keep-alive seguiriam atendidas
+        
+        print(f"{qtd_livros} livros, {qtd_vendas} vendas; servidor fora do ar, "
+              f"{qtd_operacoes} operações (buscar, listar, vender)\n")
+        print(f"{'Modo':<26} {'Operações':>10} {'p50 (ms)':>10} {'máx (ms)':>10} {'Total (s)':>10}")
+        linha("sem modo offline", cronometrar(operacoes(sem)))
+        linha("com modo offline", cronometrar(operacoes(com)))
+        gravadas = offline.pendentes
+        vendidas = {l["id"]: sum(1 for e in offline._pendentes
+                                 if e["op"] == "venda" and e["registro"]["livro_id"] == l["id"])
+                    for l in livros}
+        
+        # Enquanto isso, outro caixa vendeu todo o estoque de um dos livros
+        servidor.httpd.db["livros"][str(esgotado["id"])]["estoque"] = 0
+        antes = {l["id"]: servidor.httpd.db["livros"][str(l["id"])]["estoque"] for l in livros}
+        servidor = religar(servidor)
+        time.sleep(ESPERA)
+        inicio = time.perf_counter()
+        with _silencio():
+            com.buscar_livro(livros[1]["id"])  # a primeira requisição reenvia o diário
+        duracao = time.perf_counter() - inicio
+        
+        depois = {l["id"]: servidor.httpd.db["livros"][str(l["id"])]["estoque"] for l in livros}
+        esperado = {i: antes[i] if i == esgotado["id"] else antes[i] - vendidas[i] for i in antes}
+        conflitos = len(offline.conflitos)
+        ok = (depois == esperado and offline.pendentes == 0
+              and conflitos == vendidas[esgotado["id"]])
+        print(f"\nReenvio: {gravadas} venda(s) do diário em {duracao * 1000:.0f} ms "
+              f"({duracao * 1000 / max(gravadas, 1):.1f} ms cada), {conflitos} conflito(s) de estoque "
+              f"{'✓' if ok else '✗ ESTOQUE DIFERENTE DO ESPERADO'}")
+        sem.fechar()
+        com.fechar()
+        servidor.parar()
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,63 @@
+"""Benchmark: pesquisa avançada com filtros no servidor x filtro local
+
+Uso: python -m benchmarks.bench_pesquisa [quantidade_de_livros]
+"""
+import argparse
+import random
+import time
+
+from livraria import LivrariaAPI
+from benchmarks.servidor_fake import ServidorFake
+
+CATEGORIAS = ["Programação", "Ficção", "História", "Romance", "Ciência"]
+AUTORES = ["Robert C. Martin", "J.R.R. Tolkien", "Luciano Ramalho", "Yuval Noah Harari"]
+
+
+def catalogo(quantidade):
+    aleatorio = random.Random(42)
+    return [{"id": str(i), "titulo": f"Livro {i}", "autor": aleatorio.choice(AUTORES),
+             "preco": round(aleatorio.uniform(10, 200), 2), "estoque": aleatorio.randint(0, 50),
+             "categoria": aleatorio.choice(CATEGORIAS)} for i in range(1, quantidade + 1)]
+
+
+def filtro_antigo(api, autor, categoria, preco_max):
+    """Comportamento anterior: baixar tudo e filtrar com três passadas"""
+    livros = api._requisicao("GET", "/livros").json()
+    livros = [l for l in livros if autor.lower() in l['autor'].lower()]
+    livros = [l for l in livros if categoria.lower() in l['categoria'].lower()]
+    return [l for l in livros if l['preco'] <= preco_max]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.bench_pesquisa",
+                                     description=__doc__.splitlines()[0])
+    parser.add_argument("quantidade_de_livros", type=int, nargs="?", default=20000)
+    args = parser.parse_args(argv)
+    quantidade = args.quantidade_de_livros
+    with ServidorFake({"livros": catalogo(quantidade), "vendas": [], "remocoes": []}) as servidor:
+        api = LivrariaAPI(base_url=servidor.url, cache_ttl=0)
+        args = ("tolkien", "ficção", 50.0)
+        
+        inicio = time.perf_counter()
+        antigo = filtro_antigo(api, *args)
+        t_antigo = time.perf_counter() - inicio
+        
+        inicio = time.perf_counter()
+        novo = list(api.iterar_pesquisa_livros(*args))
+        t_novo = time.perf_counter() - inicio
+        
+        inicio = time.perf_counter()
+        primeira_pagina = next(api.iterar_pesquisa_livros(*args), None)
+        t_primeiro = time.perf_counter() - inicio
+        
+        assert sorted(l['id'] for l in antigo) == sorted(l['id'] for l in novo)
+        print(f"Catálogo: {quantidade} livros, {len(novo)} resultados")
+        print(f"Filtro local (tudo + 3 passadas): {t_antigo * 1000:9.2f} ms")
+        print(f"Filtro no servidor (paginado):    {t_novo * 1000:9.2f} ms")
+        print(f"Primeiro resultado (paginado):    {t_primeiro * 1000:9.2f} ms"
+              f"{'' if primeira_pagina else ' (sem resultados)'}")
+        api.fechar()
+
+
+if __name__ == "__main__":
+    main()
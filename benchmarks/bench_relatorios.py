@@ -0,0 +1,112 @@
+"""Benchmark: relatório de vendas num laço só x map/reduce em vários processos
+
+Gera um histórico sintético em JSONL (o formato de `livraria.py exportar
+vendas`), sem montá-lo na memória, e soma as vendas por livro, categoria,
+cliente e mês: primeiro num laço só, como o gráfico de vendas por livro, e
+depois pelo relatorios.py com 1, 2, 4... processos até o número de núcleos.
+Confere que todos os modos chegam aos mesmos totais.
+
+Uso: python -m benchmarks.bench_relatorios [vendas] [livros] [processos,...]
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+from juncao import totais_por_livro
+from relatorios import AGRUPAMENTOS, linhas, somar, somar_vendas
+from benchmarks.gerador import gerar_livros, iterar_vendas
+
+
+def gerar_arquivo(caminho, vendas, livros):
+    with open(caminho, "w", encoding="utf-8") as f:
+        bloco = []
+        for venda in iterar_vendas(vendas, livros):
+            bloco.append(json.dumps(venda, ensure_ascii=False))
+            if len(bloco) == 10000:
+                f.write("\n".join(bloco) + "\n")
+                bloco = []
+        if bloco:
+            f.write("\n".join(bloco) + "\n")
+
+
+def ler(caminho):
+    with open(caminho, "rb") as f:
+        for linha in f:
+            yield json.loads(linha)
+
+
+def iguais(a, b):
+    """Mesmas linhas nos quatro agrupamentos, com os totais batendo até o centavo"""
+    for agrupamento in AGRUPAMENTOS:
+        x = {l[agrupamento]: l for l in a[agrupamento]}
+        y = {l[agrupamento]: l for l in b[agrupamento]}
+        if x.keys() != y.keys():
+            return False
+        for chave, linha in x.items():
+            if linha["vendas"] != y[chave]["vendas"] or abs(linha["total"] - y[chave]["total"]) > 0.011:
+                return False
+    return True
+
+
+def niveis_processos(texto):
+    return [int(n) for n in texto.split(",")]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.bench_relatorios",
+                                     description=__doc__.splitlines()[0])
+    parser.add_argument("vendas", type=int, nargs="?", default=10_000_000)
+    parser.add_argument("livros", type=int, nargs="?", default=5000)
+    parser.add_argument("processos", type=niveis_processos, nargs="?",
+                        help="níveis separados por vírgula (padrão: 1, 2, 4... até os núcleos)")
+    args = parser.parse_args(argv)
+    qtd_vendas, qtd_livros = args.vendas, args.livros
+    nucleos = os.cpu_count() or 1
+    if args.processos:
+        niveis = args.processos
+    else:
+        niveis = sorted({n for n in (1, 2, 4, 8, 16, 32, 64) if n <= max(nucleos, 2)} | {nucleos})
+    
+    livros = gerar_livros(qtd_livros)
+    catalogo = {livro['id']: livro for livro in livros}
+    with tempfile.TemporaryDirectory() as pasta:
+        caminho = os.path.join(pasta, "vendas.jsonl")
+        inicio = time.perf_counter()
+        gerar_arquivo(caminho, qtd_vendas, livros)
+        tamanho = os.path.getsize(caminho) / 1024 / 1024
+        print(f"{qtd_vendas} vendas de {qtd_livros} livros ({tamanho:.0f} MB em JSONL, "
+              f"gerado em {time.perf_counter() - inicio:.0f}s), {nucleos} núcleo(s)\n")
+        print(f"{'Modo':<34} {'Tempo (s)':>10} {'Mil vendas/s':>13} {'Aceleração':>11}  Totais")
+        
+        inicio = time.perf_counter()
+        totais_por_livro(ler(caminho))
+        duracao = time.perf_counter() - inicio
+        print(f"{'laço único, só por livro':<34} {duracao:>10.1f} {qtd_vendas / duracao / 1000:>13.0f} "
+              f"{'':>11}  (gráfico atual)")
+        
+        inicio = time.perf_counter()
+        parcial = somar(ler(caminho))
+        referencia = {a: linhas(parcial, a, catalogo) for a in AGRUPAMENTOS}
+        base = time.perf_counter() - inicio
+        print(f"{'laço único, 4 agrupamentos':<34} {base:>10.1f} {qtd_vendas / base / 1000:>13.0f} "
+              f"{1:>10.2f}x  referência")
+        
+        ok = True
+        for processos in niveis:
+            inicio = time.perf_counter()
+            parcial = somar_vendas(None, caminho, processos)
+            resultado = {a: linhas(parcial, a, catalogo) for a in AGRUPAMENTOS}
+            duracao = time.perf_counter() - inicio
+            certo = iguais(resultado, referencia) and parcial["vendas"] == qtd_vendas
+            ok &= certo
+            nome = f"map/reduce, {processos} processo(s)"
+            print(f"{nome:<34} {duracao:>10.1f} {qtd_vendas / duracao / 1000:>13.0f} "
+                  f"{base / duracao:>10.2f}x  {'✓' if certo else '✗ DIFERENTE'}")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
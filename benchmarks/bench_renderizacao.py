@@ -0,0 +1,55 @@
+"""Benchmark: exibir 100 mil livros com print por linha x Renderizador
+
+Uso: python -m benchmarks.bench_renderizacao [linhas]
+"""
+import argparse
+import contextlib
+import os
+import time
+
+from renderizacao import Renderizador, tabela_livros
+
+
+def livros(quantidade):
+    for i in range(quantidade):
+        yield {"id": str(i), "titulo": f"Livro {i}", "autor": f"Autor {i % 500}",
+               "preco": 10.0 + i % 90, "estoque": i % 40, "categoria": "Ficção"}
+
+
+def print_por_linha(registros):
+    """Como listar_livros fazia antes: um print por linha"""
+    print("\n" + "="*80)
+    print(f"{'ID':<5} {'Título':<30} {'Autor':<20} {'Preço':<10} {'Estoque':<10}")
+    print("="*80)
+    for livro in registros:
+        print(f"{livro['id']:<5} {livro['titulo']:<30} {livro['autor']:<20} "
+              f"R${livro['preco']:<9.2f} {livro['estoque']:<10}")
+    print("="*80)
+
+
+def medir(funcao, registros, saida):
+    inicio = time.perf_counter()
+    with contextlib.redirect_stdout(saida):
+        funcao(registros)
+    saida.flush()
+    return time.perf_counter() - inicio
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.bench_renderizacao",
+                                     description=__doc__.splitlines()[0])
+    parser.add_argument("linhas", type=int, nargs="?", default=100000)
+    args = parser.parse_args(argv)
+    quantidade = args.linhas
+    registros = list(livros(quantidade))
+    # Saída sem buffer de bloco, como um terminal (line buffering)
+    with open(os.devnull, "w", buffering=1, encoding="utf-8") as saida:
+        antes = medir(print_por_linha, registros, saida)
+        depois = medir(lambda r: tabela_livros(r, Renderizador(saida)), registros, saida)
+    print(f"{quantidade} linhas")
+    print(f"print por linha: {antes * 1000:8.1f} ms")
+    print(f"Renderizador:    {depois * 1000:8.1f} ms  ({antes / depois:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""Benchmark: réplica sincronizada por diferença x recarga completa das coleções
+
+Um segundo cliente faz algumas escritas (livros alterados, vendas novas e
+canceladas) entre uma atualização e outra; mede-se os bytes recebidos e o
+tempo de cada atualização pela réplica, por recarga completa com o cache
+limpo e por recarga com revalidação por ETag (que não ajuda: as coleções
+mudaram).
+
+Uso: python -m benchmarks.bench_replica [livros] [vendas] [escritas por rodada]
+"""
+import argparse
+import contextlib
+import io
+import random
+import time
+
+from livraria import LivrariaAPI
+from metricas import Metricas
+from replica import Replica
+from benchmarks.gerador import gerar_db
+from benchmarks.servidor_fake import ServidorFake
+
+RODADAS = 5
+
+
+def escrever(api, livros, quantidade, aleatorio):
+    """Alterações de outro caixa: preço de livros, vendas novas e uma cancelada"""
+    with contextlib.redirect_stdout(io.StringIO()):
+        for _ in range(quantidade // 2):
+            livro = aleatorio.choice(livros)
+            api.atualizar_livro(livro["id"], preco=round(livro["preco"] * 1.01, 2))
+        vendas = []
+        for _ in range(quantidade - quantidade // 2):
+            livro = max(aleatorio.sample(livros, 20), key=lambda l: l["estoque"])
+            vendas.append(api.criar_venda(livro["id"], 1, "Benchmark"))
+        if vendas and vendas[0]:
+            api.deletar_venda(vendas[0]["id"])
+
+
+def recarregar(api):
+    api.cache.limpar()
+    api._consultar("/livros")
+    api._consultar("/vendas")
+
+
+def revalidar(api):
+    api._consultar("/livros")
+    api._consultar("/vendas")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.bench_replica",
+                                     description=__doc__.splitlines()[0])
+    parser.add_argument("livros", type=int, nargs="?", default=5000)
+    parser.add_argument("vendas", type=int, nargs="?", default=50000)
+    parser.add_argument("escritas", type=int, nargs="?", default=10, help="escritas por rodada")
+    args = parser.parse_args(argv)
+    qtd_livros, qtd_vendas, escritas = args.livros, args.vendas, args.escritas
+    db = gerar_db(qtd_livros, qtd_vendas)
+    aleatorio = random.Random(7)
+    
+    with ServidorFake(db) as servidor:
+        outro = LivrariaAPI(base_url=servidor.url, cache_ttl=0)
+        modos = {
+            "réplica (diferença)": LivrariaAPI(base_url=servidor.url, metricas=Metricas(),
+                                               replica=Replica(caminho=None, intervalo=0)),
+            "recarga completa": LivrariaAPI(base_url=servidor.url, metricas=Metricas()),
+            "recarga com ETag": LivrariaAPI(base_url=servidor.url, cache_ttl=0, metricas=Metricas()),
+        }
+        operacoes = {
+            "réplica (diferença)": lambda api: api.replica.sincronizar(api),
+            "recarga completa": recarregar,
+            "recarga com ETag": revalidar,
+        }
+        for nome, api in modos.items():
+            operacoes[nome](api)  # carga inicial
+            api.metricas.zerar()
+        
+        medidas = {nome: [] for nome in modos}
+        for _ in range(RODADAS):
+            escrever(outro, db["livros"], escritas, aleatorio)
+            for nome, api in modos.items():
+                inicio = time.perf_counter()
+                operacoes[nome](api)
+                medidas[nome].append((time.perf_counter() - inicio) * 1000)
+        
+        print(f"{qtd_livros} livros, {qtd_vendas} vendas, {escritas} escrita(s) entre atualizações\n")
+        print(f"{'Atualização':<22} {'Requisições':>12} {'KB por vez':>12} {'ms por vez':>11}")
+        for nome, api in modos.items():
+            linhas = api.metricas.resumo()
+            requisicoes = sum(l["requisicoes"] for l in linhas) / RODADAS
+            kb = sum(l["bytes_recebidos"] for l in linhas) / RODADAS / 1024
+            print(f"{nome:<22} {requisicoes:>12.1f} {kb:>12.1f} {min(medidas[nome]):>11.1f}")
+            api.fechar()
+        outro.fechar()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,148 @@
+"""Benchmark: vendas síncronas x reserva em memória com gravação em segundo plano
+
+Vários caixas disparam uma rajada de vendas (metade num livro em promoção
+com estoque curto, o resto espalhado pelo catálogo). Mede a latência de
+confirmação de cada venda, a vazão e o tempo até o servidor ter tudo, e
+confere que nenhum livro foi vendido acima do estoque. Por fim simula uma
+queda com vendas ainda no diário e confere que a retomada grava todas, sem
+duplicar.
+
+Uso: python -m benchmarks.bench_reservas [vendas] [caixas] [latência ms do servidor]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+
+from livraria import ConflitoEstoque, EstoqueInsuficiente, LivrariaAPI
+from metricas import Histograma
+from reservas import DiarioVendas, FilaVendas
+from benchmarks.servidor_fake import ServidorFake
+
+LIVROS = 50
+
+
+def catalogo(vendas):
+    livros = [{"id": str(i), "titulo": f"Livro {i}", "autor": "Autor", "preco": 10.0 + i,
+               "estoque": vendas, "categoria": "Teste", "versao": 1} for i in range(1, LIVROS)]
+    livros.append({"id": "promo", "titulo": "Promoção", "autor": "Autor", "preco": 5.0,
+                   "estoque": vendas // 4, "categoria": "Teste", "versao": 1})
+    return {"livros": livros, "vendas": [], "remocoes": []}
+
+
+def rajada(api, vendas, caixas):
+    """Disparar as vendas pelos caixas; retorna (histograma de ms, contagem, segundos)"""
+    histograma, contagem = Histograma(), Counter()
+    trava = threading.Lock()
+    
+    def caixa(n):
+        for i in range(n, vendas, caixas):
+            livro_id = "promo" if i % 2 else str(i // 2 % (LIVROS - 1) + 1)
+            inicio = time.perf_counter()
+            try:
+                api.registrar_venda(livro_id, 1, f"caixa-{n}")
+                resultado = "confirmadas"
+            except EstoqueInsuficiente:
+                resultado = "sem_estoque"
+            except ConflitoEstoque:
+                resultado = "conflitos"
+            ms = (time.perf_counter() - inicio) * 1000
+            with trava:
+                histograma.registrar(ms)
+                contagem[resultado] += 1
+    
+    threads = [threading.Thread(target=caixa, args=(n,)) for n in range(caixas)]
+    inicio = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return histograma, contagem, time.perf_counter() - inicio
+
+
+def conferir(servidor, db, confirmadas):
+    """Vendas no servidor = confirmadas, e estoque de cada livro = inicial - vendido"""
+    vendidas = Counter()
+    for venda in servidor.httpd.db["vendas"].values():
+        vendidas[str(venda["livro_id"])] += venda["quantidade"]
+    for livro in db["livros"]:
+        final = servidor.httpd.db["livros"][livro["id"]]["estoque"]
+        if final < 0 or livro["estoque"] - final != vendidas[livro["id"]]:
+            return False
+    return sum(vendidas.values()) == confirmadas == len(servidor.httpd.db["vendas"])
+
+
+def medir(nome, vendas, caixas, latencia, fila):
+    db = catalogo(vendas)
+    with ServidorFake(db, latencia=latencia) as servidor:
+        api = LivrariaAPI(base_url=servidor.url, pool=caixas, fila_vendas=fila)
+        histograma, contagem, duracao = rajada(api, vendas, caixas)
+        inicio = time.perf_counter()
+        api.fechar()  # com fila: grava o que ainda estiver pendente
+        gravacao = duracao + time.perf_counter() - inicio
+        ok = conferir(servidor, db, contagem["confirmadas"])
+    print(f"{nome:<22} {contagem['confirmadas'] / duracao:>11.0f} {histograma.percentil(50):>9.2f} "
+          f"{histograma.percentil(99):>9.2f} {gravacao:>11.2f} {contagem['sem_estoque']:>8} "
+          f"{contagem['conflitos']:>9}  {'✓' if ok else '✗ INCONSISTENTE'}")
+    return ok
+
+
+def retomada(pasta, vendas):
+    """Queda com metade das vendas gravada: a retomada grava a outra metade sem duplicar"""
+    caminho = os.path.join(pasta, "retomada.jsonl")
+    db = catalogo(vendas)
+    with ServidorFake(db) as servidor:
+        fila = FilaVendas(DiarioVendas(caminho), lote=vendas + 1, intervalo=3600)
+        api = LivrariaAPI(base_url=servidor.url, fila_vendas=fila)
+        for i in range(vendas):
+            api.registrar_venda(str(i % (LIVROS - 1) + 1), 1, "Antes da queda")
+        fila.lote = vendas // 2
+        fila.gravar()
+        # Queda: a thread para sem gravar o resto e o diário fica como estava
+        with fila._condicao:
+            fila._parar = True
+            fila._condicao.notify()
+        fila._thread.join()
+        fila.diario.fechar()
+        antes = len(servidor.httpd.db["vendas"])
+        
+        inicio = time.perf_counter()
+        nova = FilaVendas(DiarioVendas(caminho))
+        outra = LivrariaAPI(base_url=servidor.url, fila_vendas=nova)
+        outra.fechar()
+        duracao = time.perf_counter() - inicio
+        ok = conferir(servidor, db, vendas)
+        api.backend.fechar()
+    print(f"\nQueda com {antes} de {vendas} vendas no servidor: retomada em {duracao:.2f}s, "
+          f"{len(servidor.httpd.db['vendas'])} no servidor  {'✓' if ok else '✗ INCONSISTENTE'}")
+    return ok
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.bench_reservas",
+                                     description=__doc__.splitlines()[0])
+    parser.add_argument("vendas", type=int, nargs="?", default=5000)
+    parser.add_argument("caixas", type=int, nargs="?", default=16)
+    parser.add_argument("latencia_ms", type=float, nargs="?", default=0.0,
+                        help="atraso somado a cada resposta do servidor")
+    args = parser.parse_args(argv)
+    vendas, caixas = args.vendas, args.caixas
+    latencia = args.latencia_ms / 1000
+    print(f"{vendas} vendas por {caixas} caixas, latência do servidor {latencia * 1000:.0f} ms\n")
+    print(f"{'Modo':<22} {'Vendas/s':>11} {'p50 (ms)':>9} {'p99 (ms)':>9} {'Gravado (s)':>11} "
+          f"{'Sem est.':>8} {'Conflitos':>9}")
+    with tempfile.TemporaryDirectory() as pasta:
+        ok = medir("síncrono", vendas, caixas, latencia, None)
+        ok &= medir("fila (diário)", vendas, caixas, latencia,
+                    FilaVendas(DiarioVendas(os.path.join(pasta, "fila.jsonl"))))
+        ok &= medir("fila (diário + fsync)", vendas, caixas, latencia,
+                    FilaVendas(DiarioVendas(os.path.join(pasta, "fsync.jsonl"), fsync=True)))
+        ok &= retomada(pasta, min(vendas, 1000))
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,82 @@
+"""Teste de carga: vários caixas vendendo o mesmo livro ao mesmo tempo
+
+Confere que não há venda acima do estoque nem erro em algum caixa e mede
+vendas por segundo.
+Uso: python -m benchmarks.bench_vendas_concorrentes [caixas] [estoque]
+"""
+import argparse
+import sys
+import threading
+import time
+
+from livraria import ConflitoEstoque, EstoqueInsuficiente, LivrariaAPI
+from benchmarks.servidor_fake import ServidorFake
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.bench_vendas_concorrentes",
+                                     description=__doc__.splitlines()[0])
+    parser.add_argument("caixas", type=int, nargs="?", default=16)
+    parser.add_argument("estoque", type=int, nargs="?", default=500)
+    args = parser.parse_args(argv)
+    caixas, estoque = args.caixas, args.estoque
+    livro = {"id": "1", "titulo": "Promoção", "autor": "Autor", "preco": 10.0,
+             "estoque": estoque, "categoria": "Teste", "versao": 1}
+    
+    with ServidorFake({"livros": [livro], "vendas": [], "remocoes": []}) as servidor:
+        api = LivrariaAPI(base_url=servidor.url, pool=caixas)
+        contagem = {"vendidas": 0, "sem_estoque": 0, "conflitos": 0, "erros": 0}
+        erros = []
+        trava = threading.Lock()
+        
+        def caixa():
+            # Cada caixa tenta vender até o estoque acabar
+            while True:
+                try:
+                    api.registrar_venda("1", 1, threading.current_thread().name)
+                    resultado = "vendidas"
+                except EstoqueInsuficiente:
+                    resultado = "sem_estoque"
+                except ConflitoEstoque:
+                    resultado = "conflitos"
+                except Exception as e:
+                    # Um erro na thread não pode passar em silêncio: o caixa para e conta
+                    resultado = "erros"
+                    erros.append(f"{threading.current_thread().name}: {type(e).__name__}: {e}")
+                with trava:
+                    contagem[resultado] += 1
+                if resultado in ("sem_estoque", "erros"):
+                    return
+        
+        threads = [threading.Thread(target=caixa, name=f"caixa-{i}") for i in range(caixas)]
+        inicio = time.perf_counter()
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        duracao = time.perf_counter() - inicio
+        
+        estoque_final = servidor.httpd.db["livros"]["1"]["estoque"]
+        vendas = servidor.httpd.db["vendas"]
+        unidades = sum(v["quantidade"] for v in vendas.values())
+        api.fechar()
+    
+    print(f"Caixas: {caixas}  Estoque inicial: {estoque}")
+    print(f"Vendas confirmadas: {contagem['vendidas']}  registradas no servidor: {len(vendas)}")
+    print(f"Recusadas por estoque: {contagem['sem_estoque']}  "
+          f"desistências por conflito: {contagem['conflitos']}")
+    print(f"Erros nos caixas: {contagem['erros']}")
+    for erro in erros[:5]:
+        print(f"  {erro}")
+    print(f"Estoque final: {estoque_final}")
+    print(f"Vazão: {contagem['vendidas'] / duracao:.1f} vendas/s")
+    ok = estoque_final >= 0 and unidades == estoque - estoque_final == contagem["vendidas"]
+    print("✓ Sem venda acima do estoque" if ok else "✗ INCONSISTÊNCIA NO ESTOQUE")
+    if contagem["erros"]:
+        print("✗ ERROS NOS CAIXAS")
+        ok = False
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,115 @@
+"""Catálogos e históricos de vendas sintéticos, no formato do db.json
+
+A forma vem do db.json do projeto: categorias, autores, faixas de preço e
+estoque e datas das vendas existentes servem de base, e o restante é
+sorteado com semente fixa (mesmos parâmetros, mesmos dados).
+
+Uso: python -m benchmarks.gerador LIVROS VENDAS saida.json
+     json-server --watch saida.json --port 3000
+"""
+import argparse
+import json
+import random
+import sys
+from datetime import datetime, timedelta
+
+from benchmarks.servidor_fake import DB_PADRAO
+
+PALAVRAS = ["Código", "Noite", "Mar", "Sertão", "Cidade", "Tempo", "Memórias", "Viagem",
+            "Segredo", "Jardim", "Máquina", "Estrela", "História", "Guerra", "Amor", "Dados",
+            "Python", "Sistemas", "Reino", "Sombra", "Caminho", "Ilha", "Rio", "Fogo"]
+NOMES = ["Ana", "Bruno", "Carla", "Diego", "Elisa", "Fábio", "Gabriela", "Heitor", "Íris",
+         "João", "Larissa", "Márcio", "Natália", "Otávio", "Paula", "Rafael", "Sofia", "Tiago"]
+SOBRENOMES = ["Silva", "Santos", "Oliveira", "Souza", "Lima", "Pereira", "Costa", "Almeida",
+              "Ribeiro", "Carvalho", "Gomes", "Martins", "Araújo", "Barbosa", "Rocha"]
+CATEGORIAS_EXTRAS = ["Romance", "Poesia", "Ciência", "Biografia", "Negócios", "Infantil"]
+
+
+def perfil(caminho=DB_PADRAO):
+    """Características do db.json usadas como base dos dados sintéticos"""
+    with open(caminho, encoding="utf-8") as f:
+        db = json.load(f)
+    livros, vendas = db.get("livros", []), db.get("vendas", [])
+    precos = [l['preco'] for l in livros] or [50.0]
+    datas = [v['data'] for v in vendas] or ["2025-01-01 00:00:00"]
+    return {
+        "categorias": sorted({l['categoria'] for l in livros}),
+        "autores": sorted({l['autor'] for l in livros}),
+        "clientes": sorted({v['cliente'] for v in vendas}),
+        "preco_min": min(precos) / 2,
+        "preco_max": max(precos) * 1.5,
+        "estoque_max": max([l['estoque'] for l in livros] or [20]),
+        "quantidade_max": max([v['quantidade'] for v in vendas] or [3]),
+        "ultima_data": max(datas),
+    }
+
+
+def gerar_livros(quantidade, semente=42, base=None):
+    """Livros com ids "1".."N", categorias e autores do db.json mais os sorteados"""
+    base = base or perfil()
+    aleatorio = random.Random(semente)
+    categorias = base["categorias"] + [c for c in CATEGORIAS_EXTRAS if c not in base["categorias"]]
+    autores = base["autores"] + [f"{n} {s}" for n in NOMES for s in SOBRENOMES]
+    return [{
+        "id": str(i),
+        "titulo": " ".join(aleatorio.sample(PALAVRAS, aleatorio.randint(1, 3))) + f" {i}",
+        "autor": aleatorio.choice(autores),
+        "preco": round(aleatorio.uniform(base["preco_min"], base["preco_max"]), 2),
+        "estoque": aleatorio.randint(0, base["estoque_max"]),
+        "categoria": aleatorio.choice(categorias),
+        "versao": 1,
+    } for i in range(1, quantidade + 1)]
+
+
+def gerar_vendas(quantidade, livros, semente=43, base=None, dias=365):
+    """Vendas em ordem de data, nos `dias` que terminam na última venda do db.json"""
+    return list(iterar_vendas(quantidade, livros, semente, base, dias))
+
+
+def iterar_vendas(quantidade, livros, semente=43, base=None, dias=365):
+    """As mesmas vendas de gerar_vendas, uma por vez (para históricos que não cabem na memória)"""
+    base = base or perfil()
+    aleatorio = random.Random(semente)
+    clientes = base["clientes"] + [f"{n} {s}" for n in NOMES for s in SOBRENOMES]
+    fim = datetime.strptime(base["ultima_data"], "%Y-%m-%d %H:%M:%S")
+    inicio = fim - timedelta(days=dias)
+    passo = (fim - inicio) / max(quantidade, 1)
+    for i in range(quantidade):
+        livro = aleatorio.choice(livros)
+        qtd = aleatorio.randint(1, base["quantidade_max"])
+        yield {
+            "id": f"v{i + 1}",
+            "livro_id": livro['id'],
+            "titulo_livro": livro['titulo'],
+            "quantidade": qtd,
+            "preco_unitario": livro['preco'],
+            "total": round(livro['preco'] * qtd, 2),
+            "cliente": aleatorio.choice(clientes),
+            "data": (inicio + passo * i).strftime("%Y-%m-%d %H:%M:%S"),
+        }
+
+
+def gerar_db(livros, vendas, semente=42, caminho=DB_PADRAO):
+    """Banco completo no formato do db.json"""
+    base = perfil(caminho)
+    catalogo = gerar_livros(livros, semente, base)
+    return {"livros": catalogo, "vendas": gerar_vendas(vendas, catalogo, semente + 1, base),
+            "remocoes": []}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.gerador",
+                                     description=__doc__.splitlines()[0])
+    parser.add_argument("livros", type=int)
+    parser.add_argument("vendas", type=int)
+    parser.add_argument("saida", help="arquivo JSON a gravar (ex.: saida.json)")
+    args = parser.parse_args(argv)
+    db = gerar_db(args.livros, args.vendas)
+    with open(args.saida, "w", encoding="utf-8") as f:
+        json.dump(db, f, ensure_ascii=False, indent=2)
+    print(f"✓ {len(db['livros'])} livro(s) e {len(db['vendas'])} venda(s) gravados em {args.saida}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,216 @@
+"""Servidor local que imita o json-server para os benchmarks"""
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+DB_PADRAO = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "db.json")
+
+
+class _Handler(BaseHTTPRequestHandler):
+    """Handler REST com a mesma semântica de /livros e /vendas do json-server"""
+    
+    protocol_version = "HTTP/1.1"  # necessário para manter a conexão viva
+    disable_nagle_algorithm = True  # evita o atraso de 40ms do ACK atrasado
+    
+    def setup(self):
+        super().setup()
+        with self.server.trava:
+            self.server.conexoes += 1
+    
+    def log_message(self, *args):
+        pass
+    
+    def parse_request(self):
+        # Latência injetada: imita a rede e o disco de um servidor de verdade
+        if self.server.latencia:
+            time.sleep(self.server.latencia)
+        return super().parse_request()
+    
+    def _responder(self, status, corpo=None, etag=False):
+        dados = json.dumps(corpo if corpo is not None else {}).encode("utf-8")
+        if etag and status == 200:
+            # Mesmo comportamento do Express: ETag fraco e 304 se não mudou
+            valor = _etag(dados)
+            if self.headers.get("If-None-Match") == valor:
+                self.send_response(304)
+                self.send_header("ETag", valor)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(dados)))
+        if etag and status == 200:
+            self.send_header("ETag", valor)
+        self.end_headers()
+        self.wfile.write(dados)
+    
+    def _ler_corpo(self):
+        tamanho = int(self.headers.get("Content-Length") or 0)
+        return json.loads(self.rfile.read(tamanho) or b"{}")
+    
+    def _rota(self):
+        partes = [p for p in urlsplit(self.path).path.split("/") if p]
+        if not partes or partes[0] not in self.server.db or len(partes) > 2:
+            return None, None
+        return partes[0], (partes[1] if len(partes) == 2 else None)
+    
+    def do_GET(self):
+        colecao, item_id = self._rota()
+        if colecao is None:
+            return self._responder(404)
+        with self.server.trava:
+            registros = self.server.db[colecao]
+            if item_id is None:
+                consulta = parse_qs(urlsplit(self.path).query)
+                return self._responder(200, _consultar(list(registros.values()), consulta), etag=True)
+            registro = registros.get(item_id)
+        self._responder(200 if registro else 404, registro, etag=True)
+    
+    def do_POST(self):
+        # O corpo é lido antes de qualquer recusa: se sobrar no socket, estraga
+        # a próxima requisição da mesma conexão keep-alive
+        registro = self._ler_corpo()
+        colecao, item_id = self._rota()
+        if colecao is None or item_id is not None:
+            return self._responder(404)
+        with self.server.trava:
+            self.server.proximo_id += 1
+            registro["id"] = str(registro.get("id") or self.server.proximo_id)
+            self.server.db[colecao][registro["id"]] = registro
+        self._responder(201, registro)
+    
+    def _alterar(self, parcial):
+        dados = self._ler_corpo()  # antes de qualquer recusa, como no POST
+        colecao, item_id = self._rota()
+        if colecao is None or item_id is None:
+            return self._responder(404)
+        with self.server.trava:
+            atual = self.server.db[colecao].get(item_id)
+            if atual is None:
+                return self._responder(404)
+            if not self._pre_condicao(atual):
+                return self._responder(412)
+            registro = dict(atual, **dados) if parcial else dados
+            registro["id"] = item_id
+            self.server.db[colecao][item_id] = registro
+        self._responder(200, registro)
+    
+    def do_PUT(self):
+        self._alterar(parcial=False)
+    
+    def do_PATCH(self):
+        self._alterar(parcial=True)
+    
+    def do_DELETE(self):
+        colecao, item_id = self._rota()
+        if colecao is None or item_id is None:
+            return self._responder(404)
+        with self.server.trava:
+            atual = self.server.db[colecao].get(item_id)
+            if atual is not None and not self._pre_condicao(atual):
+                return self._responder(412)
+            registro = self.server.db[colecao].pop(item_id, None)
+        self._responder(200 if registro else 404, registro)
+    
+    def _pre_condicao(self, atual):
+        """If-Match: só altera se o registro ainda é o que o cliente leu"""
+        esperado = self.headers.get("If-Match")
+        return esperado is None or esperado == _etag(json.dumps(atual).encode("utf-8"))
+
+
+def _etag(dados):
+    return 'W/"%s"' % hashlib.md5(dados).hexdigest()
+
+
+def _comparavel(valor, referencia):
+    """Converter o valor da query para o tipo do campo do registro"""
+    if isinstance(referencia, (int, float)) and not isinstance(referencia, bool):
+        try:
+            return float(valor)
+        except ValueError:
+            return valor
+    return valor
+
+
+def _consultar(registros, consulta):
+    """Filtros, ordenação e paginação no estilo do json-server 0.17"""
+    for chave, valores in consulta.items():
+        if chave.startswith("_"):
+            continue
+        campo, _, operador = chave.rpartition("_")
+        if operador == "like":
+            padrao = re.compile(valores[-1], re.IGNORECASE)
+            registros = [r for r in registros if padrao.search(str(r.get(campo, "")))]
+        elif operador in ("lte", "gte", "ne") and campo:
+            def atende(r, campo=campo, operador=operador, valor=valores[-1]):
+                if campo not in r:
+                    return False
+                v, ref = r[campo], _comparavel(valor, r[campo])
+                try:
+                    return {"lte": v <= ref, "gte": v >= ref, "ne": v != ref}[operador]
+                except TypeError:
+                    return False
+            registros = [r for r in registros if atende(r)]
+        else:
+            aceitos = set(valores)
+            registros = [r for r in registros if str(r.get(chave)) in aceitos]
+    
+    if "_sort" in consulta:
+        campo = consulta["_sort"][-1]
+        reverso = consulta.get("_order", ["asc"])[-1] == "desc"
+        registros.sort(key=lambda r: (r.get(campo) is None, r.get(campo, 0)), reverse=reverso)
+    if "_page" in consulta or "_limit" in consulta:
+        limite = int(consulta.get("_limit", ["10"])[-1])
+        pagina = int(consulta.get("_page", ["1"])[-1])
+        inicio = (pagina - 1) * limite
+        registros = registros[inicio:inicio + limite]
+    return registros
+
+
+class ServidorFake:
+    """json-server em memória, rodando numa thread, para medir o cliente"""
+    
+    def __init__(self, db=None, porta=0, latencia=0.0):
+        if db is None:
+            with open(DB_PADRAO, encoding="utf-8") as f:
+                db = json.load(f)
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", porta), _Handler)
+        self.httpd.daemon_threads = True
+        self.httpd.trava = threading.Lock()
+        self.httpd.conexoes = 0
+        self.httpd.db = {nome: {str(r["id"]): r for r in registros}
+                         for nome, registros in db.items()}
+        self.httpd.proximo_id = 1000
+        self.httpd.latencia = latencia  # segundos somados a cada resposta
+        self._thread = None
+    
+    @property
+    def url(self):
+        host, porta = self.httpd.server_address[:2]
+        return f"http://{host}:{porta}"
+    
+    @property
+    def conexoes(self):
+        """Quantidade de conexões TCP aceitas desde o início"""
+        return self.httpd.conexoes
+    
+    def iniciar(self):
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+    
+    def parar(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+    
+    def __enter__(self):
+        return self.iniciar()
+    
+    def __exit__(self, *exc):
+        self.parar()
@@ -0,0 +1,201 @@
+"""Suíte de benchmarks com resultado em JSON, para comparar versões
+
+Sobe o servidor local (imitação do json-server) com dados sintéticos do
+gerador e mede os cenários do dia a dia: listagens, pesquisa avançada,
+venda criada e cancelada e os dois gráficos.
+
+Uso:
+    python -m benchmarks.suite --livros 2000 --vendas 20000 --saida atual.json
+    python -m benchmarks.suite --latencia-ms 2 --comparar atual.json
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime
+
+from analise import AgregadosVendas
+from indice import IndiceLivros
+from livraria import LivrariaAPI
+from metricas import Metricas
+from renderizacao import Renderizador
+from benchmarks.gerador import gerar_db
+from benchmarks.servidor_fake import ServidorFake
+
+VERSAO_FORMATO = 1
+
+
+def _silencio():
+    return contextlib.redirect_stdout(io.StringIO())
+
+
+def _cenarios(db):
+    """nome -> (opções extras da LivrariaAPI, preparação, operação medida)"""
+    livro = max(db["livros"], key=lambda l: l["estoque"])  # a venda precisa de estoque
+    autor = livro["autor"].split()[-1]
+    nulo = lambda: Renderizador(saida=io.StringIO())
+    
+    def venda(api):
+        registro = api.registrar_venda(livro["id"], 1, "Benchmark")
+        api.deletar_venda(registro["id"])
+    
+    return {
+        "listar_livros": ({}, None, lambda api: api.listar_livros(nulo())),
+        "listar_vendas": ({}, None, lambda api: api.listar_vendas(nulo())),
+        "pesquisa_servidor": ({}, None, lambda api: api.pesquisa_avancada_livros(
+            autor=autor, preco_max=100, renderizador=nulo())),
+        "pesquisa_indice": ({"indice": IndiceLivros()}, lambda api: api.indice.carregar(api),
+                            lambda api: api.pesquisa_avancada_livros(
+                                autor=autor, preco_max=100, renderizador=nulo())),
+        "venda_criar_cancelar": ({}, None, venda),
+        "grafico_categorias": ({}, None, lambda api: api.grafico_livros_por_categoria()),
+        "grafico_vendas": ({}, None, lambda api: api.grafico_vendas_por_livro()),
+        "grafico_vendas_agregado": ({"analise": AgregadosVendas(caminho=None)},
+                                    lambda api: api.analise.atualizar(api),
+                                    lambda api: api.grafico_vendas_por_livro()),
+    }
+
+
+def medir(url, opcoes, preparar, operacao, repeticoes, cache_ttl):
+    """Tempos (ms) de cada repetição e requisições/bytes por repetição"""
+    metricas = Metricas()
+    ttl = 0 if cache_ttl is None else cache_ttl
+    with LivrariaAPI(base_url=url, cache_ttl=ttl, metricas=metricas, **opcoes) as api:
+        with _silencio():
+            if preparar:
+                preparar(api)
+            operacao(api)  # aquecimento: conexões abertas, caches do Python
+            metricas.zerar()
+            tempos = []
+            for _ in range(repeticoes):
+                if cache_ttl is None:
+                    api.cache.limpar()  # sem revalidação com 304: download completo
+                inicio = time.perf_counter()
+                operacao(api)
+                tempos.append((time.perf_counter() - inicio) * 1000)
+        linhas = metricas.resumo()
+    
+    tempos.sort()
+    return {
+        "repeticoes": repeticoes,
+        "min_ms": round(tempos[0], 3),
+        "mediana_ms": round(statistics.median(tempos), 3),
+        "p95_ms": round(tempos[min(len(tempos) - 1, int(len(tempos) * 0.95))], 3),
+        "media_ms": round(statistics.fmean(tempos), 3),
+        "requisicoes": round(sum(l["requisicoes"] for l in linhas) / repeticoes, 2),
+        "bytes_recebidos": round(sum(l["bytes_recebidos"] for l in linhas) / repeticoes),
+    }
+
+
+def _commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                              text=True, cwd=os.path.dirname(os.path.abspath(__file__)),
+                              timeout=10).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def executar(livros, vendas, latencia_ms=0.0, repeticoes=20, cache_ttl=None, cenarios=None):
+    """Rodar a suíte e devolver o resultado no formato gravado em JSON"""
+    db = gerar_db(livros, vendas)
+    todos = _cenarios(db)
+    escolhidos = cenarios or list(todos)
+    desconhecidos = [nome for nome in escolhidos if nome not in todos]
+    if desconhecidos:
+        raise ValueError(f"cenário(s) desconhecido(s): {', '.join(desconhecidos)}; "
+                         f"disponíveis: {', '.join(todos)}")
+    resultado = {
+        "formato": VERSAO_FORMATO,
+        "momento": datetime.now().isoformat(timespec="seconds"),
+        "commit": _commit(),
+        "python": platform.python_version(),
+        "plataforma": platform.platform(),
+        "parametros": {"livros": livros, "vendas": vendas, "latencia_ms": latencia_ms,
+                       "repeticoes": repeticoes, "cache_ttl": cache_ttl},
+        "cenarios": {},
+    }
+    with ServidorFake(db, latencia=latencia_ms / 1000) as servidor:
+        for nome in escolhidos:
+            opcoes, preparar, operacao = todos[nome]
+            resultado["cenarios"][nome] = medir(servidor.url, opcoes, preparar, operacao,
+                                                repeticoes, cache_ttl)
+            print(f"  {nome:<26} mediana {resultado['cenarios'][nome]['mediana_ms']:>10.2f} ms",
+                  file=sys.stderr)
+    return resultado
+
+
+def comparar(atual, anterior, tolerancia=0.2):
+    """Comparar medianas; retorna a lista de cenários que pioraram além da tolerância"""
+    regressoes = []
+    print(f"\n{'Cenário':<26} {'Antes (ms)':>12} {'Agora (ms)':>12} {'Variação':>10}")
+    print("-"*64)
+    for nome, medida in atual["cenarios"].items():
+        if nome not in anterior.get("cenarios", {}):
+            continue
+        antes = anterior["cenarios"][nome]["mediana_ms"]
+        agora = medida["mediana_ms"]
+        variacao = agora / antes - 1 if antes else 0.0
+        marca = ""
+        if variacao > tolerancia:
+            marca = " ✗"
+            regressoes.append(nome)
+        elif variacao < -tolerancia:
+            marca = " ✓"
+        print(f"{nome:<26} {antes:>12.2f} {agora:>12.2f} {variacao:>+10.1%}{marca}")
+    if anterior.get("parametros") != atual["parametros"]:
+        print("\nAtenção: os parâmetros das duas execuções são diferentes.")
+    return regressoes
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.suite",
+                                     description="Benchmarks da LivrariaAPI com saída em JSON")
+    parser.add_argument("--livros", type=int, default=2000)
+    parser.add_argument("--vendas", type=int, default=10000)
+    parser.add_argument("--latencia-ms", type=float, default=0.0,
+                        help="atraso somado a cada resposta do servidor")
+    parser.add_argument("--repeticoes", type=int, default=20)
+    parser.add_argument("--cache-ttl", type=float,
+                        help="validade do cache local (padrão: cache limpo a cada repetição)")
+    parser.add_argument("--cenarios", help="lista separada por vírgulas (padrão: todos)")
+    parser.add_argument("--saida", help="arquivo JSON com o resultado (padrão: tela)")
+    parser.add_argument("--comparar", metavar="ANTERIOR", help="resultado anterior em JSON")
+    parser.add_argument("--tolerancia", type=float, default=0.2,
+                        help="variação da mediana aceita antes de acusar regressão")
+    args = parser.parse_args(argv)
+    
+    cenarios = args.cenarios.split(",") if args.cenarios else None
+    try:
+        resultado = executar(args.livros, args.vendas, args.latencia_ms, args.repeticoes,
+                             args.cache_ttl, cenarios)
+    except ValueError as e:
+        print(f"✗ {e}")
+        return 2
+    texto = json.dumps(resultado, ensure_ascii=False, indent=2)
+    if args.saida:
+        with open(args.saida, "w", encoding="utf-8") as f:
+            f.write(texto + "\n")
+        print(f"✓ Resultado gravado em {args.saida}", file=sys.stderr)
+    elif not args.comparar:
+        print(texto)
+    
+    if args.comparar:
+        with open(args.comparar, encoding="utf-8") as f:
+            anterior = json.load(f)
+        regressoes = comparar(resultado, anterior, args.tolerancia)
+        if regressoes:
+            print(f"\n✗ {len(regressoes)} cenário(s) mais lentos: {', '.join(regressoes)}")
+            return 1
+        print("\n✓ Nenhuma regressão acima da tolerância")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
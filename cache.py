@@ -0,0 +1,87 @@
+"""Cache local em memória para as respostas da API da Livraria"""
+import threading
+import time
+from collections import OrderedDict
+
+
+class CacheLocal:
+    """Cache com expiração (TTL), limite de itens (LRU) e revalidação por ETag"""
+    
+    def __init__(self, ttl=30, max_itens=256):
+        self.ttl = ttl
+        self.max_itens = max_itens
+        self._itens = OrderedDict()  # chave -> [expira_em, etag, dados]
+        self._trava = threading.Lock()
+        self.acertos = 0
+        self.revalidacoes = 0
+        self.falhas = 0
+    
+    def obter(self, chave):
+        """Retornar (dados, etag, fresco) ou (None, None, False) se ausente"""
+        with self._trava:
+            item = self._itens.get(chave)
+            if item is None:
+                self.falhas += 1
+                return None, None, False
+            self._itens.move_to_end(chave)
+            expira_em, etag, dados = item
+            fresco = time.monotonic() < expira_em
+            if fresco:
+                self.acertos += 1
+            else:
+                self.falhas += 1  # vira revalidação se o servidor responder 304
+            return _copiar(dados), etag, fresco
+    
+    def guardar(self, chave, dados, etag=None):
+        """Guardar dados no cache, descartando os menos usados se estiver cheio"""
+        with self._trava:
+            self._itens[chave] = [time.monotonic() + self.ttl, etag, _copiar(dados)]
+            self._itens.move_to_end(chave)
+            while len(self._itens) > self.max_itens:
+                self._itens.popitem(last=False)
+    
+    def renovar(self, chave):
+        """Estender a validade de um item confirmado pelo servidor (304)"""
+        with self._trava:
+            item = self._itens.get(chave)
+            if item is not None:
+                item[0] = time.monotonic() + self.ttl
+                self.revalidacoes += 1
+                self.falhas -= 1
+    
+    def invalidar(self, colecao, item_id=None):
+        """Remover a coleção (e consultas sobre ela) e, se informado, o item"""
+        base = f"/{colecao}"
+        with self._trava:
+            for chave in list(self._itens):
+                if chave == base or chave.startswith(base + "?"):
+                    del self._itens[chave]
+            if item_id is not None:
+                self._itens.pop(f"{base}/{item_id}", None)
+    
+    def descartar(self, chave):
+        """Remover um item só, sem tocar nas consultas da coleção"""
+        with self._trava:
+            self._itens.pop(chave, None)
+    
+    def limpar(self):
+        with self._trava:
+            self._itens.clear()
+    
+    def estatisticas(self):
+        """Contadores de acertos, revalidações (304) e falhas (download completo)"""
+        return {
+            "acertos": self.acertos,
+            "revalidacoes": self.revalidacoes,
+            "falhas": self.falhas,
+            "itens": len(self._itens),
+        }
+
+
+def _copiar(dados):
+    """Cópia rasa para que quem chama possa alterar o resultado sem sujar o cache"""
+    if isinstance(dados, list):
+        return list(dados)
+    if isinstance(dados, dict):
+        return dict(dados)
+    return dados
@@ -0,0 +1,420 @@
+"""Linha de comando não interativa da Livraria, para scripts e cron
+
+Uso:
+    python livraria.py livros list [--formato json|csv]
+    python livraria.py livros get 3
+    python livraria.py livros create --titulo "Dom Casmurro" --autor "Machado de Assis" \\
+        --preco 39.9 --estoque 10 --categoria Romance
+    python livraria.py livros update 3 --preco 35
+    python livraria.py livros delete 3
+    python livraria.py vendas list [--com-livros]
+    python livraria.py vendas create 3 2 "Maria"
+    python livraria.py search --autor machado --preco-max 50 --formato csv
+    python livraria.py chart vendas
+    python livraria.py report categoria --processos 4 --formato csv
+    python livraria.py report mes --arquivo vendas.jsonl
+    python livraria.py watch estoque --limite 3 --formato csv
+    python livraria.py watch vendidos -k 5 --dias 7
+    python livraria.py importar livros catalogo.csv
+    python livraria.py --max-idade 60 livros get 3
+    python livraria.py --offline vendas create 3 2 "Maria"
+
+As leituras saem da réplica local: com --max-idade N, uma réplica
+sincronizada há menos de N segundos responde sem ir ao servidor (e sem
+importar o requests). Os dados vão para a saída padrão; as mensagens de
+sucesso e erro, para a saída de erro. Código de saída 0 em caso de sucesso.
+
+Com --offline, um servidor fora do ar não derruba o comando: as leituras
+saem da réplica e as escritas ficam no diário .livraria_offline.jsonl, que
+é reenviado pelo primeiro comando com --offline que encontrar o servidor.
+Como depende da réplica, --offline é recusado com --sqlite, --sem-replica,
+importar, exportar e report.
+"""
+import argparse
+import sys
+
+FORMATOS = ("tabela", "json", "csv")
+
+
+# ==================== SAÍDA ====================
+
+def emitir(registros, campos, formato, tabela=None, saida=None):
+    """Escrever os registros no formato pedido; retorna quantos foram escritos"""
+    saida = saida or sys.stdout
+    if formato == "tabela":
+        return tabela(registros)
+    total = 0
+    if formato == "json":
+        import json
+        
+        saida.write("[")
+        for registro in registros:
+            saida.write(",\n  " if total else "\n  ")
+            saida.write(json.dumps(registro, ensure_ascii=False))
+            total += 1
+        saida.write("\n]\n" if total else "]\n")
+    else:
+        import csv
+        
+        escritor = None
+        for registro in registros:
+            if escritor is None:
+                # Sem lista de campos, as colunas são as do primeiro registro
+                escritor = csv.DictWriter(saida, campos or list(registro), extrasaction="ignore")
+                escritor.writeheader()
+            escritor.writerow(registro)
+            total += 1
+        if escritor is None and campos:
+            csv.DictWriter(saida, campos).writeheader()
+    return total
+
+
+def emitir_registro(registro, campos, formato, tabela):
+    """Um registro só: objeto JSON, uma linha CSV ou a tabela de uma linha"""
+    if formato == "json":
+        import json
+        
+        sys.stdout.write(json.dumps(registro, ensure_ascii=False, indent=2) + "\n")
+    else:
+        emitir([registro], campos, formato, tabela)
+
+
+def _mensagens():
+    """Mensagens ✓/✗ da LivrariaAPI na saída de erro, longe dos dados"""
+    from contextlib import redirect_stdout
+    return redirect_stdout(sys.stderr)
+
+
+# ==================== COMANDOS ====================
+
+CAMPOS_LIVRO = ["id", "titulo", "autor", "preco", "estoque", "categoria"]
+CAMPOS_VENDA = ["id", "livro_id", "titulo_livro", "quantidade", "preco_unitario",
+                "total", "cliente", "data"]
+
+
+def livros_list(api, args):
+    from renderizacao import tabela_livros
+    return _listar(api.iterar_livros(fluxo=True), CAMPOS_LIVRO, args.formato, tabela_livros)
+
+
+def livros_get(api, args):
+    from renderizacao import tabela_livros
+    with _mensagens():
+        livro = api.buscar_livro(args.id)
+    if livro is None:
+        return 1
+    emitir_registro(livro, CAMPOS_LIVRO, args.formato, tabela_livros)
+    return 0
+
+
+def livros_create(api, args):
+    from renderizacao import tabela_livros
+    with _mensagens():
+        livro = api.criar_livro(args.titulo, args.autor, args.preco, args.estoque, args.categoria)
+    if livro is None:
+        return 1
+    emitir_registro(livro, CAMPOS_LIVRO, args.formato, tabela_livros)
+    return 0
+
+
+def livros_update(api, args):
+    from renderizacao import tabela_livros
+    with _mensagens():
+        if not api.atualizar_livro(args.id, args.titulo, args.autor, args.preco, args.estoque,
+                                   args.categoria):
+            return 1
+        livro = api.buscar_livro(args.id)
+    if livro is not None:
+        emitir_registro(livro, CAMPOS_LIVRO, args.formato, tabela_livros)
+    return 0
+
+
+def livros_delete(api, args):
+    with _mensagens():
+        return 0 if api.deletar_livro(args.id) else 1
+
+
+def vendas_list(api, args):
+    from renderizacao import tabela_vendas
+    vendas = api.iterar_vendas_com_livros(fluxo=True) if args.com_livros else api.iterar_vendas(fluxo=True)
+    campos = CAMPOS_VENDA + ["autor", "categoria"] if args.com_livros else CAMPOS_VENDA
+    return _listar(vendas, campos, args.formato, tabela_vendas)
+
+
+def vendas_get(api, args):
+    from renderizacao import tabela_vendas
+    with _mensagens():
+        venda = api.buscar_venda(args.id)
+    if venda is None:
+        return 1
+    emitir_registro(venda, CAMPOS_VENDA, args.formato, tabela_vendas)
+    return 0
+
+
+def vendas_create(api, args):
+    from renderizacao import tabela_vendas
+    with _mensagens():
+        venda = api.criar_venda(args.livro_id, args.quantidade, args.cliente)
+    if venda is None:
+        return 1
+    emitir_registro(venda, CAMPOS_VENDA, args.formato, tabela_vendas)
+    return 0
+
+
+def vendas_update(api, args):
+    from renderizacao import tabela_vendas
+    with _mensagens():
+        if not api.atualizar_venda(args.id, args.quantidade, args.cliente):
+            return 1
+        venda = api.buscar_venda(args.id)
+    if venda is not None:
+        emitir_registro(venda, CAMPOS_VENDA, args.formato, tabela_vendas)
+    return 0
+
+
+def vendas_delete(api, args):
+    with _mensagens():
+        return 0 if api.deletar_venda(args.id) else 1
+
+
+def search(api, args):
+    from renderizacao import tabela_pesquisa
+    livros = api.iterar_pesquisa_livros(args.autor, args.categoria, args.preco_max,
+                                        titulo=args.titulo, fluxo=True)
+    return _listar(livros, CAMPOS_LIVRO, args.formato, tabela_pesquisa)
+
+
+def chart(api, args):
+    if args.formato == "tabela":
+        # Os gráficos exibem os próprios erros
+        if args.tipo == "categorias":
+            api.grafico_livros_por_categoria(fluxo=True)
+        else:
+            api.grafico_vendas_por_livro(fluxo=True)
+        return 0
+    return _listar(_dados_grafico(api, args.tipo), None, args.formato)
+
+
+def _dados_grafico(api, tipo):
+    """Linhas de um gráfico, para sair em JSON/CSV em vez de barras"""
+    from collections import Counter
+    from juncao import por_titulo, totais_por_livro
+    
+    if tipo == "categorias":
+        contagem = Counter(livro['categoria'] for livro in api.iterar_livros(fluxo=True))
+        for categoria, quantidade in contagem.most_common():
+            yield {"categoria": categoria, "livros": quantidade}
+    else:
+        totais = por_titulo(totais_por_livro(api.iterar_vendas_com_livros(fluxo=True)))
+        for titulo, total in sorted(totais.items(), key=lambda x: x[1], reverse=True):
+            yield {"livro": titulo, "total": round(total, 2)}
+
+
+def report(api, args):
+    from relatorios import gerar_relatorio
+    from renderizacao import desenhar_relatorio
+    
+    with _mensagens():
+        try:
+            linhas = gerar_relatorio(api, [args.agrupamento], args.arquivo, args.processos)
+        except Exception as e:
+            print(f"✗ Erro ao gerar relatório: {e}")
+            return 1
+    linhas = linhas[args.agrupamento]
+    if args.formato == "tabela":
+        desenhar_relatorio(linhas, args.agrupamento)
+    else:
+        emitir(linhas, None, args.formato)
+    return 0
+
+
+def watch(api, args):
+    from alertas import ARQUIVO_ALERTAS, DIAS, LIMITE_ESTOQUE, ListasVigiadas
+    from renderizacao import tabela_estoque_baixo, tabela_top_unidades
+    
+    dias = args.dias or DIAS
+    # Com réplica, as listas ficam gravadas e só as mudanças desde a última execução entram
+    alertas = ListasVigiadas(args.limite if args.limite is not None else LIMITE_ESTOQUE, dias=dias,
+                             caminho=ARQUIVO_ALERTAS if api.replica is not None else None)
+    api.alertas = alertas
+    api.registrar_observador(alertas)
+    try:
+        api._preparar_alertas()
+        alertas.salvar(api)
+    except Exception as e:
+        print(f"✗ Erro ao carregar as listas: {e}", file=sys.stderr)
+        return 1
+    if args.lista == "estoque":
+        emitir(alertas.estoque_baixo(args.k), None, args.formato, tabela_estoque_baixo)
+    else:
+        emitir(alertas.mais_vendidos(args.k or 10), None, args.formato,
+               lambda linhas: tabela_top_unidades(linhas, dias))
+    return 0
+
+
+def _listar(registros, campos, formato, tabela=None):
+    """Emitir uma lista vinda da API, transformando erros em mensagem e código 1"""
+    from contextlib import closing
+    from livraria import ErroAPI
+    
+    try:
+        with closing(iter(registros)) as registros:
+            emitir(registros, campos, formato, tabela)
+        return 0
+    except ErroAPI as e:
+        print(f"✗ Erro na consulta: {e.status}", file=sys.stderr)
+    except OSError as e:  # só falhas de rede (o requests também as deriva de OSError)
+        print(f"✗ Erro de conexão: {e}", file=sys.stderr)
+    return 1
+
+
+# ==================== ARGUMENTOS ====================
+
+def criar_parser():
+    import lote
+    
+    parser = argparse.ArgumentParser(prog="livraria.py",
+                                     description="Livraria pela linha de comando "
+                                                 "(sem argumentos: menu interativo)")
+    parser.add_argument("--url", default="http://localhost:3000", help="endereço do json-server")
+    parser.add_argument("--sqlite", help="arquivo SQLite no lugar do json-server")
+    parser.add_argument("--metricas", metavar="ARQUIVO",
+                        help="medir as requisições e gravar em ARQUIVO (.jsonl ou .prom)")
+    parser.add_argument("--replica", metavar="ARQUIVO", default=".livraria_replica.json",
+                        help="arquivo da réplica local usada nas leituras")
+    parser.add_argument("--sem-replica", action="store_true",
+                        help="ler sempre do servidor, sem réplica local")
+    parser.add_argument("--max-idade", type=float, default=1.0, metavar="SEGUNDOS",
+                        help="idade máxima da réplica antes de sincronizar com o servidor")
+    parser.add_argument("--offline", action="store_true",
+                        help="com o servidor fora do ar, ler da réplica e guardar as escritas "
+                             "para enviar depois (não vale com --sqlite, --sem-replica, "
+                             "importar, exportar e report)")
+    sub = parser.add_subparsers(dest="grupo", required=True)
+    
+    formato = argparse.ArgumentParser(add_help=False)
+    formato.add_argument("--formato", choices=FORMATOS, default="tabela")
+    
+    livros = sub.add_parser("livros", help="CRUD de livros").add_subparsers(dest="acao", required=True)
+    livros.add_parser("list", parents=[formato], help="listar livros")
+    livros.add_parser("get", parents=[formato], help="buscar um livro").add_argument("id")
+    criar = livros.add_parser("create", parents=[formato], help="criar livro")
+    criar.add_argument("--titulo", required=True)
+    criar.add_argument("--autor", required=True)
+    criar.add_argument("--preco", type=float, required=True)
+    criar.add_argument("--estoque", type=int, required=True)
+    criar.add_argument("--categoria", required=True)
+    alterar = livros.add_parser("update", parents=[formato], help="atualizar livro")
+    alterar.add_argument("id")
+    alterar.add_argument("--titulo")
+    alterar.add_argument("--autor")
+    alterar.add_argument("--preco", type=float)
+    alterar.add_argument("--estoque", type=int)
+    alterar.add_argument("--categoria")
+    livros.add_parser("delete", help="deletar livro").add_argument("id")
+    
+    vendas = sub.add_parser("vendas", help="CRUD de vendas").add_subparsers(dest="acao", required=True)
+    listar = vendas.add_parser("list", parents=[formato], help="listar vendas")
+    listar.add_argument("--com-livros", action="store_true",
+                        help="incluir título, autor e categoria atuais do livro")
+    vendas.add_parser("get", parents=[formato], help="buscar uma venda").add_argument("id")
+    criar = vendas.add_parser("create", parents=[formato], help="realizar venda")
+    criar.add_argument("livro_id")
+    criar.add_argument("quantidade", type=int)
+    criar.add_argument("cliente")
+    alterar = vendas.add_parser("update", parents=[formato], help="atualizar venda")
+    alterar.add_argument("id")
+    alterar.add_argument("--quantidade", type=int)
+    alterar.add_argument("--cliente")
+    vendas.add_parser("delete", help="cancelar venda e restaurar o estoque").add_argument("id")
+    
+    pesquisa = sub.add_parser("search", parents=[formato], help="pesquisa avançada de livros")
+    pesquisa.add_argument("--titulo")
+    pesquisa.add_argument("--autor")
+    pesquisa.add_argument("--categoria")
+    pesquisa.add_argument("--preco-max", type=float)
+    
+    grafico = sub.add_parser("chart", parents=[formato], help="gráficos (ou seus dados em JSON/CSV)")
+    grafico.add_argument("tipo", choices=["categorias", "vendas"])
+    
+    relatorio = sub.add_parser("report", parents=[formato],
+                               help="total vendido por livro, categoria, cliente ou mês")
+    relatorio.add_argument("agrupamento", choices=["livro", "categoria", "cliente", "mes"])
+    relatorio.add_argument("--processos", type=int, metavar="N",
+                           help="processos somando as partições (padrão: um por núcleo)")
+    relatorio.add_argument("--arquivo", metavar="VENDAS.jsonl",
+                           help="somar as vendas de um JSONL exportado em vez do servidor")
+    
+    vigia = sub.add_parser("watch", parents=[formato],
+                           help="livros com estoque baixo ou mais vendidos em unidades")
+    vigia.add_argument("lista", choices=["estoque", "vendidos"])
+    vigia.add_argument("-k", type=int, metavar="N", help="só os N primeiros")
+    vigia.add_argument("--limite", type=int, metavar="N",
+                       help="estoque de reposição (padrão: 5 unidades ou menos)")
+    vigia.add_argument("--dias", type=int, metavar="N", help="janela dos mais vendidos (padrão: 30)")
+    
+    lote.adicionar_comandos(sub)
+    return parser
+
+
+COMANDOS = {
+    ("livros", "list"): livros_list, ("livros", "get"): livros_get,
+    ("livros", "create"): livros_create, ("livros", "update"): livros_update,
+    ("livros", "delete"): livros_delete,
+    ("vendas", "list"): vendas_list, ("vendas", "get"): vendas_get,
+    ("vendas", "create"): vendas_create, ("vendas", "update"): vendas_update,
+    ("vendas", "delete"): vendas_delete,
+    ("search", None): search, ("chart", None): chart, ("report", None): report,
+    ("watch", None): watch,
+}
+
+
+def _sem_modo_offline(args):
+    """O que impede o --offline: ele precisa do json-server e da réplica local"""
+    if args.sqlite:
+        return "--sqlite"
+    if args.sem_replica:
+        return "--sem-replica"
+    if args.grupo in ("importar", "exportar", "report"):
+        return args.grupo
+    return None
+
+
+def main(argv=None):
+    parser = criar_parser()
+    args = parser.parse_args(argv)
+    if args.offline and _sem_modo_offline(args):
+        parser.error(f"--offline não pode ser usado com {_sem_modo_offline(args)}")
+    from livraria import LivrariaAPI, criar_backend
+    
+    metricas = replica = offline = None
+    if args.metricas:
+        from metricas import Metricas, criar_destino
+        metricas = Metricas([criar_destino(args.metricas)])
+    em_lote = args.grupo in ("importar", "exportar")
+    # O relatório lê as vendas por partições, cada processo com a própria conexão
+    if not (em_lote or args.grupo == "report" or args.sem_replica or args.sqlite):
+        from replica import Replica
+        replica = Replica(args.replica, intervalo=args.max_idade)
+        if args.offline:
+            from offline import ModoOffline
+            offline = ModoOffline()
+    backend = criar_backend(args.url, args.sqlite, pool=getattr(args, "trabalhadores", 1))
+    
+    with LivrariaAPI(base_url=args.url, backend=backend, metricas=metricas, replica=replica,
+                     offline=offline) as api:
+        try:
+            if em_lote:
+                import lote
+                args.acao = args.grupo  # lote.executar distingue pelo campo acao
+                return lote.executar(api, args)
+            return COMANDOS[(args.grupo, getattr(args, "acao", None))](api, args)
+        finally:
+            if metricas is not None:
+                from renderizacao import tabela_metricas
+                with _mensagens():
+                    tabela_metricas(metricas.resumo())
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,342 @@
+"""Cliente assíncrono da API da Livraria, para muitos terminais num só processo
+
+Requer o aiohttp (pip install aiohttp). Os métodos devolvem os dados em vez de
+imprimir; os erros chegam como as mesmas exceções da LivrariaAPI.
+"""
+import asyncio
+import random
+from urllib.parse import urlencode
+
+try:
+    import aiohttp
+except ImportError:  # dependência opcional
+    aiohttp = None
+
+from cache import CacheLocal
+from livraria import (BACKOFF, BACKOFF_CONFLITO, BASE_URL, CACHE_MAX_ITENS, CACHE_TTL,
+                      POOL_CONEXOES, POR_PAGINA, TENTATIVAS, TENTATIVAS_CONFLITO, TIMEOUT,
+                      ConflitoEstoque, ConflitoVersao, ErroAPI, EstoqueInsuficiente,
+                      EstoqueNaoRestaurado, RegistroNaoEncontrado, carimbo, filtro_pesquisa, ler_pagina, nova_venda,
+                      parametros_pesquisa)
+from juncao import cruzar
+from renderizacao import desenhar_grafico_categorias, desenhar_grafico_vendas
+
+
+class AsyncLivrariaAPI:
+    """Versão assíncrona da LivrariaAPI, com pool de conexões compartilhado"""
+    
+    def __init__(self, base_url=BASE_URL, pool=POOL_CONEXOES, timeout=TIMEOUT,
+                 tentativas=TENTATIVAS, backoff=BACKOFF,
+                 cache_ttl=CACHE_TTL, cache_max_itens=CACHE_MAX_ITENS):
+        if aiohttp is None:
+            raise ImportError("AsyncLivrariaAPI requer o aiohttp: pip install aiohttp")
+        self.base_url = base_url
+        self.pool = pool
+        self.timeout = aiohttp.ClientTimeout(sock_connect=timeout[0], sock_read=timeout[1])
+        self.tentativas = tentativas
+        self.backoff = backoff
+        self.cache = CacheLocal(cache_ttl, cache_max_itens)
+        self._sessao = None
+    
+    async def __aenter__(self):
+        return self
+    
+    async def __aexit__(self, *exc):
+        await self.fechar()
+    
+    async def fechar(self):
+        """Fechar as conexões abertas do pool"""
+        if self._sessao is not None:
+            await self._sessao.close()
+            self._sessao = None
+    
+    def _obter_sessao(self):
+        # Criada sob demanda: a sessão precisa de um event loop rodando
+        if self._sessao is None:
+            conector = aiohttp.TCPConnector(limit=self.pool, keepalive_timeout=30)
+            self._sessao = aiohttp.ClientSession(connector=conector, timeout=self.timeout)
+        return self._sessao
+    
+    async def _requisicao(self, metodo, caminho, params=None, json=None, headers=None):
+        """Enviar requisição; devolve (status, dados, etag)"""
+        if metodo in ("POST", "PUT", "PATCH") and isinstance(json, dict):
+            # Carimbada como na LivrariaAPI: as réplicas pedem só o que mudou
+            json = dict(json, atualizado_em=carimbo())
+        for tentativa in range(self.tentativas + 1):
+            try:
+                async with self._obter_sessao().request(
+                        metodo, f"{self.base_url}{caminho}", params=params,
+                        json=json, headers=headers) as response:
+                    dados = None
+                    if response.status in (200, 201):
+                        dados = await response.json(content_type=None)
+                    return response.status, dados, response.headers.get("ETag")
+            except aiohttp.ClientConnectorError:
+                # Só repete erros de conexão, como a sessão síncrona
+                if tentativa == self.tentativas:
+                    raise
+                await asyncio.sleep(self.backoff * 2 ** tentativa)
+    
+    async def _consultar(self, caminho, params=None):
+        """GET pelo cache local, revalidando com If-None-Match quando expirado"""
+        chave = caminho
+        if params:
+            chave += "?" + urlencode(sorted(params.items()), doseq=True)
+        dados, etag, fresco = self.cache.obter(chave)
+        if fresco:
+            return 200, dados
+        
+        headers = {"If-None-Match": etag} if etag else {}
+        status, novos, etag = await self._requisicao("GET", caminho, params=params, headers=headers)
+        if status == 304 and dados is not None:
+            self.cache.renovar(chave)
+            return 200, dados
+        if status == 200:
+            self.cache.guardar(chave, novos, etag)
+            return 200, novos
+        return status, None
+    
+    def _registrar_escrita(self, colecao, item_id=None, registro=None):
+        self.cache.invalidar(colecao, item_id)
+        if registro is not None and "id" in registro:
+            self.cache.guardar(f"/{colecao}/{registro['id']}", registro)
+    
+    async def _registrar_remocao(self, colecao, item_id):
+        """Deixar em /remocoes o aviso da remoção, para as réplicas dos outros clientes"""
+        try:
+            await self._requisicao("POST", "/remocoes",
+                                   json={"colecao": colecao, "registro_id": str(item_id)})
+        except Exception:
+            pass  # sem o aviso, as réplicas só percebem a remoção ao reconstruir
+    
+    async def _ler_para_alterar(self, colecao, item_id):
+        status, registro, etag = await self._requisicao("GET", f"/{colecao}/{item_id}")
+        if status == 404:
+            raise RegistroNaoEncontrado()
+        if status != 200:
+            raise ErroAPI(status)
+        return registro, etag
+    
+    async def _buscar(self, colecao, item_id):
+        status, registro = await self._consultar(f"/{colecao}/{item_id}")
+        if status == 404:
+            raise RegistroNaoEncontrado()
+        if status != 200:
+            raise ErroAPI(status)
+        return registro
+    
+    async def _listar(self, colecao):
+        status, registros = await self._consultar(f"/{colecao}")
+        if status != 200:
+            raise ErroAPI(status)
+        return registros
+    
+    async def _criar(self, colecao, registro):
+        status, registro, _ = await self._requisicao("POST", f"/{colecao}", json=registro)
+        if status != 201:
+            raise ErroAPI(status)
+        self._registrar_escrita(colecao, registro=registro)
+        return registro
+    
+    async def _deletar(self, colecao, item_id, headers=None):
+        status, _, _ = await self._requisicao("DELETE", f"/{colecao}/{item_id}", headers=headers)
+        if status == 404:
+            raise RegistroNaoEncontrado()
+        if status != 200:
+            raise ErroAPI(status)
+        self._registrar_escrita(colecao, item_id)
+        await self._registrar_remocao(colecao, item_id)
+    
+    # ==================== CRUD LIVROS ====================
+    
+    async def criar_livro(self, titulo, autor, preco, estoque, categoria):
+        """Criar um novo livro"""
+        return await self._criar("livros", {
+            "titulo": titulo,
+            "autor": autor,
+            "preco": preco,
+            "estoque": estoque,
+            "categoria": categoria,
+            "versao": 1
+        })
+    
+    async def listar_livros(self):
+        """Listar todos os livros"""
+        return await self._listar("livros")
+    
+    async def buscar_livro(self, livro_id):
+        """Buscar livro por ID"""
+        return await self._buscar("livros", livro_id)
+    
+    async def atualizar_livro(self, livro_id, titulo=None, autor=None, preco=None, estoque=None, categoria=None):
+        """Atualizar informações de um livro
+        
+        Se o livro mudou no meio: ConflitoEstoque quando a alteração inclui o
+        estoque; senão ConflitoVersao, o "alterado por outro usuário" da LivrariaAPI.
+        """
+        livro, etag = await self._ler_para_alterar("livros", livro_id)
+        if titulo: livro['titulo'] = titulo
+        if autor: livro['autor'] = autor
+        if preco is not None: livro['preco'] = preco
+        if estoque is not None: livro['estoque'] = estoque
+        if categoria: livro['categoria'] = categoria
+        livro['versao'] = livro.get('versao', 0) + 1
+        
+        headers = {"If-Match": etag} if etag else {}
+        status, livro, _ = await self._requisicao("PUT", f"/livros/{livro_id}", json=livro, headers=headers)
+        if status == 412:
+            if estoque is not None:
+                raise ConflitoEstoque(f"livro {livro_id}")
+            raise ConflitoVersao()
+        if status != 200:
+            raise ErroAPI(status)
+        self._registrar_escrita("livros", livro_id, livro)
+        return livro
+    
+    async def deletar_livro(self, livro_id):
+        """Deletar um livro"""
+        await self._deletar("livros", livro_id)
+    
+    # ==================== CRUD VENDAS ====================
+    
+    async def _ajustar_estoque(self, livro_id, delta, livro=None, etag=None):
+        """Somar delta ao estoque com PATCH condicional, repetindo em caso de conflito"""
+        for tentativa in range(TENTATIVAS_CONFLITO):
+            if livro is None:
+                livro, etag = await self._ler_para_alterar("livros", livro_id)
+            novo_estoque = livro['estoque'] + delta
+            if novo_estoque < 0:
+                raise EstoqueInsuficiente(livro['estoque'])
+            
+            headers = {"If-Match": etag} if etag else {}
+            campos = {"estoque": novo_estoque, "versao": livro.get('versao', 0) + 1}
+            status, livro, _ = await self._requisicao("PATCH", f"/livros/{livro_id}",
+                                                      json=campos, headers=headers)
+            if status == 200:
+                self._registrar_escrita("livros", livro_id, livro)
+                return livro
+            if status != 412:
+                raise ErroAPI(status)
+            
+            livro = None
+            await asyncio.sleep(random.uniform(0, BACKOFF_CONFLITO * 2 ** tentativa))
+        raise ConflitoEstoque(f"livro {livro_id}")
+    
+    async def criar_venda(self, livro_id, quantidade, cliente, data=None):
+        """Registrar a venda e baixar o estoque como uma transação"""
+        livro, etag = await self._ler_para_alterar("livros", livro_id)
+        if livro['estoque'] < quantidade:
+            raise EstoqueInsuficiente(livro['estoque'])
+        
+        venda = nova_venda(livro_id, livro, quantidade, cliente, data)
+        status, venda, _ = await self._requisicao("POST", "/vendas", json=venda)
+        if status != 201:
+            raise ErroAPI(status)
+        
+        try:
+            await self._ajustar_estoque(livro_id, -quantidade, livro, etag)
+        except Exception:
+            # Desfazer a venda: ela não pode ficar registrada sem a baixa no estoque
+            try:
+                await self._requisicao("DELETE", f"/vendas/{venda['id']}")
+                await self._registrar_remocao("vendas", venda['id'])
+            except Exception:
+                pass
+            raise
+        self._registrar_escrita("vendas", registro=venda)
+        return venda
+    
+    registrar_venda = criar_venda
+    
+    async def listar_vendas(self):
+        """Listar todas as vendas"""
+        return await self._listar("vendas")
+    
+    async def buscar_venda(self, venda_id):
+        """Buscar venda por ID"""
+        return await self._buscar("vendas", venda_id)
+    
+    async def atualizar_venda(self, venda_id, quantidade=None, cliente=None):
+        """Atualizar informações de uma venda"""
+        venda = await self.buscar_venda(venda_id)
+        if quantidade:
+            venda['quantidade'] = quantidade
+            venda['total'] = venda['preco_unitario'] * quantidade
+        if cliente:
+            venda['cliente'] = cliente
+        
+        status, venda, _ = await self._requisicao("PUT", f"/vendas/{venda_id}", json=venda)
+        if status != 200:
+            raise ErroAPI(status)
+        self._registrar_escrita("vendas", venda_id, venda)
+        return venda
+    
+    async def deletar_venda(self, venda_id):
+        """Deletar uma venda e restaurar estoque
+        
+        Se a venda sai do servidor mas o estoque não volta, a falha é só do
+        estoque: EstoqueNaoRestaurado, com a venda cancelada e a causa.
+        """
+        venda = await self.buscar_venda(venda_id)
+        await self._deletar("vendas", venda_id)
+        try:
+            await self._ajustar_estoque(venda['livro_id'], venda['quantidade'])
+        except RegistroNaoEncontrado:
+            pass  # livro já removido: não há estoque a restaurar
+        except Exception as e:
+            raise EstoqueNaoRestaurado(venda) from e
+        return venda
+    
+    # ==================== PESQUISA AVANÇADA ====================
+    
+    async def iterar_pesquisa_livros(self, autor=None, categoria=None, preco_max=None,
+                                     ordenar="titulo", por_pagina=POR_PAGINA, titulo=None):
+        """Gerar os livros que atendem aos filtros, buscando página por página"""
+        params = parametros_pesquisa(autor, categoria, preco_max, ordenar, por_pagina, titulo)
+        filtro = filtro_pesquisa(autor, categoria, preco_max, titulo)
+        
+        pagina, primeiro_id = 1, None
+        while True:
+            params["_page"] = pagina
+            status, dados = await self._consultar("/livros", params)
+            if status != 200:
+                raise ErroAPI(status)
+            
+            livros, ultima = ler_pagina(dados, por_pagina)
+            if livros and pagina > 1 and livros[0].get('id') == primeiro_id:
+                return  # a mesma página de novo: o servidor ignora _page
+            if pagina == 1 and livros:
+                primeiro_id = livros[0].get('id')
+            
+            for livro in livros:
+                if filtro(livro):
+                    yield livro
+            
+            if ultima:
+                return
+            pagina += 1
+    
+    async def pesquisa_avancada_livros(self, autor=None, categoria=None, preco_max=None, titulo=None):
+        """Pesquisar livros com múltiplos filtros"""
+        return [l async for l in self.iterar_pesquisa_livros(autor, categoria, preco_max, titulo=titulo)]
+    
+    # ==================== GRÁFICOS ====================
+    
+    async def dados_graficos(self):
+        """Buscar livros e vendas ao mesmo tempo; retorna (livros, vendas)"""
+        return await asyncio.gather(self.listar_livros(), self.listar_vendas())
+    
+    async def graficos(self):
+        """Desenhar os dois gráficos com uma única espera de rede"""
+        livros, vendas = await self.dados_graficos()
+        desenhar_grafico_categorias(livros)
+        desenhar_grafico_vendas(cruzar(vendas, livros))
+    
+    async def grafico_livros_por_categoria(self):
+        """Gráfico de livros agrupados por categoria"""
+        desenhar_grafico_categorias(await self.listar_livros())
+    
+    async def grafico_vendas_por_livro(self):
+        """Gráfico de vendas agrupadas por livro, com o título atual de cada um"""
+        livros, vendas = await self.dados_graficos()
+        desenhar_grafico_vendas(cruzar(vendas, livros))
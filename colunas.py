@@ -0,0 +1,310 @@
+"""Catálogo e vendas em colunas, para análises e filtros em grande volume
+
+Em vez de um dict por registro, cada campo vira uma coluna: números em
+arrays compactos (preco, estoque, quantidade, total) e textos repetidos
+codificados por dicionário (autor, categoria, livro_id...): a coluna guarda
+só o código, e o texto aparece uma vez. Filtros sobre texto são avaliados
+nos valores distintos e depois aplicados aos códigos.
+
+Com NumPy instalado, filtros e somas por grupo são vetorizados; sem ele,
+as mesmas operações rodam sobre o módulo array da biblioteca padrão.
+"""
+import sys
+from array import array
+from itertools import compress
+
+from juncao import por_titulo
+
+try:
+    import numpy as np
+except ImportError:  # NumPy é opcional
+    np = None
+
+
+def _finalizar(coluna):
+    """array da biblioteca padrão -> ndarray, sem cópia, quando há NumPy"""
+    if np is None:
+        return coluna
+    return np.frombuffer(coluna, dtype=coluna.typecode) if len(coluna) else np.array([], coluna.typecode)
+
+
+def _tamanho(coluna):
+    if np is not None and isinstance(coluna, np.ndarray):
+        return coluna.nbytes
+    if isinstance(coluna, array):
+        return coluna.itemsize * len(coluna)
+    return sys.getsizeof(coluna) + sum(sys.getsizeof(v) for v in coluna)
+
+
+class ColunaCodificada:
+    """Texto codificado por dicionário: cada valor distinto guardado uma vez"""
+    
+    def __init__(self):
+        self.valores = []   # código -> texto
+        self.codigos = {}   # texto -> código
+        self.dados = array("I")
+    
+    def __len__(self):
+        return len(self.dados)
+    
+    def __getitem__(self, posicao):
+        return self.valores[self.dados[posicao]]
+    
+    def codificar(self, valor):
+        codigo = self.codigos.get(valor)
+        if codigo is None:
+            codigo = self.codigos[valor] = len(self.valores)
+            self.valores.append(valor)
+        return codigo
+    
+    def adicionar(self, valor):
+        self.dados.append(self.codificar(valor))
+    
+    def finalizar(self):
+        self.dados = _finalizar(self.dados)
+    
+    def tabela(self, condicao):
+        """Para cada código, se o valor atende à condição (avaliada uma vez por valor)"""
+        marcados = [bool(condicao(valor)) for valor in self.valores]
+        return np.array(marcados, dtype=bool) if np is not None else marcados
+    
+    def memoria(self):
+        return _tamanho(self.dados) + _tamanho(self.valores) + sys.getsizeof(self.codigos)
+
+
+def _somar(codigos, pesos, grupos):
+    """Soma de pesos por código (group-by), em uma lista indexada pelo código"""
+    if np is not None:
+        return np.bincount(codigos, weights=pesos, minlength=grupos).tolist()
+    somas = [0.0] * grupos
+    for codigo, peso in zip(codigos, pesos):
+        somas[codigo] += peso
+    return somas
+
+
+def _filtrar(posicoes, coluna, aceita):
+    """Manter só as posições em que aceita(valor da coluna) — versão sem NumPy"""
+    if posicoes is None:  # primeira passada inteira em C: map + compress
+        return list(compress(range(len(coluna)), map(aceita, coluna)))
+    return [i for i in posicoes if aceita(coluna[i])]
+
+
+# ==================== LIVROS ====================
+
+class LivrosColunares:
+    """Catálogo em colunas: id, titulo, autor*, categoria*, preco, estoque (*codificadas)"""
+    
+    def __init__(self):
+        self.ids = []
+        self.titulos = []
+        self.autor = ColunaCodificada()
+        self.categoria = ColunaCodificada()
+        self.preco = array("d")
+        self.estoque = array("q")
+        self.posicao_por_id = {}
+    
+    def __len__(self):
+        return len(self.ids)
+    
+    @classmethod
+    def de_registros(cls, livros):
+        """Montar as colunas consumindo os livros um a um (aceita gerador)"""
+        colunas = cls()
+        for livro in livros:
+            colunas.posicao_por_id[str(livro['id'])] = len(colunas.ids)
+            colunas.ids.append(str(livro['id']))
+            colunas.titulos.append(livro['titulo'])
+            colunas.autor.adicionar(livro['autor'])
+            colunas.categoria.adicionar(livro['categoria'])
+            colunas.preco.append(livro['preco'])
+            colunas.estoque.append(livro['estoque'])
+        colunas.autor.finalizar()
+        colunas.categoria.finalizar()
+        colunas.preco = _finalizar(colunas.preco)
+        colunas.estoque = _finalizar(colunas.estoque)
+        return colunas
+    
+    @classmethod
+    def carregar(cls, api):
+        """Colunas a partir de /livros"""
+        return cls.de_registros(api.iterar_livros())
+    
+    def filtrar(self, autor=None, categoria=None, preco_max=None, titulo=None):
+        """Posições dos livros que atendem aos filtros da pesquisa avançada"""
+        autor = autor.lower() if autor else None
+        categoria = categoria.lower() if categoria else None
+        titulo = titulo.lower() if titulo else None
+        
+        if np is not None:
+            mascara = np.ones(len(self), dtype=bool)
+            if autor:
+                mascara &= self.autor.tabela(lambda v: autor in v.lower())[self.autor.dados]
+            if categoria:
+                mascara &= self.categoria.tabela(lambda v: categoria in v.lower())[self.categoria.dados]
+            if preco_max is not None:
+                mascara &= self.preco <= preco_max
+            posicoes = np.flatnonzero(mascara).tolist()
+            if titulo:
+                posicoes = [i for i in posicoes if titulo in self.titulos[i].lower()]
+            return posicoes
+        
+        # Sem NumPy: cada filtro reduz as posições que o próximo precisa olhar
+        posicoes = None
+        if autor:
+            tabela = self.autor.tabela(lambda v: autor in v.lower())
+            posicoes = _filtrar(posicoes, self.autor.dados, tabela.__getitem__)
+        if categoria:
+            tabela = self.categoria.tabela(lambda v: categoria in v.lower())
+            posicoes = _filtrar(posicoes, self.categoria.dados, tabela.__getitem__)
+        if preco_max is not None:
+            posicoes = _filtrar(posicoes, self.preco, float(preco_max).__ge__)
+        if titulo:
+            posicoes = _filtrar(posicoes, self.titulos, lambda t: titulo in t.lower())
+        return list(range(len(self))) if posicoes is None else posicoes
+    
+    def registro(self, posicao):
+        """O livro da posição, de volta como dict"""
+        return {"id": self.ids[posicao], "titulo": self.titulos[posicao],
+                "autor": self.autor[posicao], "preco": float(self.preco[posicao]),
+                "estoque": int(self.estoque[posicao]), "categoria": self.categoria[posicao]}
+    
+    def registros(self, posicoes):
+        return [self.registro(i) for i in posicoes]
+    
+    def contagem_categorias(self):
+        """Livros por categoria, no formato do gráfico de categorias"""
+        contagem = _somar(self.categoria.dados, [1] * len(self) if np is None else None,
+                          len(self.categoria.valores))
+        return {categoria: int(total) for categoria, total in zip(self.categoria.valores, contagem)
+                if total}
+    
+    def memoria(self):
+        """Bytes ocupados por coluna"""
+        return {
+            "id": _tamanho(self.ids), "titulo": _tamanho(self.titulos),
+            "autor": self.autor.memoria(), "categoria": self.categoria.memoria(),
+            "preco": _tamanho(self.preco), "estoque": _tamanho(self.estoque),
+            "indice_id": sys.getsizeof(self.posicao_por_id),
+        }
+
+
+# ==================== VENDAS ====================
+
+class VendasColunares:
+    """Vendas em colunas: livro_id*, titulo_livro*, cliente*, dia*, quantidade, total"""
+    
+    def __init__(self):
+        self.ids = []
+        self.livro_id = ColunaCodificada()
+        self.titulo_livro = ColunaCodificada()
+        self.cliente = ColunaCodificada()
+        self.dia = ColunaCodificada()        # "2025-11-20"
+        self.segundo = array("l")            # segundos desde 00:00 (-1 se a hora não veio no formato)
+        self.quantidade = array("q")
+        self.preco_unitario = array("d")
+        self.total = array("d")
+    
+    def __len__(self):
+        return len(self.ids)
+    
+    @classmethod
+    def de_registros(cls, vendas):
+        """Montar as colunas consumindo as vendas uma a uma (aceita gerador)"""
+        colunas = cls()
+        for venda in vendas:
+            data = venda['data']
+            colunas.ids.append(str(venda['id']))
+            colunas.livro_id.adicionar(str(venda['livro_id']))  # "1" e 1 são o mesmo livro
+            colunas.titulo_livro.adicionar(venda['titulo_livro'])
+            colunas.cliente.adicionar(venda['cliente'])
+            colunas.dia.adicionar(data[:10])
+            if len(data) == 19:
+                colunas.segundo.append(int(data[11:13]) * 3600 + int(data[14:16]) * 60 + int(data[17:19]))
+            else:
+                colunas.segundo.append(-1)
+            colunas.quantidade.append(venda['quantidade'])
+            colunas.preco_unitario.append(venda['preco_unitario'])
+            colunas.total.append(venda['total'])
+        for coluna in (colunas.livro_id, colunas.titulo_livro, colunas.cliente, colunas.dia):
+            coluna.finalizar()
+        for nome in ("segundo", "quantidade", "preco_unitario", "total"):
+            setattr(colunas, nome, _finalizar(getattr(colunas, nome)))
+        return colunas
+    
+    @classmethod
+    def carregar(cls, api):
+        """Colunas a partir de /vendas"""
+        return cls.de_registros(api.iterar_vendas())
+    
+    def somar_por(self, coluna, valores="total"):
+        """Soma de uma coluna numérica por valor de uma coluna codificada: {valor: soma}"""
+        codificada = getattr(self, coluna)
+        somas = _somar(codificada.dados, getattr(self, valores), len(codificada.valores))
+        return {valor: soma for valor, soma in zip(codificada.valores, somas) if soma}
+    
+    def totais_por_titulo(self, livros=None):
+        """Total vendido por título, no formato do gráfico de vendas por livro
+        
+        Com o catálogo em colunas, soma por livro_id e usa o título atual de
+        cada livro, em vez da cópia feita na venda.
+        """
+        if livros is None:
+            return self.somar_por("titulo_livro")
+        titulos, faltam = {}, set()
+        for codigo, livro_id in enumerate(self.livro_id.valores):
+            posicao = livros.posicao_por_id.get(livro_id)
+            if posicao is None:
+                faltam.add(codigo)
+            else:
+                titulos[livro_id] = livros.titulos[posicao]
+        # Livros que já não estão no catálogo ficam com o título copiado na venda
+        for codigo, titulo in zip(self.livro_id.dados, self.titulo_livro.dados):
+            if not faltam:
+                break
+            if codigo in faltam:
+                faltam.discard(codigo)
+                titulos[self.livro_id.valores[codigo]] = self.titulo_livro.valores[titulo]
+        return por_titulo({livro_id: (titulos[livro_id], total)
+                           for livro_id, total in self.somar_por("livro_id").items()})
+    
+    def totais_por_mes(self):
+        """Total por mês, somando os totais diários (um por dia distinto)"""
+        meses = {}
+        for dia, total in self.somar_por("dia").items():
+            meses[dia[:7]] = meses.get(dia[:7], 0.0) + total
+        return meses
+    
+    def totais_por_categoria(self, livros):
+        """Total por categoria, cruzando livro_id com o catálogo em colunas"""
+        # Categoria de cada código de livro_id: o cruzamento é feito uma vez por livro
+        sem_categoria = len(livros.categoria.valores)
+        mapa = [livros.categoria.dados[livros.posicao_por_id[l]] if l in livros.posicao_por_id
+                else sem_categoria for l in self.livro_id.valores]
+        nomes = livros.categoria.valores + ["Sem categoria"]
+        if np is not None:
+            categorias = np.array(mapa, dtype=np.int64)[self.livro_id.dados]
+        else:
+            categorias = [mapa[codigo] for codigo in self.livro_id.dados]
+        somas = _somar(categorias, self.total, len(nomes))
+        return {nome: soma for nome, soma in zip(nomes, somas) if soma}
+    
+    def registro(self, posicao):
+        """A venda da posição, de volta como dict"""
+        segundo = int(self.segundo[posicao])
+        data = self.dia[posicao]
+        if segundo >= 0:
+            data += f" {segundo // 3600:02d}:{segundo // 60 % 60:02d}:{segundo % 60:02d}"
+        return {"id": self.ids[posicao], "livro_id": self.livro_id[posicao],
+                "titulo_livro": self.titulo_livro[posicao], "quantidade": int(self.quantidade[posicao]),
+                "preco_unitario": float(self.preco_unitario[posicao]),
+                "total": float(self.total[posicao]), "cliente": self.cliente[posicao], "data": data}
+    
+    def memoria(self):
+        """Bytes ocupados por coluna"""
+        return {
+            "id": _tamanho(self.ids), "livro_id": self.livro_id.memoria(),
+            "titulo_livro": self.titulo_livro.memoria(), "cliente": self.cliente.memoria(),
+            "dia": self.dia.memoria(), "segundo": _tamanho(self.segundo),
+            "quantidade": _tamanho(self.quantidade), "preco_unitario": _tamanho(self.preco_unitario),
+            "total": _tamanho(self.total),
+        }
@@ -0,0 +1,146 @@
+"""Leitura em fluxo das listas JSON devolvidas pela API
+
+Em vez de esperar a resposta inteira e montar a lista toda com json(), os
+bytes são decodificados conforme chegam e cada registro é entregue assim que
+termina de chegar. Só o registro atual e o pedaço da resposta ainda não lido
+ficam em memória, seja qual for o tamanho da coleção.
+
+Entende a lista pura do json-server 0.x ([...]) e a página do json-server 1.x
+({"data": [...], "next": ...}).
+"""
+import codecs
+import json
+import re
+
+PEDACO = 64 * 1024  # bytes lidos da conexão por vez
+
+_decodificador = json.JSONDecoder()
+_espacos = re.compile(r"[ \t\r\n]*")
+
+
+class LeitorFluxo:
+    """Texto JSON chegando em pedaços de bytes, lido valor a valor"""
+    
+    def __init__(self, pedacos):
+        self._pedacos = iter(pedacos)
+        self._utf8 = codecs.getincrementaldecoder("utf-8")()
+        self._texto = ""
+        self._pos = 0
+        self._fim = False
+        self.bytes_lidos = 0
+    
+    def _carregar(self):
+        """Acrescentar o próximo pedaço ao que falta ler; False se a resposta acabou"""
+        if self._fim:
+            return False
+        pedaco = next(self._pedacos, None)
+        if pedaco is None:
+            self._fim = True
+            novo = self._utf8.decode(b"", final=True)
+        else:
+            self.bytes_lidos += len(pedaco)
+            novo = self._utf8.decode(pedaco)
+        # O que já foi lido é descartado: o texto guardado não passa de um pedaço
+        self._texto = self._texto[self._pos:] + novo
+        self._pos = 0
+        return True
+    
+    def proximo_caractere(self):
+        """Próximo caractere depois dos espaços, sem consumi-lo ('' no fim da resposta)"""
+        while True:
+            self._pos = _espacos.match(self._texto, self._pos).end()
+            if self._pos < len(self._texto):
+                return self._texto[self._pos]
+            if not self._carregar():
+                return ""
+    
+    def consumir(self, esperado):
+        caractere = self.proximo_caractere()
+        if caractere != esperado:
+            raise ValueError(f"JSON inválido: esperado '{esperado}', veio '{caractere or 'fim'}'")
+        self._pos += 1
+    
+    def valor(self):
+        """Decodificar o próximo valor JSON completo"""
+        self.proximo_caractere()
+        while True:
+            try:
+                valor, fim = _decodificador.raw_decode(self._texto, self._pos)
+            except json.JSONDecodeError:
+                if not self._carregar():  # incompleto: esperar mais bytes
+                    raise
+                continue
+            # Um número cortado no fim do pedaço ("12" de "12.5") parece completo
+            numero = isinstance(valor, (int, float)) and not isinstance(valor, bool)
+            if numero and (fim == len(self._texto) or self._texto[fim] in ".eE0123456789") \
+                    and self._carregar():
+                continue
+            self._pos = fim
+            return valor
+    
+    def elementos(self):
+        """Gerar os elementos do array que começa na posição atual"""
+        self.consumir("[")
+        if self.proximo_caractere() == "]":
+            self._pos += 1
+            return
+        decodificar, espacos = _decodificador.scan_once, _espacos.match  # raw_decode sem o invólucro
+        while True:
+            # Tudo o que já chegou completo é decodificado num laço só, sem voltar ao
+            # gerador a cada registro; o que ficar pela metade espera o próximo pedaço
+            texto, lote = self._texto, []
+            inicio = espacos(texto, self._pos).end()
+            try:
+                while True:
+                    valor, fim = decodificar(texto, inicio)
+                    pos = espacos(texto, fim).end()
+                    separador = texto[pos]
+                    if separador == ",":
+                        lote.append(valor)
+                        inicio = espacos(texto, pos + 1).end()
+                    elif separador == "]":
+                        lote.append(valor)
+                        self._pos = pos + 1
+                        yield from lote
+                        return
+                    elif separador in ".eE+-0123456789" and not self._fim:
+                        break  # número cortado no fim do pedaço ("12." de "12.5")
+                    else:
+                        raise ValueError(f"JSON inválido: esperado ',' ou ']', veio '{separador}'")
+            except (StopIteration, json.JSONDecodeError, IndexError):
+                pass  # registro incompleto
+            self._pos = inicio
+            yield from lote
+            if not self._carregar():
+                raise ValueError("JSON inválido: a resposta terminou no meio da lista")
+
+
+def registros(pedacos, extras=None):
+    """Gerar um a um os registros de [...] ou de {"data": [...]}
+    
+    Os demais campos da página (next, pages...) vão para o dict extras, que
+    fica completo quando o gerador termina.
+    """
+    leitor = LeitorFluxo(pedacos)
+    if leitor.proximo_caractere() == "[":
+        yield from leitor.elementos()
+        return
+    
+    leitor.consumir("{")
+    if leitor.proximo_caractere() == "}":
+        return
+    while True:
+        chave = leitor.valor()
+        leitor.consumir(":")
+        if chave == "data" and leitor.proximo_caractere() == "[":
+            yield from leitor.elementos()
+        else:
+            valor = leitor.valor()
+            if extras is not None:
+                extras[chave] = valor
+        separador = leitor.proximo_caractere()
+        leitor._pos += 1
+        if separador == "}":
+            return
+        if separador != ",":
+            raise ValueError(f"JSON inválido: esperado ',' ou '}}', veio '{separador or 'fim'}'")
@@ -0,0 +1,315 @@
+"""Índice local de livros para a pesquisa avançada
+
+Os livros de /livros são indexados uma vez: título, autor e categoria viram
+palavras sem acento e sem maiúsculas ("Ficção" -> "ficcao"), com busca por
+prefixo; preço e estoque ficam em listas ordenadas para filtros de faixa.
+As escritas da própria LivrariaAPI (e, com réplica, as dos outros clientes)
+chegam pelos avisos de registro salvo/removido e atualizam o índice sem
+recarregar tudo. Sem réplica, nada avisa das escritas dos outros clientes:
+o índice é recarregado na primeira pesquisa depois de `validade` segundos.
+"""
+import re
+import threading
+import time
+import unicodedata
+from bisect import bisect_left, insort
+from collections import defaultdict
+from itertools import chain, islice
+from operator import itemgetter
+
+CAMPOS_TEXTO = ("titulo", "autor", "categoria")
+CAMPOS_FAIXA = ("preco", "estoque")
+CONVERSAO = 20  # montar um conjunto em C custa ~1/20 de conferir um livro em Python
+# Segundos até recarregar o índice quando não há réplica que avise das mudanças; acima
+# do CACHE_TTL da LivrariaAPI, para a nova carga revalidar /livros no servidor
+VALIDADE = 60.0
+
+
+def normalizar(texto):
+    """Remover acentos e maiúsculas: 'História' -> 'historia'"""
+    decomposto = unicodedata.normalize("NFKD", str(texto))
+    return "".join(c for c in decomposto if not unicodedata.combining(c)).casefold()
+
+
+def palavras(texto):
+    return re.findall(r"\w+", normalizar(texto)) if texto else []
+
+
+def _na_faixa(valor, minimo, maximo):
+    return valor is not None and (minimo is None or valor >= minimo) and (maximo is None or valor <= maximo)
+
+
+def _chave(livro_id):
+    return str(livro_id)
+
+
+class _Maior:
+    """Maior que qualquer valor: limite superior de faixas em tuplas (valor, id)"""
+    
+    def __lt__(self, outro):
+        return False
+    
+    def __gt__(self, outro):
+        return True
+
+
+MAIOR = _Maior()
+
+
+class ListaOrdenada:
+    """Lista sempre em ordem, dividida em blocos: inserir e remover movem só um bloco"""
+    
+    CARGA = 1000
+    
+    def __init__(self, itens=()):
+        itens = sorted(itens)
+        self._blocos = [itens[i:i + self.CARGA] for i in range(0, len(itens), self.CARGA)]
+        self._maximos = [bloco[-1] for bloco in self._blocos]
+        self._tamanho = len(itens)
+    
+    def __len__(self):
+        return self._tamanho
+    
+    def adicionar(self, item):
+        if not self._blocos:
+            self._blocos, self._maximos = [[item]], [item]
+            self._tamanho = 1
+            return
+        i = min(bisect_left(self._maximos, item), len(self._blocos) - 1)
+        bloco = self._blocos[i]
+        insort(bloco, item)
+        self._maximos[i] = bloco[-1]
+        self._tamanho += 1
+        if len(bloco) > 2 * self.CARGA:
+            self._blocos[i:i + 1] = [bloco[:self.CARGA], bloco[self.CARGA:]]
+            self._maximos[i:i + 1] = [bloco[self.CARGA - 1], bloco[-1]]
+    
+    def remover(self, item):
+        i = bisect_left(self._maximos, item)
+        if i == len(self._blocos):
+            return
+        bloco = self._blocos[i]
+        j = bisect_left(bloco, item)
+        if j == len(bloco) or bloco[j] != item:
+            return
+        del bloco[j]
+        self._tamanho -= 1
+        if bloco:
+            self._maximos[i] = bloco[-1]
+        else:
+            del self._blocos[i]
+            del self._maximos[i]
+    
+    def posicao(self, item):
+        """Quantos itens são menores que item"""
+        i = bisect_left(self._maximos, item)
+        anteriores = sum(len(bloco) for bloco in self._blocos[:i])
+        if i == len(self._blocos):
+            return anteriores
+        return anteriores + bisect_left(self._blocos[i], item)
+    
+    def fatia(self, inicio, fim):
+        """Itens com inicio <= item < fim, percorridos sem laço em Python"""
+        i = bisect_left(self._maximos, inicio)
+        j = bisect_left(self._maximos, fim)
+        if i == len(self._blocos):
+            return iter(())
+        primeiro = bisect_left(self._blocos[i], inicio)
+        if i == j:
+            return iter(self._blocos[i][primeiro:bisect_left(self._blocos[i], fim)])
+        partes = [self._blocos[i][primeiro:]] + self._blocos[i + 1:j]
+        if j < len(self._blocos):
+            partes.append(self._blocos[j][:bisect_left(self._blocos[j], fim)])
+        return chain.from_iterable(partes)
+    
+    def primeiros(self, k=None):
+        """Os k menores itens em ordem (sem k, todos), percorrendo só os blocos necessários"""
+        return islice(chain.from_iterable(self._blocos), k)
+    
+    def a_partir(self, inicio):
+        """Gerar em ordem os itens maiores ou iguais a inicio"""
+        i = bisect_left(self._maximos, inicio)
+        if i == len(self._blocos):
+            return
+        bloco = self._blocos[i]
+        yield from bloco[bisect_left(bloco, inicio):]
+        for bloco in self._blocos[i + 1:]:
+            yield from bloco
+
+
+class IndiceOrdenado:
+    """Pares (valor, id) em ordem, para filtros de faixa"""
+    
+    def __init__(self, pares=()):
+        self.pares = ListaOrdenada(pares)
+    
+    def __len__(self):
+        return len(self.pares)
+    
+    def inserir(self, valor, livro_id):
+        self.pares.adicionar((valor, livro_id))
+    
+    def remover(self, valor, livro_id):
+        self.pares.remover((valor, livro_id))
+    
+    def contar(self, minimo=None, maximo=None):
+        """Quantos livros há na faixa, sem percorrê-la"""
+        fim = len(self.pares) if maximo is None else self.pares.posicao((maximo, MAIOR))
+        inicio = 0 if minimo is None else self.pares.posicao((minimo,))
+        return max(0, fim - inicio)
+    
+    def ids(self, minimo=None, maximo=None):
+        """Conjunto dos ids com valor dentro da faixa"""
+        inicio = (float("-inf"),) if minimo is None else (minimo,)
+        fim = (float("inf"), MAIOR) if maximo is None else (maximo, MAIOR)
+        return set(map(itemgetter(1), self.pares.fatia(inicio, fim)))
+
+
+class IndiceLivros:
+    """Índice invertido de título/autor/categoria e faixas de preço/estoque"""
+    
+    def __init__(self, validade=VALIDADE):
+        self.validade = validade
+        self._trava = threading.RLock()
+        self._zerar()
+    
+    def _zerar(self):
+        self.livros = {}  # id -> livro
+        self.termos = {campo: defaultdict(set) for campo in CAMPOS_TEXTO}  # palavra -> ids
+        self.vocabulario = {campo: ListaOrdenada() for campo in CAMPOS_TEXTO}  # para prefixos
+        self.faixas = {campo: IndiceOrdenado() for campo in CAMPOS_FAIXA}
+        self.carregado = False
+        self.carregado_em = 0.0  # time.monotonic() da última carga
+    
+    # ==================== CONSTRUÇÃO ====================
+    
+    def carregar(self, api_ou_livros):
+        """Indexar todos os livros (da API ou de uma lista), descartando o índice anterior"""
+        livros = api_ou_livros.iterar_livros() if hasattr(api_ou_livros, "iterar_livros") else api_ou_livros
+        with self._trava:
+            self._zerar()
+            for livro in livros:
+                livro_id = _chave(livro['id'])
+                self.livros[livro_id] = livro
+                for campo in CAMPOS_TEXTO:
+                    for palavra in palavras(livro.get(campo)):
+                        self.termos[campo][palavra].add(livro_id)
+            # Listas ordenadas montadas de uma vez, com um único sort
+            for campo in CAMPOS_TEXTO:
+                self.vocabulario[campo] = ListaOrdenada(self.termos[campo])
+            for campo in CAMPOS_FAIXA:
+                self.faixas[campo] = IndiceOrdenado(
+                    (l[campo], i) for i, l in self.livros.items() if l.get(campo) is not None)
+            self.carregado = True
+            self.carregado_em = time.monotonic()
+    
+    def vencido(self):
+        """Carregado há mais de `validade` segundos (None: nunca vence)"""
+        return (self.carregado and self.validade is not None
+                and time.monotonic() - self.carregado_em >= self.validade)
+    
+    def preparar(self, api, renovar=False):
+        """Carregar na primeira pesquisa; com renovar, também quando vencido"""
+        if not self.carregado or (renovar and self.vencido()):
+            self.carregar(api)
+    
+    def _indexar(self, livro_id, livro):
+        self.livros[livro_id] = livro
+        for campo in CAMPOS_TEXTO:
+            for palavra in set(palavras(livro.get(campo))):
+                ids = self.termos[campo][palavra]
+                if not ids:
+                    self.vocabulario[campo].adicionar(palavra)
+                ids.add(livro_id)
+        for campo in CAMPOS_FAIXA:
+            if livro.get(campo) is not None:
+                self.faixas[campo].inserir(livro[campo], livro_id)
+    
+    def _desindexar(self, livro_id):
+        livro = self.livros.pop(livro_id, None)
+        if livro is None:
+            return
+        for campo in CAMPOS_TEXTO:
+            for palavra in set(palavras(livro.get(campo))):
+                ids = self.termos[campo].get(palavra)
+                if ids is None:
+                    continue
+                ids.discard(livro_id)
+                if not ids:
+                    del self.termos[campo][palavra]
+                    self.vocabulario[campo].remover(palavra)
+        for campo in CAMPOS_FAIXA:
+            if livro.get(campo) is not None:
+                self.faixas[campo].remover(livro[campo], livro_id)
+    
+    # ==================== AVISOS DA LIVRARIAAPI ====================
+    
+    def registro_salvo(self, colecao, registro, anterior=None):
+        if colecao != "livros" or not self.carregado:
+            return
+        with self._trava:
+            livro_id = _chave(registro['id'])
+            self._desindexar(livro_id)
+            self._indexar(livro_id, dict(registro))
+    
+    def registro_removido(self, colecao, item_id, anterior=None):
+        if colecao != "livros" or not self.carregado:
+            return
+        with self._trava:
+            self._desindexar(_chave(item_id))
+    
+    # ==================== CONSULTAS ====================
+    
+    def _ids_prefixo(self, campo, prefixo):
+        """Livros com alguma palavra do campo começando pelo prefixo (só para leitura)"""
+        encontrados = []
+        for palavra in self.vocabulario[campo].a_partir(prefixo):
+            if not palavra.startswith(prefixo):
+                break
+            encontrados.append(self.termos[campo][palavra])
+        if len(encontrados) == 1:
+            return encontrados[0]  # uma palavra só: o próprio conjunto, sem cópia
+        return set().union(*encontrados)
+    
+    def buscar(self, texto=None, titulo=None, autor=None, categoria=None,
+               preco_min=None, preco_max=None, estoque_min=None, estoque_max=None,
+               ordenar="titulo"):
+        """Livros cujas palavras começam pelos termos dados e dentro das faixas
+        
+        Cada palavra da consulta precisa casar (E); `texto` procura nos três campos.
+        """
+        with self._trava:
+            criterios = []  # (tamanho, ids, faixa)
+            for campo, consulta in (("titulo", titulo), ("autor", autor), ("categoria", categoria)):
+                for prefixo in palavras(consulta):
+                    ids = self._ids_prefixo(campo, prefixo)
+                    criterios.append((len(ids), ids, None))
+            for prefixo in palavras(texto):
+                ids = set().union(*(self._ids_prefixo(c, prefixo) for c in CAMPOS_TEXTO))
+                criterios.append((len(ids), ids, None))
+            
+            for campo, minimo, maximo in (("preco", preco_min, preco_max),
+                                          ("estoque", estoque_min, estoque_max)):
+                if minimo is not None or maximo is not None:
+                    criterios.append((self.faixas[campo].contar(minimo, maximo), None,
+                                      (campo, minimo, maximo)))
+            
+            # Começa pelo critério mais seletivo e vai cortando com interseções de conjuntos
+            candidatos = None
+            for tamanho, ids, faixa in sorted(criterios, key=itemgetter(0)):
+                if faixa and candidatos is not None and tamanho > CONVERSAO * len(candidatos):
+                    # Faixa muito maior que os candidatos: conferir livro a livro sai mais barato
+                    campo, minimo, maximo = faixa
+                    candidatos = {i for i in candidatos
+                                  if _na_faixa(self.livros[i].get(campo), minimo, maximo)}
+                    continue
+                if faixa:
+                    ids = self.faixas[faixa[0]].ids(faixa[1], faixa[2])
+                candidatos = ids if candidatos is None else candidatos & ids
+            if candidatos is None:
+                candidatos = self.livros
+            resultado = [dict(self.livros[livro_id]) for livro_id in candidatos]
+        
+        if ordenar:
+            resultado.sort(key=lambda l: (l.get(ordenar) is None, l.get(ordenar)))
+        return resultado
@@ -0,0 +1,135 @@
+"""Vendas cruzadas com o livro atual de cada uma, sem uma consulta por venda
+
+Cada venda guarda uma cópia do título (titulo_livro) feita na hora da
+venda, que fica velha quando o livro é renomeado, e não traz autor nem
+categoria. Aqui os livro_id de um lote de vendas são resolvidos de uma vez:
+pela réplica local, se houver, ou por um mapa de livros por id que busca
+só os que faltam, numa consulta para vários ids (/livros?id=1&id=2...).
+
+Os relatórios agrupam por livro_id e só na exibição trocam o id pelo
+título atual.
+"""
+import threading
+import time
+from itertools import islice
+
+# Campo do livro -> campo preenchido na venda
+CAMPOS = {"titulo": "titulo_livro", "autor": "autor", "categoria": "categoria"}
+IDS_POR_CONSULTA = 100   # mantém a URL curta
+VENDAS_POR_LOTE = 1000   # vendas resolvidas por vez, numa leitura em fluxo
+TTL = 30                 # segundos até buscar o livro de novo
+
+
+def _chave(livro_id):
+    # O db.json mistura livro_id numérico e texto ("1" e 1 são o mesmo livro)
+    return str(livro_id)
+
+
+class MapaLivros:
+    """Livros por id, buscados em lote só quando faltam ou passaram de ttl segundos"""
+    
+    def __init__(self, ttl=TTL):
+        self.ttl = ttl
+        self._livros = {}  # id -> (livro ou None se não existe, time.monotonic() da leitura)
+        self._trava = threading.Lock()
+        self.consultas = 0
+    
+    def resolver(self, api, ids):
+        """{id: livro} dos ids pedidos; ids sem livro no servidor ficam de fora"""
+        from livraria import ErroAPI
+        
+        agora = time.monotonic()
+        achados, faltam = {}, []
+        with self._trava:
+            for livro_id in dict.fromkeys(map(_chave, ids)):
+                guardado = self._livros.get(livro_id)
+                if guardado is not None and agora - guardado[1] < self.ttl:
+                    if guardado[0] is not None:
+                        achados[livro_id] = guardado[0]
+                else:
+                    faltam.append(livro_id)
+        
+        for inicio in range(0, len(faltam), IDS_POR_CONSULTA):
+            parte = faltam[inicio:inicio + IDS_POR_CONSULTA]
+            response = api._requisicao("GET", "/livros", params={"id": parte})
+            if response.status_code != 200:
+                raise ErroAPI(response.status_code)
+            self.consultas += 1
+            # Um servidor que ignore o filtro manda o catálogo: serve do mesmo jeito
+            livros = {_chave(livro['id']): livro for livro in response.json()}
+            with self._trava:
+                for livro_id, livro in livros.items():
+                    self._livros[livro_id] = (livro, agora)
+                for livro_id in parte:
+                    if livro_id in livros:
+                        achados[livro_id] = livros[livro_id]
+                    else:
+                        self._livros[livro_id] = (None, agora)  # removido: não perguntar de novo
+        return achados
+    
+    def limpar(self):
+        with self._trava:
+            self._livros.clear()
+    
+    # ==================== AVISOS DA LIVRARIAAPI ====================
+    
+    def registro_salvo(self, colecao, registro, anterior=None):
+        if colecao == "livros":
+            with self._trava:
+                self._livros[_chave(registro['id'])] = (registro, time.monotonic())
+    
+    def registro_removido(self, colecao, item_id, anterior=None):
+        if colecao == "livros":
+            with self._trava:
+                self._livros[_chave(item_id)] = (None, time.monotonic())
+
+
+def enriquecer(venda, livro):
+    """A venda com título, autor e categoria atuais do livro (sem livro, fica como está)"""
+    if livro is None:
+        return venda
+    return dict(venda, **{campo: livro.get(origem) for origem, campo in CAMPOS.items()})
+
+
+def cruzar(vendas, livros):
+    """Gerar as vendas enriquecidas a partir do catálogo inteiro já em mãos"""
+    por_id = {_chave(livro['id']): livro for livro in livros}
+    for venda in vendas:
+        yield enriquecer(venda, por_id.get(_chave(venda['livro_id'])))
+
+
+def juntar_vendas(api, vendas, lote=VENDAS_POR_LOTE):
+    """Gerar as vendas enriquecidas, resolvendo os livros de `lote` vendas por vez"""
+    vendas = iter(vendas)
+    while True:
+        parte = list(islice(vendas, lote))
+        if not parte:
+            return
+        livros = api.livros_por_ids(venda['livro_id'] for venda in parte)
+        for venda in parte:
+            yield enriquecer(venda, livros.get(_chave(venda['livro_id'])))
+
+
+def totais_por_livro(vendas):
+    """{livro_id: [título, total]}, com o título da primeira venda de cada livro"""
+    totais = {}
+    for venda in vendas:
+        livro_id = _chave(venda['livro_id'])
+        if livro_id in totais:
+            totais[livro_id][1] += venda['total']
+        else:
+            totais[livro_id] = [venda['titulo_livro'], venda['total']]
+    return totais
+
+
+def por_titulo(totais):
+    """{título: total} a partir de {livro_id: (título, total)}, para os gráficos
+    
+    Livros diferentes com o mesmo título não são somados: cada um leva o id.
+    """
+    repetidos = set()
+    vistos = set()
+    for titulo, _ in totais.values():
+        (repetidos if titulo in vistos else vistos).add(titulo)
+    return {(f"{titulo} (#{livro_id})" if titulo in repetidos else titulo): total
+            for livro_id, (titulo, total) in totais.items()}
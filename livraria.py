@@ -1,67 +1,475 @@
-import requests
-import json
+import os
+import random
+import re
+import sys
+import time
+import uuid
+from contextlib import closing, nullcontext
 from datetime import datetime
-from collections import Counter
+from urllib.parse import urlencode
+
+from backends import (BACKOFF, POOL_CONEXOES, TENTATIVAS, TIMEOUT, BackendJsonServer,
+                      BackendSQLite, ServidorIndisponivel)
+from cache import CacheLocal
+from fluxo import PEDACO, registros
+from juncao import MapaLivros, juntar_vendas
+from renderizacao import (Renderizador, desenhar_contagem_categorias, desenhar_grafico_categorias,
+                          desenhar_grafico_vendas, desenhar_relatorio, desenhar_totais_por_livro,
+                          tabela_estoque_baixo, tabela_livros, tabela_mais_vendidos, tabela_metricas,
+                          tabela_pesquisa, tabela_top_unidades, tabela_vendas)
 
 BASE_URL = "http://localhost:3000"
 
+# Com LIVRARIA_SQLITE=arquivo.sqlite os dados ficam no SQLite, sem json-server
+VARIAVEL_SQLITE = "LIVRARIA_SQLITE"
+
+# Configuração padrão do cache local
+CACHE_TTL = 30  # segundos até revalidar com o servidor
+CACHE_MAX_ITENS = 256
+
+# Tamanho da página nas pesquisas feitas no servidor
+POR_PAGINA = 100
+
+# Concorrência otimista no estoque
+TENTATIVAS_CONFLITO = 8
+BACKOFF_CONFLITO = 0.005  # segundos, dobra a cada conflito
+
+
+class ErroAPI(Exception):
+    """Resposta inesperada do servidor"""
+    
+    def __init__(self, status):
+        super().__init__(f"status {status}")
+        self.status = status
+
+
+class RegistroNaoEncontrado(ErroAPI):
+    """O registro pedido não existe no servidor"""
+    
+    def __init__(self):
+        super().__init__(404)
+
+
+class ConflitoVersao(ErroAPI):
+    """O registro foi alterado por outro usuário desde a leitura (If-Match recusado)"""
+    
+    def __init__(self):
+        super().__init__(412)
+
+
+class EstoqueInsuficiente(Exception):
+    """A venda pede mais unidades do que há em estoque"""
+    
+    def __init__(self, disponivel):
+        super().__init__(f"disponível: {disponivel}")
+        self.disponivel = disponivel
+
+
+class ConflitoEstoque(Exception):
+    """O estoque mudou em todas as tentativas de atualização"""
+
+
+class EstoqueNaoRestaurado(Exception):
+    """A venda foi cancelada, mas o estoque não pôde ser restaurado (a causa fica em __cause__)"""
+    
+    def __init__(self, venda):
+        super().__init__(f"venda {venda['id']} cancelada sem restaurar o estoque do livro {venda['livro_id']}")
+        self.venda = venda
+
+
+def criar_backend(base_url=BASE_URL, sqlite=None, **opcoes):
+    """SQLite se um arquivo for indicado (ou estiver em LIVRARIA_SQLITE); senão json-server"""
+    sqlite = sqlite or os.environ.get(VARIAVEL_SQLITE)
+    if sqlite:
+        return BackendSQLite(sqlite)
+    return BackendJsonServer(base_url, **opcoes)
+
+
+def carimbo():
+    """Momento da escrita (atualizado_em), usado pela réplica para pedir só o que mudou"""
+    return round(time.time(), 6)
+
+
+def nova_venda(livro_id, livro, quantidade, cliente, data=None):
+    """Montar o registro de venda com o preço atual do livro"""
+    return {
+        "livro_id": livro_id,
+        "titulo_livro": livro['titulo'],
+        "quantidade": quantidade,
+        "preco_unitario": livro['preco'],
+        "total": livro['preco'] * quantidade,
+        "cliente": cliente,
+        "data": data or datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    }
+
+
+def campos_livro(titulo=None, autor=None, preco=None, estoque=None, categoria=None):
+    """Só os campos informados (texto vazio não altera)"""
+    campos = {}
+    if titulo: campos['titulo'] = titulo
+    if autor: campos['autor'] = autor
+    if preco is not None: campos['preco'] = preco
+    if estoque is not None: campos['estoque'] = estoque
+    if categoria: campos['categoria'] = categoria
+    return campos
+
+
+def parametros_pesquisa(autor, categoria, preco_max, ordenar, por_pagina, titulo=None):
+    """Filtros no formato do json-server: o servidor só devolve o que interessa"""
+    params = {"_sort": ordenar, "_limit": por_pagina, "_per_page": por_pagina}
+    if titulo:
+        params["titulo_like"] = re.escape(titulo)
+    if autor:
+        params["autor_like"] = re.escape(autor)
+    if categoria:
+        params["categoria_like"] = re.escape(categoria)
+    if preco_max is not None:
+        params["preco_lte"] = preco_max
+    return params
+
+
+def filtro_pesquisa(autor, categoria, preco_max, titulo=None):
+    """Conferência local em uma única passada, para servidores que ignoram os filtros"""
+    autor = autor.lower() if autor else None
+    categoria = categoria.lower() if categoria else None
+    titulo = titulo.lower() if titulo else None
+    
+    def atende(livro):
+        if titulo and titulo not in livro['titulo'].lower():
+            return False
+        if autor and autor not in livro['autor'].lower():
+            return False
+        if categoria and categoria not in livro['categoria'].lower():
+            return False
+        return preco_max is None or livro['preco'] <= preco_max
+    return atende
+
+
+def ler_pagina(dados, por_pagina):
+    """Retornar (registros, é_a_última) de uma página da resposta"""
+    if isinstance(dados, dict):  # json-server 1.x: {"data": [...], "next": ...}
+        return dados.get("data") or [], not dados.get("next")
+    # Mais itens que o limite: o servidor ignorou a paginação e mandou tudo
+    return dados, len(dados) != por_pagina
+
+
+def _chave_cache(caminho, params=None):
+    if params:
+        return caminho + "?" + urlencode(sorted(params.items()), doseq=True)
+    return caminho
+
+
+def _registros_guardados(dados, extras=None):
+    """Registros de uma resposta já no cache, no formato de fluxo.registros"""
+    if isinstance(dados, dict):
+        if extras is not None:
+            extras.update((k, v) for k, v in dados.items() if k != "data")
+        return dados.get("data") or []
+    return dados
+
+
 class LivrariaAPI:
     """Classe para gerenciar a API da Livraria"""
     
-    def __init__(self):
-        self.base_url = BASE_URL
+    def __init__(self, base_url=BASE_URL, pool=POOL_CONEXOES, timeout=TIMEOUT,
+                 tentativas=TENTATIVAS, backoff=BACKOFF, sessao=None,
+                 cache_ttl=CACHE_TTL, cache_max_itens=CACHE_MAX_ITENS, analise=None,
+                 backend=None, indice=None, metricas=None, replica=None, fila_vendas=None,
+                 offline=None, alertas=None):
+        self.base_url = base_url
+        self.backend = backend or BackendJsonServer(base_url, pool, timeout, tentativas,
+                                                    backoff, sessao)
+        self.cache = CacheLocal(cache_ttl, cache_max_itens)
+        self.metricas = metricas
+        self.observadores = []
+        self.mapa_livros = MapaLivros(cache_ttl)  # livros por id, para cruzar com as vendas
+        self.registrar_observador(self.mapa_livros)
+        self.analise = analise
+        if analise is not None:
+            self.registrar_observador(analise)
+        self.indice = indice
+        if indice is not None:
+            self.registrar_observador(indice)
+        self.replica = replica
+        if replica is not None:
+            self.registrar_observador(replica)
+        self.fila_vendas = fila_vendas
+        if fila_vendas is not None:
+            self.registrar_observador(fila_vendas)
+            fila_vendas.iniciar(self)
+        self.offline = offline  # ModoOffline: disjuntor e diário das escritas sem servidor
+        self.alertas = alertas  # ListasVigiadas: estoque baixo e mais vendidos em unidades
+        if alertas is not None:
+            self.registrar_observador(alertas)
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc):
+        self.fechar()
+    
+    def fechar(self):
+        """Fechar as conexões abertas do backend"""
+        if self.fila_vendas is not None:
+            self.fila_vendas.fechar()  # grava as vendas pendentes antes de fechar as conexões
+        if self.replica is not None:
+            self.replica.salvar()
+        if self.offline is not None:
+            self.offline.fechar()
+        self.backend.fechar()
+        if self.metricas is not None:
+            self.metricas.fechar()
+    
+    def _requisicao(self, metodo, caminho, **kwargs):
+        """Enviar a requisição ao backend (json-server ou SQLite), medindo se houver métricas
+        
+        No modo offline, com o disjuntor aberto, falha na hora com ServidorIndisponivel.
+        """
+        if self.offline is not None and not self.offline.disponivel(self):
+            raise ServidorIndisponivel()
+        if metodo in ("POST", "PUT", "PATCH") and isinstance(kwargs.get("json"), dict):
+            # Toda escrita sai carimbada, venha de onde vier (menu, lote, estoque)
+            kwargs["json"] = dict(kwargs["json"], atualizado_em=carimbo())
+        try:
+            if self.metricas is None:
+                response = self.backend.requisicao(metodo, caminho, **kwargs)
+            else:
+                response = self.metricas.medir(metodo, caminho,
+                                               lambda: self.backend.requisicao(metodo, caminho, **kwargs),
+                                               kwargs.get("json"), kwargs.get("stream", False))
+        except OSError as e:  # os erros de conexão e timeout do requests também são OSError
+            if self.offline is None:
+                raise
+            self.offline.registrar_falha()
+            # Sem como saber, vale o pior caso: a requisição pode ter chegado ao servidor
+            antes_de_enviar = getattr(self.backend, "antes_de_enviar", None)
+            enviada = antes_de_enviar is None or not antes_de_enviar(e)
+            raise ServidorIndisponivel(str(e), enviada=enviada) from e
+        if self.offline is not None:
+            self.offline.registrar_contato()
+        return response
+    
+    def _sem_servidor(self):
+        """Se o modo offline está ligado e o servidor fora do ar (escritas vão para o diário)"""
+        return self.offline is not None and not self.offline.disponivel(self)
+    
+    def _sincronizar_replica(self):
+        """Sincronizar a réplica; com o servidor fora do ar, ela vale como está"""
+        try:
+            self.replica.sincronizar(self)
+        except ServidorIndisponivel:
+            if not self.replica.carregada:
+                raise
+    
+    def _da_replica(self, caminho, params=None):
+        """(True, dados) se a réplica responde pelo caminho; (False, None) se não"""
+        if self.offline is not None and self.offline.pendentes:
+            self.offline.disponivel(self)  # escritas offline esperando: reenviar se o servidor voltou
+        if self.replica is None or params:
+            return False, None
+        partes = caminho.strip("/").split("/")
+        if partes[0] not in ("livros", "vendas") or len(partes) > 2:
+            return False, None
+        self._sincronizar_replica()
+        if len(partes) == 1:
+            return True, self.replica.listar(partes[0])
+        registro = self.replica.obter(partes[0], partes[1])
+        # Ausente na réplica: pode ter sido criado agora há pouco; o servidor decide
+        return registro is not None, registro
+    
+    def _consultar(self, caminho, params=None):
+        """GET pela réplica ou pelo cache local, revalidando com If-None-Match quando expirado"""
+        na_replica, dados = self._da_replica(caminho, params)
+        if na_replica:
+            return 200, dados
+        chave = _chave_cache(caminho, params)
+        dados, etag, fresco = self.cache.obter(chave)
+        if fresco:
+            return 200, dados
+        
+        headers = {"If-None-Match": etag} if etag else {}
+        try:
+            response = self._requisicao("GET", caminho, params=params, headers=headers)
+        except ServidorIndisponivel:
+            if dados is None:
+                raise
+            return 200, dados  # servidor fora do ar: vale a cópia vencida do cache
+        if response.status_code == 304 and dados is not None:
+            self.cache.renovar(chave)
+            return 200, dados
+        if response.status_code == 200:
+            dados = response.json()
+            self.cache.guardar(chave, dados, response.headers.get("ETag"))
+            return 200, dados
+        return response.status_code, None
+    
+    def _consultar_fluxo(self, caminho, params=None, extras=None):
+        """GET de uma lista gerando os registros conforme chegam, com memória limitada
+        
+        O cache ainda é usado (item fresco ou 304), mas uma resposta nova não é
+        guardada: isso exigiria montar a lista inteira.
+        """
+        na_replica, dados = self._da_replica(caminho, params)
+        if na_replica:
+            yield from dados
+            return
+        chave = _chave_cache(caminho, params)
+        dados, etag, fresco = self.cache.obter(chave)
+        if fresco:
+            yield from _registros_guardados(dados, extras)
+            return
+        
+        headers = {"If-None-Match": etag} if etag else {}
+        try:
+            response = self._requisicao("GET", caminho, params=params, headers=headers, stream=True)
+        except ServidorIndisponivel:
+            if dados is None:
+                raise
+            yield from _registros_guardados(dados, extras)
+            return
+        with closing(response):  # devolve a conexão mesmo se a leitura parar no meio
+            if response.status_code == 304 and dados is not None:
+                self.cache.renovar(chave)
+                yield from _registros_guardados(dados, extras)
+                return
+            if response.status_code != 200:
+                raise ErroAPI(response.status_code)
+            yield from registros(response.iter_content(PEDACO), extras)
+    
+    def registrar_observador(self, observador):
+        """Avisar o observador de cada escrita (registro_salvo / registro_removido)"""
+        self.observadores.append(observador)
+    
+    def _notificar(self, evento, *args, exceto=None):
+        for observador in self.observadores:
+            if observador is exceto:
+                continue  # quem avisa já aplicou a mudança
+            metodo = getattr(observador, evento, None)
+            if metodo is not None:
+                metodo(*args)
+    
+    def _registrar_escrita(self, colecao, item_id=None, registro=None, anterior=None, removido=False):
+        """Invalidar o cache tocado por uma escrita, guardar o registro novo e avisar os observadores"""
+        self.cache.invalidar(colecao, item_id)
+        if removido:
+            self._registrar_remocao(colecao, item_id)
+            self._notificar("registro_removido", colecao, item_id, anterior)
+        elif registro is not None and "id" in registro:
+            self.cache.guardar(f"/{colecao}/{registro['id']}", registro)
+            self._notificar("registro_salvo", colecao, registro, anterior)
+    
+    def _registrar_remocao(self, colecao, item_id):
+        """Deixar em /remocoes o aviso da remoção, para as réplicas dos outros clientes"""
+        try:
+            self._requisicao("POST", "/remocoes", json={"colecao": colecao, "registro_id": str(item_id)})
+        except Exception:
+            pass  # sem o aviso, as réplicas só percebem a remoção ao reconstruir
+    
+    def _ler_para_alterar(self, colecao, item_id):
+        """Ler o registro direto do servidor, com o ETag para escrita condicional"""
+        response = self._requisicao("GET", f"/{colecao}/{item_id}")
+        if response.status_code == 404:
+            raise RegistroNaoEncontrado()
+        if response.status_code != 200:
+            raise ErroAPI(response.status_code)
+        return response.json(), response.headers.get("ETag")
+    
+    def _ajustar_estoque(self, livro_id, delta, livro=None, etag=None, ao_gravar=None):
+        """Somar delta ao estoque com PATCH condicional, repetindo em caso de conflito
+        
+        ao_gravar(novo) é chamado depois do PATCH aceito, antes dos avisos aos observadores.
+        """
+        for tentativa in range(TENTATIVAS_CONFLITO):
+            if livro is None:
+                livro, etag = self._ler_para_alterar("livros", livro_id)
+            novo_estoque = livro['estoque'] + delta
+            if novo_estoque < 0:
+                raise EstoqueInsuficiente(livro['estoque'])
+            
+            # If-Match: o servidor recusa (412) se o livro mudou desde a leitura
+            headers = {"If-Match": etag} if etag else {}
+            campos = {"estoque": novo_estoque, "versao": livro.get('versao', 0) + 1}
+            response = self._requisicao("PATCH", f"/livros/{livro_id}", json=campos, headers=headers)
+            if response.status_code == 200:
+                novo = response.json()
+                if ao_gravar is not None:
+                    ao_gravar(novo)
+                self._registrar_escrita("livros", livro_id, novo, anterior=livro)
+                return novo
+            if response.status_code != 412:
+                raise ErroAPI(response.status_code)
+            
+            # Outro caixa alterou o livro: reler e tentar de novo
+            livro = None
+            time.sleep(random.uniform(0, BACKOFF_CONFLITO * 2 ** tentativa))
+        raise ConflitoEstoque(f"livro {livro_id}")
     
     # ==================== CRUD LIVROS ====================
     
-    def criar_livro(self, titulo, autor, preco, estoque, categoria):
-        """Criar um novo livro"""
+    def criar_livro(self, titulo, autor, preco, estoque, categoria, chave=None):
+        """Criar um novo livro
+        
+        A chave identifica o livro para conferir, se a resposta do POST se perder,
+        se ele chegou ao servidor (no modo offline, sempre há uma).
+        """
         livro = {
             "titulo": titulo,
             "autor": autor,
             "preco": preco,
             "estoque": estoque,
-            "categoria": categoria
+            "categoria": categoria,
+            "versao": 1
         }
+        if self._sem_servidor():
+            return self._criar_livro_offline(livro)
+        if chave or self.offline is not None:
+            livro["chave"] = chave or uuid.uuid4().hex
         try:
-            response = requests.post(f"{self.base_url}/livros", json=livro)
+            response = self._requisicao("POST", "/livros", json=livro)
             if response.status_code == 201:
                 print(f"✓ Livro '{titulo}' criado com sucesso!")
-                return response.json()
+                livro = response.json()
+                self._registrar_escrita("livros", registro=livro)
+                return livro
             else:
                 print(f"✗ Erro ao criar livro: {response.status_code}")
+        except ServidorIndisponivel:  # caiu agora: vai para o diário, com a chave do POST
+            return self._criar_livro_offline(livro)
         except Exception as e:
             print(f"✗ Erro de conexão: {e}")
         return None
     
-    def listar_livros(self):
-        """Listar todos os livros"""
+    def iterar_livros(self, fluxo=False):
+        """Gerar todos os livros, sem formatação (com fluxo, conforme chegam do servidor)"""
+        if fluxo:
+            yield from self._consultar_fluxo("/livros")
+            return
+        status, livros = self._consultar("/livros")
+        if status != 200:
+            raise ErroAPI(status)
+        yield from livros
+    
+    def listar_livros(self, renderizador=None, fluxo=False):
+        """Listar todos os livros (com fluxo, exibe conforme chegam e retorna só a quantidade)"""
         try:
-            response = requests.get(f"{self.base_url}/livros")
-            if response.status_code == 200:
-                livros = response.json()
-                if livros:
-                    print("\n" + "="*80)
-                    print(f"{'ID':<5} {'Título':<30} {'Autor':<20} {'Preço':<10} {'Estoque':<10}")
-                    print("="*80)
-                    for livro in livros:
-                        print(f"{livro['id']:<5} {livro['titulo']:<30} {livro['autor']:<20} "
-                              f"R${livro['preco']:<9.2f} {livro['estoque']:<10}")
-                    print("="*80)
-                    return livros
-                else:
-                    print("Nenhum livro cadastrado.")
-            else:
-                print(f"✗ Erro ao listar livros: {response.status_code}")
+            if fluxo:
+                with closing(self.iterar_livros(fluxo=True)) as livros:
+                    return tabela_livros(livros, renderizador)
+            livros = list(self.iterar_livros())
+            tabela_livros(livros, renderizador)
+            return livros
+        except ErroAPI as e:
+            print(f"✗ Erro ao listar livros: {e.status}")
         except Exception as e:
             print(f"✗ Erro de conexão: {e}")
-        return []
+        return 0 if fluxo else []
     
     def buscar_livro(self, livro_id):
         """Buscar livro por ID"""
         try:
-            response = requests.get(f"{self.base_url}/livros/{livro_id}")
-            if response.status_code == 200:
-                return response.json()
+            status, livro = self._consultar(f"/livros/{livro_id}")
+            if status == 200:
+                return livro
             else:
                 print(f"✗ Livro ID {livro_id} não encontrado.")
         except Exception as e:
@@ -70,107 +478,183 @@ class LivrariaAPI:
     
     def atualizar_livro(self, livro_id, titulo=None, autor=None, preco=None, estoque=None, categoria=None):
         """Atualizar informações de um livro"""
-        livro = self.buscar_livro(livro_id)
-        if not livro:
+        campos = campos_livro(titulo, autor, preco, estoque, categoria)
+        if self._sem_servidor():
+            return self._atualizar_livro_offline(livro_id, campos)
+        try:
+            # Leitura direta do servidor: um estoque em cache não pode sobrescrever uma venda
+            livro, etag = self._ler_para_alterar("livros", livro_id)
+        except RegistroNaoEncontrado:
+            print(f"✗ Livro ID {livro_id} não encontrado.")
+            return False
+        except ServidorIndisponivel:
+            return self._atualizar_livro_offline(livro_id, campos)
+        except Exception as e:
+            print(f"✗ Erro de conexão: {e}")
             return False
         
-        if titulo: livro['titulo'] = titulo
-        if autor: livro['autor'] = autor
-        if preco is not None: livro['preco'] = preco
-        if estoque is not None: livro['estoque'] = estoque
-        if categoria: livro['categoria'] = categoria
+        anterior = dict(livro)
+        livro.update(campos)
+        livro['versao'] = livro.get('versao', 0) + 1
         
         try:
-            response = requests.put(f"{self.base_url}/livros/{livro_id}", json=livro)
+            headers = {"If-Match": etag} if etag else {}
+            response = self._requisicao("PUT", f"/livros/{livro_id}", json=livro, headers=headers)
             if response.status_code == 200:
+                self._registrar_escrita("livros", livro_id, response.json(), anterior)
                 print(f"✓ Livro ID {livro_id} atualizado com sucesso!")
                 return True
+            elif response.status_code == 412:
+                print(f"✗ Livro ID {livro_id} foi alterado por outro usuário. Tente novamente.")
             else:
                 print(f"✗ Erro ao atualizar livro: {response.status_code}")
+        except ServidorIndisponivel as e:
+            if not e.enviada:
+                return self._atualizar_livro_offline(livro_id, campos)
+            print(f"✗ Sem resposta do servidor ({e}). Confira se o livro ID {livro_id} foi atualizado.")
         except Exception as e:
             print(f"✗ Erro de conexão: {e}")
         return False
     
     def deletar_livro(self, livro_id):
         """Deletar um livro"""
+        if self._sem_servidor():
+            return self._deletar_livro_offline(livro_id)
         try:
-            response = requests.delete(f"{self.base_url}/livros/{livro_id}")
+            response = self._requisicao("DELETE", f"/livros/{livro_id}")
             if response.status_code == 200:
+                self._registrar_escrita("livros", livro_id, removido=True)
                 print(f"✓ Livro ID {livro_id} deletado com sucesso!")
                 return True
             else:
                 print(f"✗ Erro ao deletar livro: {response.status_code}")
+        except ServidorIndisponivel as e:
+            if not e.enviada:
+                return self._deletar_livro_offline(livro_id)
+            print(f"✗ Sem resposta do servidor ({e}). Confira se o livro ID {livro_id} foi deletado.")
         except Exception as e:
             print(f"✗ Erro de conexão: {e}")
         return False
     
     # ==================== CRUD VENDAS ====================
     
-    def criar_venda(self, livro_id, quantidade, cliente):
-        """Criar uma nova venda"""
-        livro = self.buscar_livro(livro_id)
-        if not livro:
-            print("✗ Livro não encontrado!")
-            return None
+    def registrar_venda(self, livro_id, quantidade, cliente, data=None, chave=None):
+        """Registrar a venda e baixar o estoque como uma transação, sem imprimir nada
+        
+        Com fila de vendas, só reserva o estoque em memória: a venda volta sem id
+        e é gravada em segundo plano. Offline, confere o estoque da cópia local e
+        a venda volta com id provisório, anotada no diário com uma chave que o
+        reenvio procura no servidor antes de gravar a venda de novo.
+        """
+        if self.fila_vendas is not None:
+            return self.fila_vendas.reservar(livro_id, quantidade, cliente, data)
+        if self._sem_servidor():
+            return self._registrar_venda_offline(livro_id, quantidade, cliente, data)
+        transacional = getattr(self.backend, "registrar_venda", None)
+        if transacional:
+            # O backend faz tudo numa transação local: sem rollback manual nem If-Match
+            venda, livro, novo = transacional(livro_id, quantidade, cliente, data)
+            self._registrar_escrita("livros", novo['id'], novo, livro)
+            self._registrar_escrita("vendas", registro=venda)
+            return venda
         
+        try:
+            livro, etag = self._ler_para_alterar("livros", livro_id)
+        except ServidorIndisponivel:
+            return self._registrar_venda_offline(livro_id, quantidade, cliente, data)
         if livro['estoque'] < quantidade:
-            print(f"✗ Estoque insuficiente! Disponível: {livro['estoque']}")
-            return None
-        
-        total = livro['preco'] * quantidade
-        venda = {
-            "livro_id": livro_id,
-            "titulo_livro": livro['titulo'],
-            "quantidade": quantidade,
-            "preco_unitario": livro['preco'],
-            "total": total,
-            "cliente": cliente,
-            "data": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        }
+            raise EstoqueInsuficiente(livro['estoque'])
         
+        venda = nova_venda(livro_id, livro, quantidade, cliente, data)
+        if chave or self.offline is not None:
+            venda['chave'] = chave or uuid.uuid4().hex
         try:
-            response = requests.post(f"{self.base_url}/vendas", json=venda)
-            if response.status_code == 201:
-                # Atualizar estoque
-                novo_estoque = livro['estoque'] - quantidade
-                self.atualizar_livro(livro_id, estoque=novo_estoque)
-                print(f"✓ Venda realizada com sucesso! Total: R$ {total:.2f}")
-                return response.json()
-            else:
-                print(f"✗ Erro ao criar venda: {response.status_code}")
+            response = self._requisicao("POST", "/vendas", json=venda)
+        except ServidorIndisponivel:
+            # O POST pode ter chegado ao servidor: o reenvio procura a venda pela chave
+            return self.offline.registrar_venda(self, venda, livro)
+        if response.status_code != 201:
+            raise ErroAPI(response.status_code)
+        venda = response.json()
+        
+        try:
+            self._ajustar_estoque(livro_id, -quantidade, livro, etag)
+        except Exception:
+            # Desfazer a venda: ela não pode ficar registrada sem a baixa no estoque
+            try:
+                self._requisicao("DELETE", f"/vendas/{venda['id']}")
+                self._registrar_remocao("vendas", venda['id'])
+            except Exception:
+                pass
+            raise
+        self._registrar_escrita("vendas", registro=venda)
+        return venda
+    
+    def criar_venda(self, livro_id, quantidade, cliente):
+        """Criar uma nova venda"""
+        try:
+            venda = self.registrar_venda(livro_id, quantidade, cliente)
+            print(f"✓ Venda realizada com sucesso! Total: R$ {venda['total']:.2f}")
+            return venda
+        except RegistroNaoEncontrado:
+            print("✗ Livro não encontrado!")
+        except EstoqueInsuficiente as e:
+            print(f"✗ Estoque insuficiente! Disponível: {e.disponivel}")
+        except ConflitoEstoque:
+            print("✗ Estoque alterado por outras vendas ao mesmo tempo. Tente novamente.")
+        except ErroAPI as e:
+            print(f"✗ Erro ao criar venda: {e.status}")
         except Exception as e:
             print(f"✗ Erro de conexão: {e}")
         return None
     
-    def listar_vendas(self):
-        """Listar todas as vendas"""
+    def iterar_vendas(self, fluxo=False):
+        """Gerar todas as vendas, sem formatação (com fluxo, conforme chegam do servidor)"""
+        if fluxo:
+            yield from self._consultar_fluxo("/vendas")
+            return
+        status, vendas = self._consultar("/vendas")
+        if status != 200:
+            raise ErroAPI(status)
+        yield from vendas
+    
+    def livros_por_ids(self, ids):
+        """Livros atuais de vários ids de uma vez: {id: livro}, sem os que não existem
+        
+        Pela réplica, se houver; senão pelo mapa de livros, que busca os que
+        faltam numa consulta para vários ids.
+        """
+        if self.replica is not None:
+            self._sincronizar_replica()
+            livros = ((str(livro_id), self.replica.obter("livros", livro_id)) for livro_id in set(ids))
+            return {livro_id: livro for livro_id, livro in livros if livro is not None}
+        return self.mapa_livros.resolver(self, ids)
+    
+    def iterar_vendas_com_livros(self, fluxo=False):
+        """Gerar as vendas com título, autor e categoria atuais do livro de cada uma"""
+        return juntar_vendas(self, self.iterar_vendas(fluxo))
+    
+    def listar_vendas(self, renderizador=None, fluxo=False):
+        """Listar todas as vendas (com fluxo, exibe conforme chegam e retorna só a quantidade)"""
         try:
-            response = requests.get(f"{self.base_url}/vendas")
-            if response.status_code == 200:
-                vendas = response.json()
-                if vendas:
-                    print("\n" + "="*100)
-                    print(f"{'ID':<5} {'Livro':<30} {'Cliente':<20} {'Qtd':<6} {'Total':<12} {'Data':<20}")
-                    print("="*100)
-                    for venda in vendas:
-                        print(f"{venda['id']:<5} {venda['titulo_livro']:<30} {venda['cliente']:<20} "
-                              f"{venda['quantidade']:<6} R${venda['total']:<11.2f} {venda['data']:<20}")
-                    print("="*100)
-                    return vendas
-                else:
-                    print("Nenhuma venda registrada.")
-            else:
-                print(f"✗ Erro ao listar vendas: {response.status_code}")
+            if fluxo:
+                with closing(self.iterar_vendas(fluxo=True)) as vendas:
+                    return tabela_vendas(vendas, renderizador)
+            vendas = list(self.iterar_vendas())
+            tabela_vendas(vendas, renderizador)
+            return vendas
+        except ErroAPI as e:
+            print(f"✗ Erro ao listar vendas: {e.status}")
         except Exception as e:
             print(f"✗ Erro de conexão: {e}")
-        return []
+        return 0 if fluxo else []
     
     def buscar_venda(self, venda_id):
         """Buscar venda por ID"""
         try:
-            response = requests.get(f"{self.base_url}/vendas/{venda_id}")
-            if response.status_code == 200:
-                return response.json()
+            status, venda = self._consultar(f"/vendas/{venda_id}")
+            if status == 200:
+                return venda
             else:
                 print(f"✗ Venda ID {venda_id} não encontrada.")
         except Exception as e:
@@ -183,19 +667,27 @@ class LivrariaAPI:
         if not venda:
             return False
         
+        anterior = dict(venda)
         if quantidade:
             venda['quantidade'] = quantidade
             venda['total'] = venda['preco_unitario'] * quantidade
         if cliente:
             venda['cliente'] = cliente
         
+        if self._sem_servidor():
+            return self._atualizar_venda_offline(venda, anterior)
         try:
-            response = requests.put(f"{self.base_url}/vendas/{venda_id}", json=venda)
+            response = self._requisicao("PUT", f"/vendas/{venda_id}", json=venda)
             if response.status_code == 200:
+                self._registrar_escrita("vendas", venda_id, response.json(), anterior)
                 print(f"✓ Venda ID {venda_id} atualizada com sucesso!")
                 return True
             else:
                 print(f"✗ Erro ao atualizar venda: {response.status_code}")
+        except ServidorIndisponivel as e:
+            if not e.enviada:
+                return self._atualizar_venda_offline(venda, anterior)
+            print(f"✗ Sem resposta do servidor ({e}). Confira se a venda ID {venda_id} foi atualizada.")
         except Exception as e:
             print(f"✗ Erro de conexão: {e}")
         return False
@@ -206,152 +698,302 @@ class LivrariaAPI:
         if not venda:
             return False
         
+        if self._sem_servidor():
+            return self._deletar_venda_offline(venda)
         try:
-            # Restaurar estoque
-            livro = self.buscar_livro(venda['livro_id'])
-            if livro:
-                novo_estoque = livro['estoque'] + venda['quantidade']
-                self.atualizar_livro(venda['livro_id'], estoque=novo_estoque)
-            
-            response = requests.delete(f"{self.base_url}/vendas/{venda_id}")
-            if response.status_code == 200:
-                print(f"✓ Venda ID {venda_id} cancelada e estoque restaurado!")
-                return True
-            else:
-                print(f"✗ Erro ao deletar venda: {response.status_code}")
+            response = self._requisicao("DELETE", f"/vendas/{venda_id}")
+        except ServidorIndisponivel as e:
+            if not e.enviada:
+                return self._deletar_venda_offline(venda)
+            print(f"✗ Sem resposta do servidor ({e}). Confira se a venda ID {venda_id} foi cancelada "
+                  f"e o estoque restaurado.")
+            return False
         except Exception as e:
             print(f"✗ Erro de conexão: {e}")
-        return False
+            return False
+        if response.status_code != 200:
+            print(f"✗ Erro ao deletar venda: {response.status_code}")
+            return False
+        self._registrar_escrita("vendas", venda_id, anterior=venda, removido=True)
+        
+        # Restaurar estoque com o mesmo PATCH condicional da venda. A venda já saiu do
+        # servidor: qualquer falha daqui em diante é só do estoque, e é avisada como tal
+        try:
+            self._ajustar_estoque(venda['livro_id'], venda['quantidade'])
+        except RegistroNaoEncontrado:
+            pass  # livro já removido: não há estoque a restaurar
+        except ConflitoEstoque:
+            print(f"✗ Venda ID {venda_id} cancelada, mas o estoque não pôde ser restaurado "
+                  f"(alterado por outras vendas ao mesmo tempo). Tente atualizar o livro manualmente.")
+            return True
+        except ErroAPI as e:
+            print(f"✗ Venda ID {venda_id} cancelada, mas o estoque não pôde ser restaurado "
+                  f"(erro {e.status}). Tente atualizar o livro manualmente.")
+            return True
+        except Exception as e:
+            print(f"✗ Venda ID {venda_id} cancelada, mas o estoque não pôde ser restaurado "
+                  f"(erro de conexão: {e}). Tente atualizar o livro manualmente.")
+            return True
+        print(f"✓ Venda ID {venda_id} cancelada e estoque restaurado!")
+        return True
+    
+    # ==================== ESCRITAS OFFLINE ====================
+    # Com o servidor fora do ar: disjuntor aberto ou queda na própria requisição. Alterar
+    # e deletar só vão para o diário se a requisição não saiu; criar livro e vender vão
+    # sempre, e o reenvio procura a chave no servidor antes de criar de novo
+    
+    def _criar_livro_offline(self, livro):
+        livro = self.offline.criar_livro(self, livro)
+        print(f"✓ Livro '{livro['titulo']}' criado offline (ID provisório {livro['id']}); "
+              f"será enviado quando o servidor voltar.")
+        return livro
+    
+    def _atualizar_livro_offline(self, livro_id, campos):
+        livro = self.offline.local(self, "livros", livro_id)
+        if livro is None:
+            print(f"✗ Livro ID {livro_id} não está na cópia local.")
+            return False
+        self.offline.atualizar_livro(self, livro, campos)
+        print(f"✓ Livro ID {livro_id} atualizado offline; será enviado quando o servidor voltar.")
+        return True
+    
+    def _deletar_livro_offline(self, livro_id):
+        self.offline.deletar_livro(self, livro_id, self.offline.local(self, "livros", livro_id))
+        print(f"✓ Livro ID {livro_id} deletado offline; será enviado quando o servidor voltar.")
+        return True
+    
+    def _registrar_venda_offline(self, livro_id, quantidade, cliente, data=None):
+        livro = self.offline.local(self, "livros", livro_id)
+        if livro is None:
+            raise RegistroNaoEncontrado()
+        if livro['estoque'] < quantidade:
+            raise EstoqueInsuficiente(livro['estoque'])
+        venda = nova_venda(livro_id, livro, quantidade, cliente, data)
+        return self.offline.registrar_venda(self, venda, livro)
+    
+    def _atualizar_venda_offline(self, venda, anterior):
+        self.offline.atualizar_venda(self, venda, anterior)
+        print(f"✓ Venda ID {venda['id']} atualizada offline; será enviada quando o servidor voltar.")
+        return True
+    
+    def _deletar_venda_offline(self, venda):
+        self.offline.deletar_venda(self, venda)
+        print(f"✓ Venda ID {venda['id']} cancelada offline e estoque restaurado na cópia local.")
+        return True
+    
+    # ==================== LOTE ====================
+    
+    def importar_livros(self, caminho, trabalhadores=None, retomar=True):
+        """Criar ou atualizar livros a partir de CSV/JSONL, em paralelo"""
+        import lote
+        return lote.importar(self, "livros", caminho, trabalhadores or lote.TRABALHADORES, retomar)
+    
+    def importar_vendas(self, caminho, trabalhadores=None, retomar=True):
+        """Registrar vendas (com baixa de estoque) a partir de CSV/JSONL, em paralelo"""
+        import lote
+        return lote.importar(self, "vendas", caminho, trabalhadores or lote.TRABALHADORES, retomar)
+    
+    def exportar_livros(self, caminho):
+        """Exportar todos os livros para CSV/JSONL"""
+        import lote
+        return lote.exportar(self, "livros", caminho)
+    
+    def exportar_vendas(self, caminho):
+        """Exportar todas as vendas para CSV/JSONL"""
+        import lote
+        return lote.exportar(self, "vendas", caminho)
     
     # ==================== PESQUISA AVANÇADA ====================
     
-    def pesquisa_avancada_livros(self, autor=None, categoria=None, preco_max=None):
-        """Pesquisar livros com múltiplos filtros"""
-        try:
-            response = requests.get(f"{self.base_url}/livros")
-            if response.status_code == 200:
-                livros = response.json()
-                
-                # Aplicar filtros
-                if autor:
-                    livros = [l for l in livros if autor.lower() in l['autor'].lower()]
-                if categoria:
-                    livros = [l for l in livros if categoria.lower() in l['categoria'].lower()]
-                if preco_max is not None:
-                    livros = [l for l in livros if l['preco'] <= preco_max]
-                
-                if livros:
-                    print(f"\n✓ Encontrados {len(livros)} livro(s):")
-                    print("="*80)
-                    print(f"{'ID':<5} {'Título':<30} {'Autor':<20} {'Preço':<10} {'Categoria'}")
-                    print("="*80)
-                    for livro in livros:
-                        print(f"{livro['id']:<5} {livro['titulo']:<30} {livro['autor']:<20} "
-                              f"R${livro['preco']:<9.2f} {livro['categoria']}")
-                    print("="*80)
-                    return livros
-                else:
-                    print("✗ Nenhum livro encontrado com os critérios especificados.")
+    def iterar_pesquisa_livros(self, autor=None, categoria=None, preco_max=None,
+                               ordenar="titulo", por_pagina=POR_PAGINA, titulo=None, fluxo=False):
+        """Gerar os livros que atendem aos filtros, buscando página por página
+        
+        Com fluxo, cada página é filtrada conforme chega: mesmo um servidor que
+        ignora _page/_limit e manda o catálogo inteiro não o deixa todo em memória.
+        """
+        if self.indice is not None:
+            # Índice local: palavras por prefixo, sem acento, sem ida ao servidor
+            if self.replica is not None:
+                self._sincronizar_replica()  # o que outros clientes mudaram chega pelos avisos
+            # Sem réplica, só uma nova carga traz o que os outros clientes mudaram
+            self.indice.preparar(self, renovar=self.replica is None)
+            yield from self.indice.buscar(titulo=titulo, autor=autor, categoria=categoria,
+                                          preco_max=preco_max, ordenar=ordenar)
+            return
+        if self.replica is not None:
+            # Réplica local: do servidor só vem o que mudou; o filtro roda aqui
+            _, livros = self._consultar("/livros")
+            filtro = filtro_pesquisa(autor, categoria, preco_max, titulo)
+            achados = [livro for livro in livros if filtro(livro)]
+            if ordenar:
+                achados.sort(key=lambda l: (l.get(ordenar) is None, l.get(ordenar, 0)))
+            yield from achados
+            return
+        
+        params = parametros_pesquisa(autor, categoria, preco_max, ordenar, por_pagina, titulo)
+        filtro = filtro_pesquisa(autor, categoria, preco_max, titulo)
+        
+        pagina, primeiro_id = 1, None
+        while True:
+            params["_page"] = pagina
+            if fluxo:
+                extras = {}
+                livros = self._consultar_fluxo("/livros", params, extras)
             else:
-                print(f"✗ Erro na pesquisa: {response.status_code}")
+                status, dados = self._consultar("/livros", params)
+                if status != 200:
+                    raise ErroAPI(status)
+                livros, ultima = ler_pagina(dados, por_pagina)
+            
+            with closing(iter(livros)) if fluxo else nullcontext(livros) as livros:
+                recebidos = 0
+                for livro in livros:
+                    if recebidos == 0:
+                        if pagina > 1 and livro.get('id') == primeiro_id:
+                            return  # a mesma página de novo: o servidor ignora _page
+                        if pagina == 1:
+                            primeiro_id = livro.get('id')
+                    recebidos += 1
+                    if filtro(livro):
+                        yield livro
+            
+            if fluxo:
+                # Mesmo critério de ler_pagina, com o que se sabe só ao fim da página
+                ultima = not extras.get("next") if "next" in extras else recebidos != por_pagina
+            if ultima:
+                return
+            pagina += 1
+    
+    def pesquisa_avancada_livros(self, autor=None, categoria=None, preco_max=None, renderizador=None,
+                                 titulo=None, fluxo=False):
+        """Pesquisar livros com múltiplos filtros (com fluxo, só os encontrados ficam em memória)"""
+        try:
+            livros = list(self.iterar_pesquisa_livros(autor, categoria, preco_max, titulo=titulo,
+                                                      fluxo=fluxo))
+            tabela_pesquisa(livros, renderizador)
+            return livros
+        except ErroAPI as e:
+            print(f"✗ Erro na pesquisa: {e.status}")
         except Exception as e:
             print(f"✗ Erro de conexão: {e}")
         return []
     
     # ==================== GRÁFICOS ====================
     
-    def grafico_livros_por_categoria(self):
+    def grafico_livros_por_categoria(self, fluxo=False):
         """Gráfico de livros agrupados por categoria"""
         try:
-            response = requests.get(f"{self.base_url}/livros")
-            if response.status_code == 200:
-                livros = response.json()
-                if not livros:
-                    print("✗ Não há dados para gerar o gráfico.")
-                    return
-                
-                categorias = [l['categoria'] for l in livros]
-                contagem = Counter(categorias)
-                
-                # Gráfico em ASCII
-                print("\n" + "="*70)
-                print("           GRÁFICO: LIVROS POR CATEGORIA")
-                print("="*70 + "\n")
-                
-                # Encontrar valor máximo para escala
-                max_valor = max(contagem.values())
-                escala = 50  # largura máxima da barra
-                
-                for categoria, quantidade in sorted(contagem.items(), key=lambda x: x[1], reverse=True):
-                    # Calcular tamanho da barra
-                    barra_tamanho = int((quantidade / max_valor) * escala)
-                    barra = "█" * barra_tamanho
-                    
-                    # Exibir categoria, barra e valor
-                    print(f"{categoria:<20} | {barra} {quantidade}")
-                
-                print("\n" + "="*70)
-                print(f"Total de livros: {len(livros)}")
-                print(f"Total de categorias: {len(contagem)}")
-                print("="*70)
-                
+            if self.analise is not None:
+                self.analise.atualizar(self)
+                desenhar_contagem_categorias(self.analise.contagem_categorias)
+                return
+            if fluxo:
+                # Contagem feita conforme os livros chegam
+                with closing(self.iterar_livros(fluxo=True)) as livros:
+                    desenhar_grafico_categorias(livros)
+                return
+            status, livros = self._consultar("/livros")
+            if status == 200:
+                desenhar_grafico_categorias(livros)
         except Exception as e:
             print(f"✗ Erro ao gerar gráfico: {e}")
     
-    def grafico_vendas_por_livro(self):
+    def grafico_vendas_por_livro(self, fluxo=False):
         """Gráfico de vendas agrupadas por livro"""
         try:
-            response = requests.get(f"{self.base_url}/vendas")
-            if response.status_code == 200:
-                vendas = response.json()
-                if not vendas:
-                    print("✗ Não há dados para gerar o gráfico.")
-                    return
-                
-                # Agrupar vendas por livro
-                vendas_por_livro = {}
-                for venda in vendas:
-                    titulo = venda['titulo_livro']
-                    if titulo in vendas_por_livro:
-                        vendas_por_livro[titulo] += venda['total']
-                    else:
-                        vendas_por_livro[titulo] = venda['total']
-                
-                # Ordenar por valor
-                vendas_ordenadas = dict(sorted(vendas_por_livro.items(), key=lambda x: x[1], reverse=True))
-                
-                # Gráfico em ASCII
-                print("\n" + "="*80)
-                print("              GRÁFICO: TOTAL DE VENDAS POR LIVRO")
-                print("="*80 + "\n")
-                
-                # Encontrar valor máximo para escala
-                max_valor = max(vendas_ordenadas.values())
-                escala = 40  # largura máxima da barra
-                
-                for livro, total in vendas_ordenadas.items():
-                    # Calcular tamanho da barra
-                    barra_tamanho = int((total / max_valor) * escala)
-                    barra = "█" * barra_tamanho
-                    
-                    # Truncar título se muito longo
-                    livro_nome = livro[:30] + "..." if len(livro) > 30 else livro
-                    
-                    # Exibir livro, barra e valor
-                    print(f"{livro_nome:<35} | {barra} R$ {total:,.2f}")
-                
-                print("\n" + "="*80)
-                print(f"Total de vendas: R$ {sum(vendas_ordenadas.values()):,.2f}")
-                print(f"Número de livros vendidos: {len(vendas_ordenadas)}")
-                print("="*80)
-                
+            if self.analise is not None:
+                self._atualizar_analise()
+                desenhar_totais_por_livro(self.analise.totais_por_titulo())
+                return
+            # Totais somados por livro_id conforme as vendas chegam, com o título atual
+            with closing(self.iterar_vendas_com_livros(fluxo)) as vendas:
+                desenhar_grafico_vendas(vendas)
         except Exception as e:
             print(f"✗ Erro ao gerar gráfico: {e}")
+    
+    # ==================== RELATÓRIOS ====================
+    
+    def _atualizar_analise(self):
+        """Somar as vendas novas e trazer os títulos atuais dos livros vendidos"""
+        self.analise.atualizar(self)
+        self.analise.atualizar_titulos(self.livros_por_ids(list(self.analise.titulos)))
+    
+    def relatorio_mais_vendidos(self, dias=30, n=10):
+        """Top N livros vendidos nos últimos dias, a partir dos agregados"""
+        try:
+            if self.analise is None:
+                from analise import AgregadosVendas
+                self.analise = AgregadosVendas(caminho=None)
+                self.registrar_observador(self.analise)
+            self.analise.atualizar(self)
+            linhas = self.analise.mais_vendidos(dias, n)
+            # Só os títulos exibidos são conferidos com o catálogo
+            livros = self.livros_por_ids([livro_id for livro_id, _, _ in linhas])
+            self.analise.atualizar_titulos(livros)
+            linhas = [(livro_id, livros[livro_id]['titulo'] if livro_id in livros else titulo, total)
+                      for livro_id, titulo, total in linhas]
+            tabela_mais_vendidos(linhas, dias)
+            return linhas
+        except Exception as e:
+            print(f"✗ Erro ao gerar relatório: {e}")
+        return []
+    
+    def _preparar_alertas(self):
+        """Listas de estoque baixo e mais vendidos, criadas e carregadas na primeira consulta"""
+        if self.alertas is None:
+            from alertas import ListasVigiadas
+            self.alertas = ListasVigiadas()
+            self.registrar_observador(self.alertas)
+        self.alertas.preparar(self)
+        if self.replica is not None:
+            self._sincronizar_replica()  # vendas e estoques de outros clientes chegam pelos avisos
+        return self.alertas
+    
+    def relatorio_estoque_baixo(self, k=None):
+        """Livros no limite de reposição, do menor estoque ao maior, sem listar o catálogo"""
+        try:
+            linhas = self._preparar_alertas().estoque_baixo(k)
+            tabela_estoque_baixo(linhas)
+            return linhas
+        except Exception as e:
+            print(f"✗ Erro ao gerar relatório: {e}")
+        return []
+    
+    def relatorio_top_unidades(self, k=10):
+        """Top k livros por unidades vendidas na janela das listas de vigilância"""
+        try:
+            alertas = self._preparar_alertas()
+            linhas = alertas.mais_vendidos(k)
+            tabela_top_unidades(linhas, alertas.dias)
+            return linhas
+        except Exception as e:
+            print(f"✗ Erro ao gerar relatório: {e}")
+        return []
+    
+    def relatorio_vendas(self, agrupamento, processos=None, arquivo=None):
+        """Gráfico do total vendido por livro, categoria, cliente ou mês, somado em vários processos"""
+        from relatorios import gerar_relatorio
+        try:
+            linhas = gerar_relatorio(self, [agrupamento], arquivo, processos)[agrupamento]
+            desenhar_relatorio(linhas, agrupamento)
+            return linhas
+        except Exception as e:
+            print(f"✗ Erro ao gerar relatório: {e}")
+        return []
 
 
 def menu_principal():
     """Menu principal da aplicação"""
-    api = LivrariaAPI()
+    from alertas import ListasVigiadas
+    from analise import AgregadosVendas
+    from indice import IndiceLivros
+    from metricas import Metricas
+    from offline import ModoOffline
+    from replica import Replica
+    api = LivrariaAPI(analise=AgregadosVendas(), backend=criar_backend(), indice=IndiceLivros(),
+                      metricas=Metricas(), replica=Replica(), offline=ModoOffline(),
+                      alertas=ListasVigiadas())
     
     while True:
         print("\n" + "="*60)
@@ -362,6 +1004,11 @@ def menu_principal():
         print("[3] Pesquisa Avançada de Livros")
         print("[4] Gráfico: Livros por Categoria")
         print("[5] Gráfico: Vendas por Livro")
+        print("[6] Relatório: Mais Vendidos (30 dias)")
+        print("[7] Estatísticas das Requisições")
+        print("[8] Relatório: Vendas por Categoria, Cliente ou Mês")
+        print("[9] Alerta: Estoque Baixo (livros para repor)")
+        print("[10] Relatório: Mais Vendidos em Unidades (30 dias)")
         print("[0] Sair")
         print("-"*60)
         
@@ -377,7 +1024,29 @@ def menu_principal():
             api.grafico_livros_por_categoria()
         elif opcao == "5":
             api.grafico_vendas_por_livro()
+        elif opcao == "6":
+            api.relatorio_mais_vendidos()
+        elif opcao == "7":
+            tabela_metricas(api.metricas.resumo())
+        elif opcao == "8":
+            agrupamento = input("Agrupar por (livro/categoria/cliente/mes): ").strip().lower()
+            if agrupamento in ("livro", "categoria", "cliente", "mes"):
+                api.relatorio_vendas(agrupamento)
+            else:
+                print("✗ Agrupamento inválido!")
+        elif opcao == "9":
+            api.relatorio_estoque_baixo()
+        elif opcao == "10":
+            api.relatorio_top_unidades()
         elif opcao == "0":
+            api.analise.salvar()
+            api.replica.salvar()
+            if api.offline.pendentes:
+                print(f"\n✗ {api.offline.pendentes} escrita(s) feita(s) offline ainda não enviada(s): "
+                      f"ficam em {api.offline.diario.caminho} para a próxima vez.")
+            stats = api.cache.estatisticas()
+            print(f"\nCache: {stats['acertos']} acerto(s), {stats['revalidacoes']} revalidação(ões), "
+                  f"{stats['falhas']} download(s) completo(s)")
             print("\nObrigado por usar o sistema! Até logo!")
             break
         else:
@@ -411,7 +1080,7 @@ def menu_livros(api):
                 print("✗ Erro: Digite valores numéricos válidos para preço e estoque!")
         
         elif opcao == "2":
-            api.listar_livros()
+            api.listar_livros(Renderizador.terminal())
         
         elif opcao == "3":
             livro_id = input("ID do livro: ").strip()
@@ -437,7 +1106,7 @@ def menu_livros(api):
             if not livro_id:
                 print("✗ ID não pode ser vazio!")
                 continue
-                
+            
             confirma = input(f"Confirma a exclusão do livro ID {livro_id}? (s/n): ")
             if confirma.lower() == 's':
                 api.deletar_livro(livro_id)
@@ -465,7 +1134,7 @@ def menu_vendas(api):
         
         if opcao == "1":
             try:
-                api.listar_livros()
+                api.listar_livros(Renderizador.terminal())
                 livro_id = input("\nID do livro: ").strip()
                 if not livro_id:
                     print("✗ ID não pode ser vazio!")
@@ -477,7 +1146,7 @@ def menu_vendas(api):
                 print("✗ Erro: Digite um valor numérico válido para quantidade!")
         
         elif opcao == "2":
-            api.listar_vendas()
+            api.listar_vendas(Renderizador.terminal(), fluxo=True)
         
         elif opcao == "3":
             venda_id = input("ID da venda: ").strip()
@@ -499,7 +1168,7 @@ def menu_vendas(api):
             if not venda_id:
                 print("✗ ID não pode ser vazio!")
                 continue
-                
+            
             confirma = input(f"Confirma o cancelamento da venda ID {venda_id}? (s/n): ")
             if confirma.lower() == 's':
                 api.deletar_venda(venda_id)
@@ -518,22 +1187,31 @@ def menu_pesquisa_avancada(api):
     print("Deixe em branco para não filtrar por esse critério")
     
     try:
+        titulo = input("Título: ").strip() or None
         autor = input("Autor: ").strip() or None
         categoria = input("Categoria: ").strip() or None
         preco_str = input("Preço máximo: R$ ").strip()
         preco_max = float(preco_str) if preco_str else None
         
-        api.pesquisa_avancada_livros(autor, categoria, preco_max)
+        api.pesquisa_avancada_livros(autor, categoria, preco_max, Renderizador.terminal(), titulo)
     except ValueError:
         print("✗ Erro: Digite um valor numérico válido para o preço!")
 
 
 if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        # Modo não interativo: CRUD, pesquisa, gráficos e lote (ver cli.py)
+        import cli
+        sys.exit(cli.main(sys.argv[1:]))
+    
     print("\n" + "="*60)
     print("  BEM-VINDO AO SISTEMA DE GERENCIAMENTO DE LIVRARIA")
     print("="*60)
-    print("\nCertifique-se de que o JSON Server está rodando na porta 3000")
-    print("Comando: json-server --watch db.json --port 3000")
+    if os.environ.get(VARIAVEL_SQLITE):
+        print(f"\nUsando o banco SQLite {os.environ[VARIAVEL_SQLITE]}")
+    else:
+        print("\nCertifique-se de que o JSON Server está rodando na porta 3000")
+        print("Comando: json-server --watch db.json --port 3000")
     input("\nPressione ENTER para continuar...")
     
     menu_principal()
\ No newline at end of file
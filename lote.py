@@ -0,0 +1,389 @@
+"""Importação e exportação em lote de livros e vendas (CSV ou JSONL)
+
+Uso:
+    python livraria.py importar livros catalogo.csv [--trabalhadores 16]
+    python livraria.py importar vendas vendas.jsonl [--recomecar]
+    python livraria.py exportar livros saida.csv
+    python livraria.py --sqlite livraria.sqlite importar livros catalogo.csv
+"""
+import argparse
+import csv
+import heapq
+import json
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import closing
+from itertools import chain, islice
+
+TRABALHADORES = 8
+INTERVALO_PROGRESSO = 2.0  # segundos entre linhas de progresso
+MAX_EXEMPLOS_ERRO = 5
+
+CAMPOS = {
+    "livros": ["id", "titulo", "autor", "preco", "estoque", "categoria"],
+    "vendas": ["id", "livro_id", "titulo_livro", "quantidade", "preco_unitario",
+               "total", "cliente", "data"],
+}
+
+# Conversão dos campos numéricos, que chegam como texto no CSV
+TIPOS = {"preco": float, "estoque": int, "quantidade": int,
+         "preco_unitario": float, "total": float}
+
+
+# ==================== LEITURA E ESCRITA ====================
+
+def _formato(caminho):
+    return "jsonl" if caminho.lower().endswith((".jsonl", ".ndjson")) else "csv"
+
+
+def ler_registros(caminho):
+    """Gerar (linha, registro) do arquivo sem carregá-lo inteiro na memória"""
+    with open(caminho, encoding="utf-8", newline="") as arquivo:
+        if _formato(caminho) == "jsonl":
+            for linha, texto in enumerate(arquivo, 1):
+                if not texto.strip():
+                    continue
+                try:
+                    yield linha, json.loads(texto)
+                except json.JSONDecodeError as e:
+                    # Uma linha quebrada vira erro dela, sem derrubar a importação inteira
+                    yield linha, ValueError(f"JSON inválido: {e.msg}")
+        else:
+            for linha, registro in enumerate(csv.DictReader(arquivo), 1):
+                yield linha, {k: v for k, v in registro.items() if v not in (None, "")}
+
+
+def _converter(registro):
+    """Aplicar os tipos numéricos, acusando o campo inválido"""
+    convertido = dict(registro)
+    for campo, tipo in TIPOS.items():
+        if campo in convertido:
+            try:
+                convertido[campo] = tipo(convertido[campo])
+            except (TypeError, ValueError):
+                raise ValueError(f"campo '{campo}' inválido")
+    return convertido
+
+
+def escrever_registros(caminho, colecao, registros):
+    """Gravar os registros em CSV ou JSONL, um por vez; retorna a quantidade"""
+    total = 0
+    with open(caminho, "w", encoding="utf-8", newline="") as arquivo:
+        if _formato(caminho) == "jsonl":
+            for registro in registros:
+                arquivo.write(json.dumps(registro, ensure_ascii=False) + "\n")
+                total += 1
+        else:
+            escritor = csv.DictWriter(arquivo, CAMPOS[colecao], extrasaction="ignore")
+            escritor.writeheader()
+            for registro in registros:
+                escritor.writerow(registro)
+                total += 1
+    return total
+
+
+# ==================== CHECKPOINT ====================
+
+class Checkpoint:
+    """Linhas já gravadas com sucesso, para retomar a importação sem repeti-las
+    
+    Guarda a última linha até a qual tudo deu certo e, acima dela, as faixas de
+    linhas concluídas depois de alguma que falhou: ao retomar, só as linhas com
+    erro (ou não processadas) são enviadas de novo, sem duplicar vendas.
+    """
+    
+    def __init__(self, caminho):
+        self.caminho = caminho
+        self.linha = 0
+        self._concluidas = []  # linhas concluídas fora de ordem, acima de self.linha
+        self._anteriores = set()  # as de cima da marca vindas do arquivo, para pular
+        self._trava = threading.Lock()
+        if os.path.exists(caminho):
+            with open(caminho, encoding="utf-8") as f:
+                dados = json.load(f)
+            self.linha = dados["linha"]
+            for inicio, fim in dados.get("concluidas", []):
+                self._anteriores.update(range(inicio, fim + 1))
+            self._concluidas = sorted(self._anteriores)
+    
+    def zerar(self):
+        """Esquecer o que foi gravado: importar desde o início"""
+        with self._trava:
+            self.linha = 0
+            self._concluidas = []
+            self._anteriores = set()
+    
+    def ja_concluida(self, linha):
+        return linha <= self.linha or linha in self._anteriores
+    
+    def concluir(self, linha):
+        """Marcar a linha como gravada e avançar a marca contínua"""
+        with self._trava:
+            heapq.heappush(self._concluidas, linha)
+            while self._concluidas and self._concluidas[0] == self.linha + 1:
+                self.linha = heapq.heappop(self._concluidas)
+    
+    def _faixas(self):
+        """As linhas concluídas acima da marca como faixas [início, fim]"""
+        faixas = []
+        for linha in sorted(self._concluidas):
+            if faixas and linha == faixas[-1][1] + 1:
+                faixas[-1][1] = linha
+            else:
+                faixas.append([linha, linha])
+        return faixas
+    
+    def salvar(self):
+        with self._trava:
+            temporario = self.caminho + ".tmp"
+            with open(temporario, "w", encoding="utf-8") as f:
+                json.dump({"linha": self.linha, "concluidas": self._faixas()}, f)
+            os.replace(temporario, self.caminho)
+    
+    def remover(self):
+        if os.path.exists(self.caminho):
+            os.remove(self.caminho)
+
+
+# ==================== PROCESSAMENTO ====================
+
+class ResumoLote:
+    """Contadores de uma execução em lote"""
+    
+    def __init__(self):
+        self.sucesso = 0
+        self.erros = Counter()  # mensagem -> quantidade
+        self.exemplos = []      # (linha, mensagem) dos primeiros erros
+        self.pulados = 0
+        self.inicio = time.perf_counter()
+        self.interrompido = False
+    
+    @property
+    def processados(self):
+        return self.sucesso + sum(self.erros.values())
+    
+    def registrar_erro(self, linha, erro):
+        mensagem = str(erro) or type(erro).__name__
+        self.erros[mensagem] += 1
+        if len(self.exemplos) < MAX_EXEMPLOS_ERRO:
+            self.exemplos.append((linha, mensagem))
+    
+    def progresso(self):
+        duracao = time.perf_counter() - self.inicio
+        taxa = self.processados / duracao if duracao else 0
+        return (f"  {self.processados} processado(s): {self.sucesso} ok, "
+                f"{sum(self.erros.values())} erro(s) - {taxa:.0f} registros/s")
+    
+    def imprimir(self):
+        print("\n" + "="*60)
+        print("    RESUMO DA IMPORTAÇÃO" + (" (INTERROMPIDA)" if self.interrompido else ""))
+        print("="*60)
+        print(f"Processados: {self.processados}  (pulados pelo checkpoint: {self.pulados})")
+        print(f"✓ Sucesso: {self.sucesso}")
+        print(f"✗ Erros: {sum(self.erros.values())}")
+        for mensagem, quantidade in self.erros.most_common(MAX_EXEMPLOS_ERRO):
+            print(f"    {quantidade:>6}x {mensagem}")
+        for linha, mensagem in self.exemplos:
+            print(f"    linha {linha}: {mensagem}")
+        print(f"Tempo: {time.perf_counter() - self.inicio:.1f}s")
+        print("="*60)
+
+
+def processar_em_lote(registros, operacao, trabalhadores=TRABALHADORES,
+                      checkpoint=None, exibir_progresso=True):
+    """Executar operacao(registro) em paralelo com no máximo N requisições em andamento"""
+    # Importado aqui: só a importação precisa de threads, e o módulo pesa na partida da CLI
+    from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+    
+    resumo = ResumoLote()
+    pendentes = set()
+    proximo_progresso = time.perf_counter() + INTERVALO_PROGRESSO
+    
+    def colher(futuros):
+        for futuro in futuros:
+            if futuro.colhido:
+                continue
+            futuro.colhido = True
+            try:
+                futuro.result()
+            except Exception as e:
+                resumo.registrar_erro(futuro.linha, e)
+                continue  # fica fora do checkpoint: a próxima execução tenta de novo
+            resumo.sucesso += 1
+            if checkpoint:
+                checkpoint.concluir(futuro.linha)
+    
+    executor = ThreadPoolExecutor(trabalhadores)
+    concluido = False
+    try:
+        for linha, registro in registros:
+            if checkpoint and checkpoint.ja_concluida(linha):
+                resumo.pulados += 1
+                continue
+            if isinstance(registro, Exception):  # linha ilegível no arquivo
+                resumo.registrar_erro(linha, registro)
+                continue
+            # Janela limitada: o arquivo é lido no ritmo em que o servidor responde
+            if len(pendentes) >= trabalhadores * 2:
+                feitos, pendentes = wait(pendentes, return_when=FIRST_COMPLETED)
+                colher(feitos)
+            futuro = executor.submit(operacao, registro)
+            futuro.linha = linha
+            futuro.colhido = False
+            pendentes.add(futuro)
+            
+            if time.perf_counter() >= proximo_progresso:
+                if exibir_progresso:
+                    print(resumo.progresso())
+                if checkpoint:
+                    checkpoint.salvar()
+                proximo_progresso = time.perf_counter() + INTERVALO_PROGRESSO
+        colher(wait(pendentes)[0])
+        concluido = True
+    except KeyboardInterrupt:
+        resumo.interrompido = True
+        for futuro in pendentes:
+            futuro.cancel()
+    finally:
+        executor.shutdown(wait=True)
+        if not concluido:
+            # As que já estavam em andamento terminaram no shutdown e contam no checkpoint
+            colher(f for f in pendentes if not f.cancelled())
+        if checkpoint:
+            # Só uma execução completa e sem erros descarta o checkpoint
+            if concluido and not resumo.erros:
+                checkpoint.remover()
+            else:
+                checkpoint.salvar()
+    return resumo
+
+
+# ==================== OPERAÇÕES ====================
+
+def _gravar_livro(api, registro):
+    """Atualizar o livro se o id existir; senão, criar"""
+    from livraria import ErroAPI
+    
+    livro = _converter(registro)
+    faltando = [c for c in ("titulo", "autor", "preco", "estoque", "categoria")
+                if c not in livro]
+    livro_id = livro.pop("id", None)
+    if livro_id is not None:
+        response = api._requisicao("PATCH", f"/livros/{livro_id}", json=livro)
+        if response.status_code == 200:
+            api._registrar_escrita("livros", livro_id, response.json())
+            return
+        if response.status_code != 404:
+            raise ErroAPI(response.status_code)
+        livro["id"] = livro_id
+    if faltando:
+        raise ValueError(f"campos obrigatórios ausentes: {', '.join(faltando)}")
+    livro.setdefault("versao", 1)
+    response = api._requisicao("POST", "/livros", json=livro)
+    if response.status_code != 201:
+        raise ErroAPI(response.status_code)
+    api._registrar_escrita("livros", registro=response.json())
+
+
+def _gravar_venda(api, registro):
+    from livraria import EstoqueInsuficiente, RegistroNaoEncontrado
+    
+    venda = _converter(registro)
+    if "livro_id" not in venda or "quantidade" not in venda:
+        raise ValueError("campos obrigatórios ausentes: livro_id, quantidade")
+    try:
+        api.registrar_venda(venda["livro_id"], venda["quantidade"],
+                            venda.get("cliente", ""), data=venda.get("data"))
+    except RegistroNaoEncontrado:
+        raise ValueError("livro não encontrado")
+    except EstoqueInsuficiente:
+        raise ValueError("estoque insuficiente")
+
+
+OPERACOES = {"livros": _gravar_livro, "vendas": _gravar_venda}
+
+
+def importar(api, colecao, caminho, trabalhadores=TRABALHADORES, retomar=True,
+             exibir_progresso=True):
+    """Importar o arquivo para a coleção, retomando do checkpoint se existir"""
+    checkpoint = Checkpoint(caminho + ".checkpoint")
+    if not retomar:
+        checkpoint.zerar()
+    operacao = OPERACOES[colecao]
+    return processar_em_lote(ler_registros(caminho), lambda r: operacao(api, r),
+                             trabalhadores, checkpoint, exibir_progresso)
+
+
+def exportar(api, colecao, caminho):
+    """Exportar a coleção inteira para CSV ou JSONL, gravando conforme os registros chegam"""
+    with closing(api._consultar_fluxo(f"/{colecao}")) as registros:
+        primeiro = list(islice(registros, 1))  # um erro do servidor aparece antes de abrir o arquivo
+        return escrever_registros(caminho, colecao, chain(primeiro, registros))
+
+
+# ==================== LINHA DE COMANDO ====================
+
+def main(argv=None):
+    """Entrada não interativa para importar e exportar em lote"""
+    from livraria import BASE_URL, LivrariaAPI, criar_backend
+    from metricas import Metricas, criar_destino
+    from renderizacao import tabela_metricas
+    
+    parser = argparse.ArgumentParser(prog="lote.py",
+                                     description="Importação e exportação em lote")
+    parser.add_argument("--url", default=BASE_URL, help="endereço do json-server")
+    parser.add_argument("--sqlite", help="arquivo SQLite no lugar do json-server")
+    parser.add_argument("--metricas", metavar="ARQUIVO",
+                        help="medir as requisições e gravar em ARQUIVO (.jsonl ou .prom)")
+    adicionar_comandos(parser.add_subparsers(dest="acao", required=True))
+    
+    args = parser.parse_args(argv)
+    backend = criar_backend(args.url, args.sqlite, pool=getattr(args, "trabalhadores", 1))
+    metricas = Metricas([criar_destino(args.metricas)]) if args.metricas else None
+    with LivrariaAPI(base_url=args.url, backend=backend, metricas=metricas) as api:
+        try:
+            return executar(api, args)
+        finally:
+            if metricas is not None:
+                tabela_metricas(metricas.resumo())
+
+
+def adicionar_comandos(sub):
+    """Subcomandos importar e exportar (também usados pela linha de comando em cli.py)"""
+    imp = sub.add_parser("importar", help="importar CSV/JSONL")
+    imp.add_argument("colecao", choices=sorted(OPERACOES))
+    imp.add_argument("arquivo")
+    imp.add_argument("--trabalhadores", type=int, default=TRABALHADORES,
+                     help="requisições simultâneas")
+    imp.add_argument("--recomecar", action="store_true",
+                     help="ignorar o checkpoint e importar desde o início")
+    
+    exp = sub.add_parser("exportar", help="exportar para CSV/JSONL")
+    exp.add_argument("colecao", choices=sorted(CAMPOS))
+    exp.add_argument("arquivo")
+
+
+def executar(api, args):
+    """Rodar importar/exportar já interpretados; retorna o código de saída"""
+    if args.acao == "importar":
+        resumo = importar(api, args.colecao, args.arquivo, args.trabalhadores,
+                          retomar=not args.recomecar)
+        resumo.imprimir()
+        if resumo.erros and not resumo.interrompido:
+            print("  Checkpoint mantido: rode de novo para repetir só as linhas com erro "
+                  "(--recomecar importa tudo)")
+        return 1 if resumo.erros or resumo.interrompido else 0
+    try:
+        total = exportar(api, args.colecao, args.arquivo)
+    except Exception as e:
+        print(f"✗ Erro ao exportar {args.colecao}: {e}")
+        return 1
+    print(f"✓ {total} registro(s) exportado(s) para {args.arquivo}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,304 @@
+"""Instrumentação das requisições da LivrariaAPI
+
+Cada chamada ao backend é medida por método e rota (/livros/{id} agrupa
+todos os ids): quantidade, erros, status, bytes e histograma de latência,
+de onde saem p50/p95/p99. Cada requisição também é repassada aos destinos
+configurados (memória, arquivo JSONL, texto no formato do Prometheus).
+
+Uso:
+    api = LivrariaAPI(metricas=Metricas([DestinoJSONL("requisicoes.jsonl")]))
+    ...
+    tabela_metricas(api.metricas.resumo())
+    
+    api.criar_venda = perfilar(api.criar_venda)  # cProfile só nesse método
+"""
+import cProfile
+import functools
+import io
+import json
+import os
+import pstats
+import threading
+import time
+from bisect import bisect_left
+from collections import Counter, deque
+
+# Limites dos baldes do histograma, em ms: 1-1.25-1.5-2-2.5-3-4-5-6-8 por década
+# (erro máximo de 25% nos percentis, com memória fixa por rota)
+LIMITES_MS = [round(m * 10 ** e, 3) for e in range(-2, 5)
+              for m in (1, 1.25, 1.5, 2, 2.5, 3, 4, 5, 6, 8)]
+# Subconjunto exportado para o Prometheus, em segundos
+LIMITES_PROMETHEUS = [m * 10 ** e for e in range(-5, 2) for m in (1, 2.5, 5)]
+
+
+def rota(caminho):
+    """'/livros/42?x=1' -> '/livros/{id}'"""
+    partes = caminho.split("?")[0].strip("/").split("/")
+    if len(partes) > 1:
+        partes[1:] = ["{id}"] * (len(partes) - 1)
+    return "/" + "/".join(partes)
+
+
+class Histograma:
+    """Contagem de latências em baldes de largura crescente"""
+    
+    def __init__(self):
+        self.baldes = [0] * (len(LIMITES_MS) + 1)
+        self.total = 0
+        self.soma_ms = 0.0
+        self.maximo_ms = 0.0
+    
+    def registrar(self, ms):
+        self.baldes[bisect_left(LIMITES_MS, ms)] += 1
+        self.total += 1
+        self.soma_ms += ms
+        self.maximo_ms = max(self.maximo_ms, ms)
+    
+    def percentil(self, p):
+        """Latência (ms) abaixo da qual ficam p% das requisições, pelo limite do balde"""
+        if not self.total:
+            return 0.0
+        alvo = p / 100 * self.total
+        acumulado = 0
+        for i, quantidade in enumerate(self.baldes):
+            acumulado += quantidade
+            if acumulado >= alvo:
+                return min(LIMITES_MS[i], self.maximo_ms) if i < len(LIMITES_MS) else self.maximo_ms
+        return self.maximo_ms
+    
+    def acumulado_ate(self, limite_ms):
+        """Quantas requisições levaram até limite_ms (limite precisa ser um dos LIMITES_MS)"""
+        return sum(self.baldes[:bisect_left(LIMITES_MS, limite_ms) + 1])
+
+
+class EstatisticasRota:
+    """Números acumulados de um método + rota"""
+    
+    def __init__(self):
+        self.latencia = Histograma()
+        self.erros = 0
+        self.status = Counter()
+        self.bytes_enviados = 0
+        self.bytes_recebidos = 0
+
+
+# ==================== DESTINOS ====================
+
+class DestinoMemoria:
+    """Guarda as últimas requisições numa fila limitada"""
+    
+    def __init__(self, max_eventos=10000):
+        self.eventos = deque(maxlen=max_eventos)
+    
+    def registrar(self, evento):
+        self.eventos.append(evento)
+    
+    def fechar(self):
+        pass
+
+
+class DestinoJSONL:
+    """Uma linha JSON por requisição, acrescentada ao arquivo"""
+    
+    def __init__(self, caminho):
+        self.caminho = caminho
+        self._arquivo = open(caminho, "a", encoding="utf-8")
+        self._trava = threading.Lock()
+    
+    def registrar(self, evento):
+        linha = json.dumps(evento, ensure_ascii=False) + "\n"
+        with self._trava:
+            self._arquivo.write(linha)
+    
+    def fechar(self):
+        with self._trava:
+            self._arquivo.close()
+
+
+class DestinoPrometheus:
+    """Regrava um arquivo no formato texto do Prometheus (para o textfile collector)"""
+    
+    def __init__(self, caminho, intervalo=10.0):
+        self.caminho = caminho
+        self.intervalo = intervalo
+        self.metricas = None  # preenchido por Metricas
+        self._proxima = 0.0
+    
+    def registrar(self, evento):
+        agora = time.monotonic()
+        if agora >= self._proxima:
+            self._proxima = agora + self.intervalo
+            self.gravar()
+    
+    def gravar(self):
+        temporario = self.caminho + ".tmp"
+        with open(temporario, "w", encoding="utf-8") as f:
+            f.write(self.metricas.prometheus())
+        os.replace(temporario, self.caminho)
+    
+    def fechar(self):
+        self.gravar()
+
+
+def criar_destino(caminho):
+    """Destino pela extensão: .prom para Prometheus, qualquer outra para JSONL"""
+    if caminho.endswith(".prom"):
+        return DestinoPrometheus(caminho)
+    return DestinoJSONL(caminho)
+
+
+# ==================== COLETA ====================
+
+class Metricas:
+    """Latência, contagem, bytes e erros das requisições, por método e rota"""
+    
+    def __init__(self, destinos=None):
+        self.destinos = list(destinos or [])
+        for destino in self.destinos:
+            if isinstance(destino, DestinoPrometheus):
+                destino.metricas = self
+        self.rotas = {}  # (metodo, rota) -> EstatisticasRota
+        self.inicio = time.time()
+        self._trava = threading.Lock()
+    
+    def registrar(self, metodo, caminho, status, duracao, enviados=0, recebidos=0, erro=None):
+        """Contabilizar uma requisição (status None quando não houve resposta)"""
+        chave = (metodo, rota(caminho))
+        ms = duracao * 1000
+        with self._trava:
+            estatisticas = self.rotas.get(chave)
+            if estatisticas is None:
+                estatisticas = self.rotas[chave] = EstatisticasRota()
+            estatisticas.latencia.registrar(ms)
+            estatisticas.status[status or "erro"] += 1
+            estatisticas.bytes_enviados += enviados
+            estatisticas.bytes_recebidos += recebidos
+            if erro is not None or (status or 0) >= 500:
+                estatisticas.erros += 1
+        
+        if self.destinos:
+            evento = {"momento": time.time(), "metodo": metodo, "rota": chave[1],
+                      "caminho": caminho, "status": status, "ms": round(ms, 3),
+                      "enviados": enviados, "recebidos": recebidos}
+            if erro is not None:
+                evento["erro"] = type(erro).__name__
+            for destino in self.destinos:
+                destino.registrar(evento)
+    
+    def medir(self, metodo, caminho, executar, corpo=None, fluxo=False):
+        """Executar a requisição medindo tempo e bytes; exceções são contadas e repassadas
+        
+        Com fluxo=True o corpo ainda não foi lido: mede-se até os cabeçalhos, e os
+        bytes recebidos vêm do Content-Length (0 se o servidor não informar).
+        """
+        enviados = len(json.dumps(corpo)) if corpo is not None else 0
+        inicio = time.perf_counter()
+        try:
+            response = executar()
+        except Exception as e:
+            self.registrar(metodo, caminho, None, time.perf_counter() - inicio, enviados, erro=e)
+            raise
+        if fluxo:
+            recebidos = int(response.headers.get("Content-Length") or 0)
+        else:
+            recebidos = len(response.content or b"")
+        self.registrar(metodo, caminho, response.status_code, time.perf_counter() - inicio,
+                       enviados, recebidos)
+        return response
+    
+    def resumo(self):
+        """Uma linha por método + rota, da rota mais chamada para a menos"""
+        with self._trava:
+            linhas = []
+            for (metodo, caminho), e in self.rotas.items():
+                total = e.latencia.total
+                linhas.append({
+                    "metodo": metodo, "rota": caminho, "requisicoes": total,
+                    "erros": e.erros, "taxa_erros": e.erros / total if total else 0.0,
+                    "p50_ms": e.latencia.percentil(50), "p95_ms": e.latencia.percentil(95),
+                    "p99_ms": e.latencia.percentil(99), "max_ms": e.latencia.maximo_ms,
+                    "media_ms": e.latencia.soma_ms / total if total else 0.0,
+                    "bytes_enviados": e.bytes_enviados, "bytes_recebidos": e.bytes_recebidos,
+                    "status": {str(s): q for s, q in e.status.items()},
+                })
+        return sorted(linhas, key=lambda l: l["requisicoes"], reverse=True)
+    
+    def prometheus(self):
+        """Texto no formato de exposição do Prometheus"""
+        saida = [
+            "# HELP livraria_requisicao_segundos Latência das requisições ao backend",
+            "# TYPE livraria_requisicao_segundos histogram",
+        ]
+        with self._trava:
+            itens = sorted(self.rotas.items())
+            for (metodo, caminho), e in itens:
+                rotulos = f'metodo="{metodo}",rota="{caminho}"'
+                for limite in LIMITES_PROMETHEUS:
+                    quantidade = e.latencia.acumulado_ate(round(limite * 1000, 3))
+                    saida.append(f'livraria_requisicao_segundos_bucket{{{rotulos},le="{limite:g}"}} {quantidade}')
+                saida.append(f'livraria_requisicao_segundos_bucket{{{rotulos},le="+Inf"}} {e.latencia.total}')
+                saida.append(f"livraria_requisicao_segundos_sum{{{rotulos}}} {e.latencia.soma_ms / 1000:.6f}")
+                saida.append(f"livraria_requisicao_segundos_count{{{rotulos}}} {e.latencia.total}")
+            
+            saida += ["# HELP livraria_requisicoes_total Requisições por status",
+                      "# TYPE livraria_requisicoes_total counter"]
+            for (metodo, caminho), e in itens:
+                for status, quantidade in sorted(e.status.items(), key=str):
+                    saida.append(f'livraria_requisicoes_total{{metodo="{metodo}",rota="{caminho}",'
+                                 f'status="{status}"}} {quantidade}')
+            
+            saida += ["# HELP livraria_erros_total Falhas de conexão e respostas 5xx",
+                      "# TYPE livraria_erros_total counter"]
+            for (metodo, caminho), e in itens:
+                saida.append(f'livraria_erros_total{{metodo="{metodo}",rota="{caminho}"}} {e.erros}')
+            
+            saida += ["# HELP livraria_bytes_total Bytes trafegados no corpo das requisições",
+                      "# TYPE livraria_bytes_total counter"]
+            for (metodo, caminho), e in itens:
+                saida.append(f'livraria_bytes_total{{metodo="{metodo}",rota="{caminho}",'
+                             f'direcao="enviado"}} {e.bytes_enviados}')
+                saida.append(f'livraria_bytes_total{{metodo="{metodo}",rota="{caminho}",'
+                             f'direcao="recebido"}} {e.bytes_recebidos}')
+        return "\n".join(saida) + "\n"
+    
+    def zerar(self):
+        with self._trava:
+            self.rotas.clear()
+            self.inicio = time.time()
+    
+    def fechar(self):
+        for destino in self.destinos:
+            destino.fechar()
+
+
+# ==================== PERFIL ====================
+
+def perfilar(funcao, arquivo=None, linhas=20, ordenar="cumulative"):
+    """Envolver a função com cProfile, somando todas as chamadas
+    
+    O relatório sai em funcao_perfilada.relatorio(); com arquivo, o perfil é
+    gravado no formato do pstats após cada chamada (para snakeviz etc.).
+    """
+    perfil = cProfile.Profile()
+    trava = threading.Lock()
+    
+    @functools.wraps(funcao)
+    def perfilada(*args, **kwargs):
+        # cProfile não aceita perfis aninhados: chamadas concorrentes rodam sem medição
+        if not trava.acquire(blocking=False):
+            return funcao(*args, **kwargs)
+        try:
+            return perfil.runcall(funcao, *args, **kwargs)
+        finally:
+            if arquivo:
+                perfil.dump_stats(arquivo)
+            trava.release()
+    
+    def relatorio():
+        saida = io.StringIO()
+        pstats.Stats(perfil, stream=saida).sort_stats(ordenar).print_stats(linhas)
+        return saida.getvalue()
+    
+    perfilada.relatorio = relatorio
+    perfilada.perfil = perfil
+    return perfilada
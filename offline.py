@@ -0,0 +1,424 @@
+"""Modo offline: disjuntor, leituras da cópia local e diário de escritas
+
+Sem o json-server, cada chamada esperava as novas tentativas de conexão (ou
+o timeout) só para terminar em "✗ Erro de conexão". Com o ModoOffline:
+
+- um disjuntor abre na primeira falha de conexão ou numa sonda TCP rápida,
+  feita antes de uma requisição quando o servidor não responde há `espera`
+  segundos; aberto, as requisições falham na hora, sem tocar na rede, e a
+  cada `espera` segundos uma sonda confere se o servidor voltou;
+- as leituras saem da réplica local ou, sem réplica, do que houver no cache,
+  mesmo vencido;
+- as escritas (CRUD de livros e vendas) são aplicadas na cópia local e
+  anotadas num diário (um JSON por linha, só acrescentado); o que é criado
+  offline recebe um id provisório;
+- quando o servidor volta, o diário é reenviado em ordem, antes de qualquer
+  outra requisição. Uma venda sem estoque no servidor não é gravada, e um
+  estoque alterado offline num livro que também mudou no servidor entra como
+  diferença; os dois casos ficam anotados em .livraria_conflitos.jsonl.
+"""
+import io
+import json
+import os
+import socket
+import threading
+import time
+import uuid
+from contextlib import redirect_stdout
+from urllib.parse import urlsplit
+
+from backends import ServidorIndisponivel
+
+ARQUIVO_DIARIO = ".livraria_offline.jsonl"
+ARQUIVO_CONFLITOS = ".livraria_conflitos.jsonl"
+ESPERA = 5.0        # segundos com o disjuntor aberto antes de sondar o servidor de novo
+TEMPO_SONDA = 0.5   # segundos para a sonda TCP conectar
+PREFIXO = "offline-"  # ids provisórios do que foi criado offline
+
+
+class Conflito(Exception):
+    """Escrita feita offline que o servidor não aceitou como estava"""
+
+
+class DiarioOffline:
+    """Arquivo JSONL só acrescentado com as escritas feitas offline e as já reenviadas"""
+    
+    def __init__(self, caminho=ARQUIVO_DIARIO, fsync=False):
+        self.caminho = caminho
+        self.fsync = fsync  # também resistir a queda de energia, não só do processo
+        self._arquivo = None
+    
+    def ler(self):
+        """(escritas pendentes em ordem, {id provisório: id no servidor} das já reenviadas)"""
+        escritas, ids = {}, {}
+        if not os.path.exists(self.caminho):
+            return [], ids
+        with open(self.caminho, encoding="utf-8") as f:
+            for texto in f:
+                try:
+                    entrada = json.loads(texto)
+                except ValueError:
+                    continue  # linha cortada por uma queda no meio da escrita
+                if "op" in entrada:
+                    escritas[entrada["seq"]] = entrada
+                elif "feito" in entrada:
+                    feita = escritas.pop(entrada["feito"], None)
+                    if feita is not None and entrada.get("id") is not None:
+                        ids[feita["id"]] = entrada["id"]
+        return list(escritas.values()), ids
+    
+    def anotar(self, entrada):
+        if self._arquivo is None:
+            self._arquivo = open(self.caminho, "a", encoding="utf-8")
+        self._arquivo.write(json.dumps(entrada, ensure_ascii=False) + "\n")
+        self._arquivo.flush()
+        if self.fsync:
+            os.fsync(self._arquivo.fileno())
+    
+    def limpar(self):
+        """Apagar o diário, com tudo já reenviado"""
+        self.fechar()
+        if os.path.exists(self.caminho):
+            os.remove(self.caminho)
+    
+    def fechar(self):
+        if self._arquivo is not None:
+            self._arquivo.close()
+            self._arquivo = None
+
+
+class ModoOffline:
+    """Disjuntor na frente do servidor e diário das escritas feitas sem ele"""
+    
+    def __init__(self, diario=None, espera=ESPERA, tempo_sonda=TEMPO_SONDA,
+                 conflitos=ARQUIVO_CONFLITOS):
+        self.diario = diario if diario is not None else DiarioOffline()
+        self.espera = espera
+        self.tempo_sonda = tempo_sonda
+        self.arquivo_conflitos = conflitos
+        self._trava = threading.RLock()
+        self.aberto = False     # disjuntor aberto: servidor fora do ar
+        self._aberto_em = 0.0   # time.monotonic() da última falha ou sonda sem resposta
+        self._contato = None    # time.monotonic() da última resposta do servidor
+        self._reenviando = False
+        self._pendentes, self._ids = self.diario.ler()
+        self._seq = max((e["seq"] for e in self._pendentes), default=0)
+        self.conflitos = []     # conflitos do último reenvio
+    
+    @property
+    def pendentes(self):
+        """Escritas ainda não reenviadas ao servidor"""
+        return len(self._pendentes)
+    
+    # ==================== DISJUNTOR ====================
+    
+    def _sondar(self, backend):
+        """Conexão TCP rápida ao servidor; backends locais (SQLite) estão sempre disponíveis"""
+        url = getattr(backend, "base_url", None)
+        if not url:
+            return True
+        partes = urlsplit(url)
+        porta = partes.port or (443 if partes.scheme == "https" else 80)
+        try:
+            socket.create_connection((partes.hostname, porta), timeout=self.tempo_sonda).close()
+            return True
+        except OSError:
+            return False
+    
+    def disponivel(self, api):
+        """Se as requisições podem ir ao servidor; na volta dele, reenvia o diário antes"""
+        with self._trava:
+            if self._reenviando:
+                return not self.aberto
+            if self.aberto:
+                if time.monotonic() - self._aberto_em < self.espera:
+                    return False
+                if not self._sondar(api.backend):
+                    self._aberto_em = time.monotonic()
+                    return False
+                self.aberto = False
+                print("✓ Servidor de volta.")
+            elif self._contato is None or time.monotonic() - self._contato >= self.espera:
+                # Muito tempo sem resposta: a sonda evita esperar as novas tentativas de conexão
+                if not self._sondar(api.backend):
+                    self.registrar_falha()
+                    return False
+            self._contato = time.monotonic()
+            if self._pendentes:
+                self.reenviar(api)
+            return not self.aberto
+    
+    def registrar_contato(self):
+        """O servidor respondeu: dispensa a sonda nas próximas `espera` segundos"""
+        self._contato = time.monotonic()
+    
+    def registrar_falha(self):
+        """Abrir o disjuntor depois de uma falha de conexão"""
+        with self._trava:
+            self._aberto_em = time.monotonic()
+            if not self.aberto:
+                self.aberto = True
+                print("✗ Servidor fora do ar: trabalhando offline (leituras da cópia local, "
+                      "escritas guardadas para enviar depois).")
+    
+    # ==================== ESCRITAS OFFLINE ====================
+    
+    def _anotar(self, op, **dados):
+        with self._trava:
+            if self._reenviando:
+                # Caiu no meio do reenvio: a escrita continua a mesma entrada do diário
+                raise ServidorIndisponivel()
+            self._seq += 1
+            entrada = dict(dados, seq=self._seq, op=op)
+            self.diario.anotar(entrada)
+            self._pendentes.append(entrada)
+    
+    def local(self, api, colecao, item_id):
+        """Registro da cópia local (réplica ou cache), ou None se não houver"""
+        try:
+            status, registro = api._consultar(f"/{colecao}/{item_id}")
+        except ServidorIndisponivel:
+            return None
+        return dict(registro) if status == 200 and registro else None
+    
+    def _salvar_local(self, api, colecao, registro, anterior=None):
+        api.cache.guardar(f"/{colecao}/{registro['id']}", registro)
+        api._notificar("registro_salvo", colecao, registro, anterior)
+    
+    def _remover_local(self, api, colecao, item_id, anterior=None):
+        # Só o item: as listas no cache são a única cópia offline quando não há réplica
+        api.cache.descartar(f"/{colecao}/{item_id}")
+        api._notificar("registro_removido", colecao, item_id, anterior)
+    
+    def criar_livro(self, api, livro):
+        """Livro com id provisório e a chave que o reenvio procura antes de criá-lo"""
+        from livraria import carimbo
+        
+        livro = dict(livro, id=PREFIXO + uuid.uuid4().hex[:12], atualizado_em=carimbo(),
+                     chave=livro.get("chave") or uuid.uuid4().hex)
+        self._anotar("criar_livro", id=livro["id"], registro=livro)
+        self._salvar_local(api, "livros", livro)
+        return livro
+    
+    def atualizar_livro(self, api, livro, campos):
+        """Livro da cópia local com os campos alterados; o estoque visto fica no diário"""
+        novo = dict(livro, **campos)
+        self._anotar("atualizar_livro", id=livro["id"], campos=campos,
+                     base={"estoque": livro.get("estoque")})
+        self._salvar_local(api, "livros", novo, livro)
+        return novo
+    
+    def deletar_livro(self, api, livro_id, livro=None):
+        self._anotar("deletar_livro", id=livro_id)
+        self._remover_local(api, "livros", livro_id, livro)
+    
+    def registrar_venda(self, api, venda, livro):
+        """Venda com id provisório, já conferida contra o estoque do livro dado
+        
+        A chave (a do POST que ficou sem resposta, se houve um) é procurada no
+        servidor antes do reenvio: a venda pode já ter chegado lá.
+        """
+        from livraria import carimbo
+        
+        venda = dict(venda, id=PREFIXO + uuid.uuid4().hex[:12], atualizado_em=carimbo(),
+                     chave=venda.get("chave") or uuid.uuid4().hex)
+        self._anotar("venda", id=venda["id"], registro=venda)
+        self._salvar_local(api, "livros", dict(livro, estoque=livro["estoque"] - venda["quantidade"]),
+                           livro)
+        self._salvar_local(api, "vendas", venda)
+        return venda
+    
+    def atualizar_venda(self, api, venda, anterior):
+        campos = {c: venda[c] for c in ("quantidade", "cliente") if venda[c] != anterior[c]}
+        self._anotar("atualizar_venda", id=venda["id"], campos=campos)
+        self._salvar_local(api, "vendas", venda, anterior)
+    
+    def deletar_venda(self, api, venda):
+        self._anotar("deletar_venda", id=venda["id"])
+        self._remover_local(api, "vendas", venda["id"], venda)
+        livro = self.local(api, "livros", venda["livro_id"])
+        if livro is not None:
+            self._salvar_local(api, "livros", dict(livro, estoque=livro["estoque"] + venda["quantidade"]),
+                               livro)
+    
+    # ==================== REENVIO ====================
+    
+    def reenviar(self, api):
+        """Enviar as escritas do diário em ordem; retorna quantas saíram dele
+        
+        Se o servidor cair de novo no meio, o resto fica para a próxima volta.
+        """
+        with self._trava:
+            if self._reenviando or not self._pendentes:
+                return 0
+            self._reenviando = True
+            self.conflitos = []
+            enviadas = 0
+            try:
+                while self._pendentes and not self.aberto:
+                    entrada = self._pendentes[0]
+                    try:
+                        with redirect_stdout(io.StringIO()) as mensagens:
+                            id_real = self._reenviar(api, entrada, mensagens)
+                    except ServidorIndisponivel:
+                        break
+                    except Conflito as e:
+                        self._anotar_conflito(entrada, str(e))
+                        id_real = None
+                    self.diario.anotar({"feito": entrada["seq"], "id": id_real})
+                    if id_real is not None:
+                        self._ids[entrada["id"]] = id_real
+                    self._pendentes.pop(0)
+                    enviadas += 1
+                if not self._pendentes:
+                    self.diario.limpar()
+                    self._ids = {}
+            finally:
+                self._reenviando = False
+        
+        if enviadas:
+            print(f"✓ {enviadas} escrita(s) feita(s) offline enviada(s) ao servidor.")
+        if self.conflitos:
+            print(f"✗ {len(self.conflitos)} conflito(s) no reenvio: veja {self.arquivo_conflitos}")
+        return enviadas
+    
+    def _id(self, item_id):
+        return self._ids.get(item_id, item_id)
+    
+    def _falhou(self, mensagens):
+        """Escrita recusada: servidor caiu de novo ou conflito com o que mudou nele"""
+        if self.aberto:
+            raise ServidorIndisponivel()
+        raise Conflito(mensagens.getvalue().strip().lstrip("✗ ") or "recusada pelo servidor")
+    
+    def _reenviar(self, api, entrada, mensagens):
+        """Repetir uma escrita pela LivrariaAPI; retorna o id no servidor do que foi criado"""
+        op, item_id = entrada["op"], self._id(entrada["id"])
+        if str(item_id).startswith(PREFIXO) and op not in ("criar_livro", "venda"):
+            raise Conflito("o registro criado offline não chegou ao servidor")
+        
+        if op == "criar_livro":
+            registro = entrada["registro"]
+            gravado = self._gravado(api, "livros", registro)
+            if gravado is not None:  # um POST de antes chegou, só a resposta se perdeu
+                api._registrar_escrita("livros", registro=gravado)
+                self._remover_local(api, "livros", registro["id"], registro)
+                return gravado["id"]
+            campos = [registro[c] for c in ("titulo", "autor", "preco", "estoque", "categoria")]
+            livro = api.criar_livro(*campos, chave=registro.get("chave"))
+            if livro is None:
+                self._falhou(mensagens)
+            self._remover_local(api, "livros", registro["id"], registro)
+            return livro["id"]
+        
+        if op == "venda":
+            registro = entrada["registro"]
+            livro_id = self._id(registro["livro_id"])
+            if str(livro_id).startswith(PREFIXO):
+                raise Conflito("o livro criado offline não chegou ao servidor")
+            gravada = self._gravado(api, "vendas", registro)
+            if gravada is not None:
+                return self._baixar_gravada(api, entrada, gravada, livro_id)
+            try:
+                venda = api.registrar_venda(livro_id, registro["quantidade"], registro["cliente"],
+                                            registro["data"], chave=registro.get("chave"))
+            except ServidorIndisponivel:
+                raise
+            except Exception as e:
+                self._remover_local(api, "vendas", registro["id"], registro)
+                self._recarregar(api, livro_id)
+                disponivel = getattr(e, "disponivel", None)
+                if disponivel is not None:
+                    raise Conflito(f"estoque insuficiente no servidor (disponível: {disponivel})")
+                raise Conflito(f"{type(e).__name__}: {e}")
+            self._remover_local(api, "vendas", registro["id"], registro)
+            return venda.get("id")
+        
+        if op == "atualizar_livro":
+            campos = dict(entrada["campos"])
+            ajuste = None
+            if "estoque" in campos and entrada["base"]["estoque"] is not None:
+                atual = self._atual(api, item_id)
+                if atual is None:
+                    self._falhou(mensagens)
+                if atual["estoque"] != entrada["base"]["estoque"]:
+                    # O estoque mudou no servidor (vendas de outros caixas): vale a diferença
+                    diferenca = campos["estoque"] - entrada["base"]["estoque"]
+                    ajuste = (atual["estoque"], diferenca)
+                    campos["estoque"] = max(atual["estoque"] + diferenca, 0)
+            if not api.atualizar_livro(item_id, **campos):
+                self._recarregar(api, item_id)
+                self._falhou(mensagens)
+            if ajuste is not None:
+                self._anotar_conflito(entrada, f"estoque mudou no servidor para {ajuste[0]}; "
+                                               f"aplicada a diferença de {ajuste[1]:+d}: {campos['estoque']}")
+            return None
+        
+        if op == "deletar_livro":
+            if not api.deletar_livro(item_id):
+                self._falhou(mensagens)
+            return None
+        
+        if op == "atualizar_venda":
+            if not api.atualizar_venda(item_id, **entrada["campos"]):
+                self._falhou(mensagens)
+            return None
+        
+        if op == "deletar_venda":
+            if not api.deletar_venda(item_id):
+                self._falhou(mensagens)
+            return None
+        raise Conflito(f"operação desconhecida: {op}")
+    
+    def _gravado(self, api, colecao, registro):
+        """O registro com a mesma chave já no servidor (POST sem resposta), ou None"""
+        chave = registro.get("chave")
+        if not chave:
+            return None  # diário de uma versão sem chaves
+        response = api._requisicao("GET", f"/{colecao}", params={"chave": chave})
+        if response.status_code != 200:
+            raise Conflito(f"não foi possível conferir se a escrita chegou (status {response.status_code})")
+        encontrados = response.json()
+        return encontrados[0] if encontrados else None
+    
+    def _baixar_gravada(self, api, entrada, venda, livro_id):
+        """Venda que chegou ao servidor sem a baixa de estoque: baixar agora"""
+        registro = entrada["registro"]
+        self._remover_local(api, "vendas", registro["id"], registro)
+        try:
+            api._ajustar_estoque(livro_id, -registro["quantidade"])
+        except ServidorIndisponivel:
+            raise
+        except Exception as e:
+            self._recarregar(api, livro_id)
+            self._anotar_conflito(entrada, f"venda {venda['id']} já estava no servidor, mas o estoque "
+                                           f"não foi baixado ({type(e).__name__}: {e})")
+        api._registrar_escrita("vendas", registro=venda)
+        return venda["id"]
+    
+    def _atual(self, api, livro_id):
+        """Livro lido direto do servidor (None se não existe mais)"""
+        try:
+            livro, _ = api._ler_para_alterar("livros", livro_id)
+        except ServidorIndisponivel:
+            raise
+        except Exception:
+            return None
+        return livro
+    
+    def _recarregar(self, api, livro_id):
+        """Trocar na cópia local o livro mexido offline pela versão do servidor"""
+        livro = self._atual(api, livro_id)
+        if livro is not None:
+            self._salvar_local(api, "livros", livro)
+    
+    def _anotar_conflito(self, entrada, motivo):
+        conflito = {"escrita": entrada, "motivo": motivo,
+                    "em": time.strftime("%Y-%m-%d %H:%M:%S")}
+        self.conflitos.append(conflito)
+        if self.arquivo_conflitos:
+            with open(self.arquivo_conflitos, "a", encoding="utf-8") as f:
+                f.write(json.dumps(conflito, ensure_ascii=False) + "\n")
+    
+    def fechar(self):
+        self.diario.fechar()
@@ -0,0 +1,239 @@
+"""Relatórios de vendas somados em vários processos (map/reduce)
+
+Os gráficos somam as vendas num laço só, num núcleo. Aqui as vendas são
+divididas em partições, cada processo soma a sua por livro, cliente e mês
+(map) e os totais parciais são somados no processo principal (reduce).
+
+As partições vêm do servidor, por faixa de datas (/vendas?data_gte=...&data_lte=...,
+cada processo com a própria conexão), ou de um arquivo JSONL exportado
+(python livraria.py exportar vendas vendas.jsonl), por faixa de bytes.
+
+Como no gráfico de vendas, tudo é somado por livro_id: título e categoria
+atuais saem do catálogo só no final, uma vez por livro.
+"""
+import json
+import os
+from datetime import date, timedelta
+
+from analise import SEM_CATEGORIA
+from juncao import por_titulo
+
+AGRUPAMENTOS = ("livro", "categoria", "cliente", "mes")
+PARTICOES_POR_PROCESSO = 4             # sobra trabalho para quem terminar antes
+BYTES_POR_PARTICAO = 32 * 1024 * 1024  # limita a memória de cada processo
+
+
+def _chave(livro_id):
+    # O db.json mistura livro_id numérico e texto ("1" e 1 são o mesmo livro)
+    return str(livro_id)
+
+
+# ==================== MAP ====================
+
+def _parcial():
+    # Cada grupo: chave -> [total, quantidade, vendas]
+    return {"vendas": 0, "livro": {}, "cliente": {}, "mes": {}, "titulo": {}}
+
+
+def _acumular(grupo, chave, total, quantidade):
+    acumulado = grupo.get(chave)
+    if acumulado is None:
+        grupo[chave] = [total, quantidade, 1]
+    else:
+        acumulado[0] += total
+        acumulado[1] += quantidade
+        acumulado[2] += 1
+
+
+def somar(vendas):
+    """Somar as vendas por livro, cliente e mês; retorna o parcial"""
+    parcial = _parcial()
+    por_livro, por_cliente, por_mes = parcial["livro"], parcial["cliente"], parcial["mes"]
+    titulos = parcial["titulo"]
+    for venda in vendas:
+        livro_id = _chave(venda['livro_id'])
+        total, quantidade = venda['total'], venda['quantidade']
+        if livro_id not in titulos:
+            titulos[livro_id] = venda['titulo_livro']  # para livros que já saíram do catálogo
+        _acumular(por_livro, livro_id, total, quantidade)
+        _acumular(por_cliente, venda['cliente'], total, quantidade)
+        _acumular(por_mes, venda['data'][:7], total, quantidade)
+        parcial["vendas"] += 1
+    return parcial
+
+
+def somar_arquivo(caminho, inicio, fim):
+    """Somar as linhas do JSONL que começam entre os bytes inicio e fim"""
+    with open(caminho, "rb") as arquivo:
+        if inicio:
+            arquivo.seek(inicio - 1)
+            arquivo.readline()  # o resto da linha que começou antes da faixa
+        dados = arquivo.read(max(fim - arquivo.tell(), 0))
+        if dados and not dados.endswith(b"\n"):
+            dados += arquivo.readline()  # a última linha da faixa até o fim
+    # Texto decodificado de uma vez: json.loads de str é mais rápido que de bytes.
+    # split("\n") e não splitlines(): o JSON pode ter U+2028 dentro das strings.
+    return somar(map(json.loads, filter(None, dados.decode("utf-8").split("\n"))))
+
+
+def somar_servidor(origem, params):
+    """Somar uma faixa de datas lida do servidor, com uma conexão própria do processo"""
+    from livraria import LivrariaAPI, criar_backend
+    
+    url, sqlite = origem
+    with LivrariaAPI(base_url=url, backend=criar_backend(url, sqlite), cache_ttl=0) as api:
+        return somar(api._consultar_fluxo("/vendas", params))
+
+
+# ==================== PARTIÇÕES ====================
+
+def particionar_arquivo(caminho, particoes):
+    """Faixas de bytes [(inicio, fim)] do arquivo, com no máximo BYTES_POR_PARTICAO cada"""
+    tamanho = os.path.getsize(caminho)
+    particoes = max(particoes, -(-tamanho // BYTES_POR_PARTICAO), 1)
+    passo = -(-tamanho // particoes) or 1
+    return [(inicio, min(inicio + passo, tamanho)) for inicio in range(0, tamanho, passo)]
+
+
+def particionar_datas(api, particoes):
+    """Filtros de /vendas por faixas de dias entre a primeira e a última venda
+    
+    A primeira faixa fica sem limite inferior e a última sem limite superior,
+    para que nenhuma venda fique de fora.
+    """
+    from livraria import ErroAPI
+    
+    datas = []
+    for ordem in ("asc", "desc"):
+        status, vendas = api._consultar("/vendas", {"_sort": "data", "_order": ordem, "_limit": 1})
+        if status != 200:
+            raise ErroAPI(status)
+        # Um servidor que ignore _limit manda todas: min/max resolvem do mesmo jeito
+        datas.extend(venda['data'] for venda in vendas)
+    if not datas:
+        return [{}]
+    primeiro = date.fromisoformat(min(datas)[:10])
+    dias = (date.fromisoformat(max(datas)[:10]) - primeiro).days + 1
+    passo = -(-dias // particoes)
+    faixas = []
+    for inicio in range(0, dias, passo):
+        params = {}
+        if inicio:
+            params["data_gte"] = (primeiro + timedelta(days=inicio)).isoformat()
+        if inicio + passo < dias:
+            params["data_lte"] = f"{primeiro + timedelta(days=inicio + passo - 1)} 23:59:59"
+        faixas.append(params)
+    return faixas
+
+
+def _origem(api):
+    """(url, sqlite) para os processos abrirem a própria conexão; None se não der"""
+    from backends import BackendJsonServer, BackendSQLite
+    
+    if api.replica is not None:
+        return None  # as vendas já estão na memória: um laço só, sem ir ao servidor
+    if isinstance(api.backend, BackendSQLite) and api.backend.caminho != ":memory:":
+        return None, api.backend.caminho
+    if isinstance(api.backend, BackendJsonServer):
+        return api.backend.base_url, None
+    return None
+
+
+# ==================== REDUCE ====================
+
+def juntar(parciais):
+    """Somar os parciais das partições num só"""
+    resultado = _parcial()
+    for parcial in parciais:
+        resultado["vendas"] += parcial["vendas"]
+        for grupo in ("livro", "cliente", "mes"):
+            destino = resultado[grupo]
+            for chave, (total, quantidade, vendas) in parcial[grupo].items():
+                acumulado = destino.get(chave)
+                if acumulado is None:
+                    destino[chave] = [total, quantidade, vendas]
+                else:
+                    acumulado[0] += total
+                    acumulado[1] += quantidade
+                    acumulado[2] += vendas
+        for livro_id, titulo in parcial["titulo"].items():
+            resultado["titulo"].setdefault(livro_id, titulo)
+    return resultado
+
+
+def somar_vendas(api, arquivo=None, processos=None):
+    """Somar todas as vendas, do servidor ou de um arquivo JSONL, em vários processos
+    
+    Com um processo (ou um backend que outro processo não consegue abrir,
+    ou uma réplica local) as partições são somadas aqui mesmo.
+    """
+    processos = processos or os.cpu_count() or 1
+    particoes = processos * PARTICOES_POR_PROCESSO
+    if arquivo:
+        tarefas = [(somar_arquivo, (arquivo, inicio, fim))
+                   for inicio, fim in particionar_arquivo(arquivo, particoes)]
+    else:
+        origem = _origem(api)
+        if processos == 1 or origem is None:
+            return somar(api.iterar_vendas(fluxo=True))
+        tarefas = [(somar_servidor, (origem, params)) for params in particionar_datas(api, particoes)]
+    
+    if processos == 1 or len(tarefas) < 2:
+        return juntar(funcao(*args) for funcao, args in tarefas)
+    from concurrent.futures import ProcessPoolExecutor
+    
+    with ProcessPoolExecutor(min(processos, len(tarefas))) as executor:
+        futuros = [executor.submit(funcao, *args) for funcao, args in tarefas]
+        # Na ordem das partições: o título de reserva fica o da venda mais antiga
+        return juntar(futuro.result() for futuro in futuros)
+
+
+# ==================== LINHAS DO RELATÓRIO ====================
+
+def linhas(parcial, agrupamento, livros=None):
+    """[{agrupamento: chave, total, quantidade, vendas}], do maior total ao menor (mês: em ordem)
+    
+    `livros` ({id: livro}) dá título e categoria atuais; livro fora do
+    catálogo fica com o título copiado na venda e sem categoria.
+    """
+    livros = livros or {}
+    if agrupamento == "livro":
+        titulos = {livro_id: livros[livro_id]['titulo'] if livro_id in livros else titulo
+                   for livro_id, titulo in parcial["titulo"].items()}
+        # Títulos repetidos levam o id, como no gráfico de vendas por livro
+        nomes = {livro_id: nome for nome, livro_id
+                 in por_titulo({i: (t, i) for i, t in titulos.items()}).items()}
+        grupos = {livro_id: (nomes[livro_id], valores) for livro_id, valores in parcial["livro"].items()}
+    elif agrupamento == "categoria":
+        somados = {}
+        for livro_id, valores in parcial["livro"].items():
+            categoria = livros[livro_id]['categoria'] if livro_id in livros else SEM_CATEGORIA
+            acumulado = somados.setdefault(categoria, [0.0, 0, 0])
+            for i, valor in enumerate(valores):
+                acumulado[i] += valor
+        grupos = {categoria: (categoria, valores) for categoria, valores in somados.items()}
+    elif agrupamento in ("cliente", "mes"):
+        grupos = {chave: (chave, valores) for chave, valores in parcial[agrupamento].items()}
+    else:
+        raise ValueError(f"agrupamento inválido: {agrupamento}")
+    
+    resultado = []
+    for chave, (nome, (total, quantidade, vendas)) in grupos.items():
+        linha = {"livro_id": chave} if agrupamento == "livro" else {}
+        linha.update({agrupamento: nome, "total": round(total, 2), "quantidade": quantidade,
+                      "vendas": vendas})
+        resultado.append(linha)
+    if agrupamento == "mes":
+        resultado.sort(key=lambda l: l["mes"])
+    else:
+        resultado.sort(key=lambda l: l["total"], reverse=True)
+    return resultado
+
+
+def gerar_relatorio(api, agrupamentos=AGRUPAMENTOS, arquivo=None, processos=None):
+    """{agrupamento: linhas} de todas as vendas, somadas em `processos` processos"""
+    parcial = somar_vendas(api, arquivo, processos)
+    livros = {}
+    if {"livro", "categoria"} & set(agrupamentos):
+        livros = api.livros_por_ids(list(parcial["livro"]))
+    return {agrupamento: linhas(parcial, agrupamento, livros) for agrupamento in agrupamentos}
@@ -0,0 +1,335 @@
+"""Formatação das listagens e gráficos da Livraria para o terminal
+
+A LivrariaAPI só entrega os registros; aqui eles viram texto. As linhas são
+acumuladas e escritas em blocos, em vez de um print por linha.
+"""
+import shutil
+import sys
+from collections import Counter
+
+from juncao import por_titulo, totais_por_livro
+
+BLOCO = 1000  # linhas acumuladas antes de cada escrita
+
+
+class Renderizador:
+    """Acumula linhas e escreve em blocos, com paginação opcional"""
+    
+    def __init__(self, saida=None, linhas_por_pagina=None, entrada=input):
+        self.saida = saida or sys.stdout
+        self.linhas_por_pagina = linhas_por_pagina
+        self.entrada = entrada
+        self.interrompido = False
+        self._linhas = []
+    
+    @classmethod
+    def terminal(cls):
+        """Paginado pela altura da janela quando a saída é um terminal interativo"""
+        if sys.stdout.isatty():
+            altura = shutil.get_terminal_size().lines
+            return cls(linhas_por_pagina=max(altura - 2, 5))
+        return cls()
+    
+    def linha(self, texto=""):
+        """Acrescentar uma linha; escreve quando o bloco ou a página enche"""
+        if self.interrompido:
+            return
+        self._linhas.append(texto)
+        if self.linhas_por_pagina and len(self._linhas) >= self.linhas_por_pagina:
+            self.descarregar()
+            resposta = self.entrada("-- ENTER para continuar, q para parar -- ")
+            self.interrompido = resposta.strip().lower() == "q"
+        elif len(self._linhas) >= BLOCO:
+            self.descarregar()
+    
+    def descarregar(self):
+        """Escrever de uma vez as linhas acumuladas"""
+        if self._linhas:
+            self.saida.write("\n".join(self._linhas) + "\n")
+            self._linhas.clear()
+        self.saida.flush()
+
+
+# ==================== TABELAS ====================
+
+def tabela_livros(livros, renderizador=None):
+    """Tabela de livros com estoque; retorna quantos foram exibidos"""
+    r = renderizador or Renderizador()
+    quantidade = 0
+    for livro in livros:
+        if quantidade == 0:
+            r.linha("\n" + "="*80)
+            r.linha(f"{'ID':<5} {'Título':<30} {'Autor':<20} {'Preço':<10} {'Estoque':<10}")
+            r.linha("="*80)
+        r.linha(f"{livro['id']:<5} {livro['titulo']:<30} {livro['autor']:<20} "
+                f"R${livro['preco']:<9.2f} {livro['estoque']:<10}")
+        quantidade += 1
+        if r.interrompido:
+            break
+    if quantidade:
+        r.linha("="*80)
+    else:
+        r.linha("Nenhum livro cadastrado.")
+    r.descarregar()
+    return quantidade
+
+
+def tabela_vendas(vendas, renderizador=None):
+    """Tabela do histórico de vendas; retorna quantas foram exibidas"""
+    r = renderizador or Renderizador()
+    quantidade = 0
+    for venda in vendas:
+        if quantidade == 0:
+            r.linha("\n" + "="*100)
+            r.linha(f"{'ID':<5} {'Livro':<30} {'Cliente':<20} {'Qtd':<6} {'Total':<12} {'Data':<20}")
+            r.linha("="*100)
+        r.linha(f"{venda['id']:<5} {venda['titulo_livro']:<30} {venda['cliente']:<20} "
+                f"{venda['quantidade']:<6} R${venda['total']:<11.2f} {venda['data']:<20}")
+        quantidade += 1
+        if r.interrompido:
+            break
+    if quantidade:
+        r.linha("="*100)
+    else:
+        r.linha("Nenhuma venda registrada.")
+    r.descarregar()
+    return quantidade
+
+
+def tabela_pesquisa(livros, renderizador=None):
+    """Resultado da pesquisa avançada, com a categoria no lugar do estoque
+    
+    Aceita lista ou gerador: as linhas saem conforme chegam e a contagem vem no fim.
+    """
+    r = renderizador or Renderizador()
+    quantidade = 0
+    for livro in livros:
+        if quantidade == 0:
+            r.linha("\n" + "="*80)
+            r.linha(f"{'ID':<5} {'Título':<30} {'Autor':<20} {'Preço':<10} {'Categoria'}")
+            r.linha("="*80)
+        r.linha(f"{livro['id']:<5} {livro['titulo']:<30} {livro['autor']:<20} "
+                f"R${livro['preco']:<9.2f} {livro['categoria']}")
+        quantidade += 1
+        if r.interrompido:
+            break
+    if quantidade:
+        r.linha("="*80)
+        r.linha(f"✓ Encontrados {quantidade} livro(s).")
+    else:
+        r.linha("✗ Nenhum livro encontrado com os critérios especificados.")
+    r.descarregar()
+    return quantidade
+
+
+# ==================== GRÁFICOS ====================
+
+def desenhar_grafico_categorias(livros, renderizador=None):
+    """Desenhar em ASCII a contagem de livros por categoria"""
+    r = renderizador or Renderizador()
+    if not livros:
+        r.linha("✗ Não há dados para gerar o gráfico.")
+        r.descarregar()
+        return
+    
+    desenhar_contagem_categorias(Counter(l['categoria'] for l in livros), r)
+
+
+def desenhar_contagem_categorias(contagem, renderizador=None):
+    """Desenhar o gráfico de categorias a partir da contagem pronta"""
+    r = renderizador or Renderizador()
+    if not contagem:
+        r.linha("✗ Não há dados para gerar o gráfico.")
+        r.descarregar()
+        return
+    
+    # Gráfico em ASCII
+    r.linha("\n" + "="*70)
+    r.linha("           GRÁFICO: LIVROS POR CATEGORIA")
+    r.linha("="*70 + "\n")
+    
+    # Encontrar valor máximo para escala
+    max_valor = max(contagem.values())
+    escala = 50  # largura máxima da barra
+    
+    for categoria, quantidade in sorted(contagem.items(), key=lambda x: x[1], reverse=True):
+        # Calcular tamanho da barra
+        barra_tamanho = int((quantidade / max_valor) * escala)
+        barra = "█" * barra_tamanho
+        
+        # Exibir categoria, barra e valor
+        r.linha(f"{categoria:<20} | {barra} {quantidade}")
+    
+    r.linha("\n" + "="*70)
+    r.linha(f"Total de livros: {sum(contagem.values())}")
+    r.linha(f"Total de categorias: {len(contagem)}")
+    r.linha("="*70)
+    r.descarregar()
+
+
+def desenhar_grafico_vendas(vendas, renderizador=None):
+    """Desenhar em ASCII o total vendido por livro"""
+    r = renderizador or Renderizador()
+    if not vendas:
+        r.linha("✗ Não há dados para gerar o gráfico.")
+        r.descarregar()
+        return
+    
+    # Agrupar por livro_id: o título copiado na venda pode ser de antes de uma renomeação
+    desenhar_totais_por_livro(por_titulo(totais_por_livro(vendas)), r)
+
+
+def desenhar_totais_por_livro(vendas_por_livro, renderizador=None):
+    """Desenhar o gráfico de vendas a partir dos totais por título"""
+    desenhar_totais(vendas_por_livro, "LIVRO", "Número de livros vendidos", renderizador)
+
+
+def desenhar_totais(totais, grupo, rotulo, renderizador=None, ordenar=True):
+    """Gráfico de barras do total vendido por grupo (livro, categoria, cliente, mês)"""
+    r = renderizador or Renderizador()
+    if not totais:
+        r.linha("✗ Não há dados para gerar o gráfico.")
+        r.descarregar()
+        return
+    
+    # Ordenar por valor (os meses ficam na ordem do calendário)
+    vendas_ordenadas = dict(sorted(totais.items(), key=lambda x: x[1], reverse=True)) if ordenar else totais
+    
+    # Gráfico em ASCII
+    r.linha("\n" + "="*80)
+    r.linha(f"              GRÁFICO: TOTAL DE VENDAS POR {grupo}")
+    r.linha("="*80 + "\n")
+    
+    # Encontrar valor máximo para escala
+    max_valor = max(vendas_ordenadas.values())
+    escala = 40  # largura máxima da barra
+    
+    for nome, total in vendas_ordenadas.items():
+        # Calcular tamanho da barra
+        barra_tamanho = int((total / max_valor) * escala)
+        barra = "█" * barra_tamanho
+        
+        # Truncar nome se muito longo
+        nome = nome[:30] + "..." if len(nome) > 30 else nome
+        
+        # Exibir nome, barra e valor
+        r.linha(f"{nome:<35} | {barra} R$ {total:,.2f}")
+    
+    r.linha("\n" + "="*80)
+    r.linha(f"Total de vendas: R$ {sum(vendas_ordenadas.values()):,.2f}")
+    r.linha(f"{rotulo}: {len(vendas_ordenadas)}")
+    r.linha("="*80)
+    r.descarregar()
+
+
+# Agrupamento do relatório -> (título do gráfico, rótulo da contagem)
+RELATORIOS = {
+    "livro": ("LIVRO", "Número de livros vendidos"),
+    "categoria": ("CATEGORIA", "Número de categorias"),
+    "cliente": ("CLIENTE", "Número de clientes"),
+    "mes": ("MÊS", "Número de meses"),
+}
+
+
+def desenhar_relatorio(linhas, agrupamento, renderizador=None):
+    """Desenhar as linhas de um relatório de vendas (relatorios.py) como gráfico"""
+    grupo, rotulo = RELATORIOS[agrupamento]
+    totais = {str(linha[agrupamento]): linha["total"] for linha in linhas}
+    desenhar_totais(totais, grupo, rotulo, renderizador, ordenar=agrupamento != "mes")
+
+
+# ==================== RELATÓRIOS ====================
+
+def tabela_mais_vendidos(linhas, dias, renderizador=None):
+    """Ranking de livros por valor vendido numa janela de dias"""
+    r = renderizador or Renderizador()
+    if not linhas:
+        r.linha(f"✗ Nenhuma venda nos últimos {dias} dias.")
+        r.descarregar()
+        return
+    
+    r.linha("\n" + "="*70)
+    r.linha(f"        MAIS VENDIDOS NOS ÚLTIMOS {dias} DIAS")
+    r.linha("="*70)
+    r.linha(f"{'#':<4} {'ID':<8} {'Título':<35} {'Total':>15}")
+    r.linha("-"*70)
+    for posicao, (livro_id, titulo, total) in enumerate(linhas, 1):
+        titulo = titulo[:32] + "..." if len(titulo) > 35 else titulo
+        r.linha(f"{posicao:<4} {livro_id:<8} {titulo:<35} R$ {total:>12,.2f}")
+    r.linha("="*70)
+    r.descarregar()
+
+
+def tabela_estoque_baixo(linhas, renderizador=None):
+    """Livros para repor, do menor estoque ao maior"""
+    r = renderizador or Renderizador()
+    if not linhas:
+        r.linha("✓ Nenhum livro com estoque no limite de reposição.")
+        r.descarregar()
+        return
+    
+    r.linha("\n" + "="*80)
+    r.linha("        ESTOQUE BAIXO: LIVROS PARA REPOR")
+    r.linha("="*80)
+    r.linha(f"{'ID':<8} {'Título':<35} {'Categoria':<15} {'Estoque':>8} {'Limite':>8}")
+    r.linha("-"*80)
+    for linha in linhas:
+        titulo = linha['titulo'] or ""
+        titulo = titulo[:32] + "..." if len(titulo) > 35 else titulo
+        categoria = (linha['categoria'] or "")[:15]
+        r.linha(f"{linha['livro_id']:<8} {titulo:<35} {categoria:<15} "
+                f"{linha['estoque']:>8} {linha['limite']:>8}")
+    r.linha("="*80)
+    r.descarregar()
+
+
+def tabela_top_unidades(linhas, dias, renderizador=None):
+    """Ranking de livros por unidades vendidas numa janela de dias (None: desde sempre)"""
+    r = renderizador or Renderizador()
+    periodo = f"NOS ÚLTIMOS {dias} DIAS" if dias else "DESDE O INÍCIO"
+    if not linhas:
+        r.linha(f"✗ Nenhuma venda {periodo.lower()}.")
+        r.descarregar()
+        return
+    
+    r.linha("\n" + "="*70)
+    r.linha(f"        MAIS VENDIDOS EM UNIDADES {periodo}")
+    r.linha("="*70)
+    r.linha(f"{'#':<4} {'ID':<8} {'Título':<35} {'Unidades':>15}")
+    r.linha("-"*70)
+    for posicao, linha in enumerate(linhas, 1):
+        titulo = linha['titulo'] or ""
+        titulo = titulo[:32] + "..." if len(titulo) > 35 else titulo
+        r.linha(f"{posicao:<4} {linha['livro_id']:<8} {titulo:<35} {linha['unidades']:>15}")
+    r.linha("="*70)
+    r.descarregar()
+
+
+def tabela_metricas(linhas, renderizador=None):
+    """Latência e volume das requisições por método e rota"""
+    r = renderizador or Renderizador()
+    if not linhas:
+        r.linha("✗ Nenhuma requisição registrada.")
+        r.descarregar()
+        return
+    
+    r.linha("\n" + "="*100)
+    r.linha("                         ESTATÍSTICAS DAS REQUISIÇÕES")
+    r.linha("="*100)
+    r.linha(f"{'Método':<7} {'Rota':<16} {'Qtd':>7} {'Erros':>7} {'p50 ms':>9} {'p95 ms':>9} "
+            f"{'p99 ms':>9} {'Máx ms':>9} {'Enviado':>10} {'Recebido':>11}")
+    r.linha("-"*100)
+    for l in linhas:
+        r.linha(f"{l['metodo']:<7} {l['rota']:<16} {l['requisicoes']:>7} {l['taxa_erros']:>7.1%} "
+                f"{l['p50_ms']:>9.2f} {l['p95_ms']:>9.2f} {l['p99_ms']:>9.2f} {l['max_ms']:>9.2f} "
+                f"{_tamanho(l['bytes_enviados']):>10} {_tamanho(l['bytes_recebidos']):>11}")
+    r.linha("="*100)
+    r.descarregar()
+
+
+def _tamanho(quantidade):
+    for unidade in ("B", "KB", "MB"):
+        if quantidade < 1024:
+            return f"{quantidade:.0f} {unidade}"
+        quantidade /= 1024
+    return f"{quantidade:.1f} GB"
@@ -0,0 +1,220 @@
+"""Réplica local de livros e vendas, atualizada só com o que mudou
+
+Toda escrita feita pela LivrariaAPI carimba o registro com atualizado_em, e
+toda remoção deixa um registro em /remocoes. A réplica guarda o carimbo mais
+recente já visto (o cursor) e, a cada sincronização, pede só os livros,
+vendas e remoções com atualizado_em a partir dele, em vez das coleções
+inteiras. As escritas da própria LivrariaAPI chegam pelos avisos de registro
+salvo/removido, sem esperar a próxima sincronização; as dos outros clientes,
+trazidas pela sincronização, são repassadas com os mesmos avisos aos demais
+observadores (índice, agregados, listas vigiadas).
+
+Os carimbos vêm do relógio de cada cliente: o cursor recua JANELA segundos
+para pegar escritas que chegaram ao servidor fora de ordem ou de relógios um
+pouco atrasados. Registros gravados por clientes antigos (sem carimbo) só
+entram com reconstruir().
+"""
+import json
+import os
+import threading
+import time
+
+from fluxo import PEDACO, registros
+
+ARQUIVO_REPLICA = ".livraria_replica.json"
+COLECOES = ("livros", "vendas")
+INTERVALO = 1.0  # segundos entre sincronizações pedidas pelas leituras
+JANELA = 60.0    # segundos que o cursor recua a cada sincronização
+
+
+def _carimbo(registro):
+    return registro.get("atualizado_em") or 0
+
+
+class Replica:
+    """Cópia local das coleções, mantida por diferença a partir de um cursor"""
+    
+    def __init__(self, caminho=ARQUIVO_REPLICA, intervalo=INTERVALO, janela=JANELA):
+        self.caminho = caminho
+        self.intervalo = intervalo
+        self.janela = janela
+        self._trava = threading.RLock()
+        self._ultima = 0.0  # time.monotonic() da última sincronização
+        self.sincronizada_em = None  # time.time() da última sincronização, gravado no arquivo
+        self.alterada = False  # algo a gravar desde o último salvar()
+        self.versao = 0  # conta as mudanças, gravada no arquivo (listas salvas conferem por ela)
+        self.bytes_recebidos = 0
+        self.sincronizacoes = 0
+        self._zerar()
+        if caminho and os.path.exists(caminho):
+            self._carregar()
+    
+    def _zerar(self):
+        self.dados = {colecao: {} for colecao in COLECOES}  # colecao -> {id: registro}
+        self.cursor = None  # carimbo mais recente visto no servidor
+        self.carregada = False
+    
+    # ==================== PERSISTÊNCIA ====================
+    
+    def _carregar(self):
+        with open(self.caminho, encoding="utf-8") as f:
+            dados = json.load(f)
+        for colecao in COLECOES:
+            self.dados[colecao] = {str(r['id']): r for r in dados[colecao]}
+        self.cursor = dados["cursor"]
+        self.carregada = dados["carregada"]
+        self.sincronizada_em = dados.get("sincronizada_em")
+        self.versao = dados.get("versao", 0)
+        if self.sincronizada_em:
+            # O intervalo entre sincronizações vale também de um processo para o outro
+            self._ultima = time.monotonic() - max(time.time() - self.sincronizada_em, 0)
+    
+    def salvar(self):
+        """Gravar a réplica e o cursor no arquivo local"""
+        if not self.caminho or not self.carregada or not self.alterada:
+            return
+        with self._trava:
+            dados = {colecao: list(self.dados[colecao].values()) for colecao in COLECOES}
+            dados.update(cursor=self.cursor, carregada=self.carregada,
+                         sincronizada_em=self.sincronizada_em, versao=self.versao)
+            temporario = self.caminho + ".tmp"
+            with open(temporario, "w", encoding="utf-8") as f:
+                json.dump(dados, f, ensure_ascii=False)
+            os.replace(temporario, self.caminho)
+            self.alterada = False
+    
+    # ==================== SINCRONIZAÇÃO ====================
+    
+    def _baixar(self, api, colecao, params=None):
+        """Registros de uma consulta direto do servidor, contando os bytes"""
+        from livraria import ErroAPI
+        
+        response = api._requisicao("GET", f"/{colecao}", params=params, stream=True)
+        try:
+            if response.status_code == 404 and colecao == "remocoes":
+                return []  # servidor sem /remocoes: remoções só com reconstruir()
+            if response.status_code != 200:
+                raise ErroAPI(response.status_code)
+            
+            def contar(pedacos):
+                for pedaco in pedacos:
+                    self.bytes_recebidos += len(pedaco)
+                    yield pedaco
+            return list(registros(contar(response.iter_content(PEDACO))))
+        finally:
+            response.close()
+    
+    def _avancar(self, registro):
+        # Um relógio adiantado não pode levar o cursor para o futuro
+        carimbo = min(_carimbo(registro), time.time())
+        if carimbo and (self.cursor is None or carimbo > self.cursor):
+            self.cursor = carimbo
+    
+    def _aplicar(self, colecao, registro):
+        """Guardar o registro, a menos que a réplica já tenha uma versão mais nova"""
+        chave = str(registro['id'])
+        atual = self.dados[colecao].get(chave)
+        if atual == registro or (atual is not None and _carimbo(atual) > _carimbo(registro)):
+            return False  # igual ao que já está (a janela traz de novo) ou mais antigo
+        self.dados[colecao][chave] = registro
+        return True
+    
+    def _aplicar_remocao(self, remocao):
+        """Apagar o registro, se ele não foi gravado de novo depois da remoção; retorna o apagado"""
+        colecao = self.dados.get(remocao.get('colecao'))
+        if colecao is None:
+            return None
+        chave = str(remocao['registro_id'])
+        atual = colecao.get(chave)
+        if atual is None or _carimbo(atual) > _carimbo(remocao):
+            return None
+        return colecao.pop(chave)
+    
+    def sincronizar(self, api, forcar=False):
+        """Trazer do servidor o que mudou desde o cursor; retorna quantas mudanças entraram
+        
+        Sem forcar, não repete a sincronização antes de `intervalo` segundos.
+        Cada mudança é avisada aos outros observadores da LivrariaAPI.
+        """
+        with self._trava:
+            if not forcar and time.monotonic() - self._ultima < self.intervalo:
+                return 0
+            if not self.carregada:
+                return self.reconstruir(api)
+            
+            params = {"atualizado_em_gte": self.cursor - self.janela} if self.cursor else None
+            avisos = []
+            for colecao in COLECOES:
+                for registro in self._baixar(api, colecao, params):
+                    anterior = self.dados[colecao].get(str(registro['id']))
+                    if self._aplicar(colecao, registro):
+                        avisos.append(("registro_salvo", colecao, registro, anterior))
+                    self._avancar(registro)
+            for remocao in self._baixar(api, "remocoes", params):
+                anterior = self._aplicar_remocao(remocao)
+                if anterior is not None:
+                    avisos.append(("registro_removido", remocao['colecao'],
+                                   remocao['registro_id'], anterior))
+                self._avancar(remocao)
+            self._marcar_sincronizacao()
+        # Fora da trava: os observadores têm travas próprias e podem ler a réplica
+        for aviso in avisos:
+            api._notificar(*aviso, exceto=self)
+        return len(avisos)
+    
+    def _marcar_sincronizacao(self):
+        self._ultima = time.monotonic()
+        self.sincronizada_em = time.time()
+        self.sincronizacoes += 1
+        self._mudar()
+    
+    def _mudar(self):
+        self.versao += 1
+        self.alterada = True
+    
+    def reconstruir(self, api):
+        """Descartar a réplica e copiar as coleções inteiras; retorna quantos registros vieram"""
+        with self._trava:
+            inicio = time.time()
+            self._zerar()
+            for colecao in COLECOES:
+                for registro in self._baixar(api, colecao):
+                    self.dados[colecao][str(registro['id'])] = registro
+                    self._avancar(registro)
+            # Remoções antigas não interessam, mas o cursor também anda por elas
+            for remocao in self._baixar(api, "remocoes",
+                                        {"atualizado_em_gte": (self.cursor or inicio) - self.janela}):
+                self._aplicar_remocao(remocao)
+                self._avancar(remocao)
+            if self.cursor is None:
+                self.cursor = inicio  # nada carimbado ainda: vale a partir de agora
+            self.carregada = True
+            self._marcar_sincronizacao()
+            return sum(len(self.dados[colecao]) for colecao in COLECOES)
+    
+    # ==================== CONSULTAS ====================
+    
+    def listar(self, colecao):
+        """Lista (cópia rasa) dos registros da coleção, na ordem em que entraram"""
+        with self._trava:
+            return list(self.dados[colecao].values())
+    
+    def obter(self, colecao, item_id):
+        """Cópia do registro, ou None se a réplica não o tem"""
+        with self._trava:
+            registro = self.dados[colecao].get(str(item_id))
+            return dict(registro) if registro is not None else None
+    
+    # ==================== AVISOS DA LIVRARIAAPI ====================
+    
+    def registro_salvo(self, colecao, registro, anterior=None):
+        if colecao in self.dados and self.carregada:
+            with self._trava:
+                self._aplicar(colecao, registro)
+                self._mudar()
+    
+    def registro_removido(self, colecao, item_id, anterior=None):
+        if colecao in self.dados:
+            with self._trava:
+                self.dados[colecao].pop(str(item_id), None)
+                self._mudar()
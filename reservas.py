@@ -0,0 +1,318 @@
+"""Reserva de estoque em memória e gravação das vendas em segundo plano
+
+Em horário de pico, cada venda síncrona faz várias escritas HTTP enquanto o
+caixa espera (ler o livro, gravar a venda, baixar o estoque). Com a
+FilaVendas, a venda é conferida contra o estoque guardado em memória,
+anotada num diário local e confirmada na hora; uma thread grava as vendas
+em lotes e baixa o estoque de cada livro com um único PATCH por lote.
+
+O diário (um JSON por linha, só acrescentado) garante que nada se perde: ao
+abrir de novo, as vendas que não chegaram ao servidor são gravadas (a chave
+de cada venda evita gravá-la duas vezes) e os estoques que faltam são
+baixados.
+
+O estoque em memória vem do servidor na primeira venda de cada livro e é
+corrigido a cada baixa; vendas de outros clientes só aparecem aí. Se o
+servidor não tiver estoque para o lote, as vendas já confirmadas ficam: o
+estoque vai a zero e a diferença fica anotada em `faltas`.
+"""
+import json
+import os
+import threading
+import uuid
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+ARQUIVO_DIARIO = ".livraria_vendas.jsonl"
+LOTE = 200          # vendas gravadas por rodada
+INTERVALO = 0.05    # segundos de espera por um lote cheio
+TRABALHADORES = 8   # POSTs de vendas em paralelo
+COMPACTAR = 100000  # linhas do diário antes de reescrevê-lo só com o pendente
+CONFERIR = 100      # chaves por consulta ao conferir as vendas do diário
+
+
+class DiarioVendas:
+    """Arquivo JSONL só acrescentado com as vendas reservadas e o que já foi gravado"""
+    
+    def __init__(self, caminho=ARQUIVO_DIARIO, fsync=False):
+        self.caminho = caminho
+        self.fsync = fsync  # também resistir a queda de energia, não só do processo
+        self.linhas = 0
+        self._arquivo = None
+    
+    def ler(self):
+        """Vendas ainda pendentes: {chave: {"venda": ..., "id": id ou None}}"""
+        pendentes, baixadas = {}, set()
+        if not os.path.exists(self.caminho):
+            return pendentes
+        with open(self.caminho, encoding="utf-8") as f:
+            for texto in f:
+                try:
+                    entrada = json.loads(texto)
+                except ValueError:
+                    continue  # linha cortada por uma queda no meio da escrita
+                self.linhas += 1
+                if "venda" in entrada:
+                    pendentes[entrada["venda"]["chave"]] = {"venda": entrada["venda"], "id": None}
+                elif "gravada" in entrada and entrada["gravada"] in pendentes:
+                    pendentes[entrada["gravada"]]["id"] = entrada["id"]
+                elif "baixadas" in entrada:
+                    baixadas.update(entrada["baixadas"])
+        return {chave: item for chave, item in pendentes.items() if chave not in baixadas}
+    
+    def anotar(self, *entradas):
+        if self._arquivo is None:
+            self._arquivo = open(self.caminho, "a", encoding="utf-8")
+        self._arquivo.write("".join(json.dumps(e, ensure_ascii=False) + "\n" for e in entradas))
+        self._arquivo.flush()
+        if self.fsync:
+            os.fsync(self._arquivo.fileno())
+        self.linhas += len(entradas)
+    
+    def reescrever(self, pendentes):
+        """Trocar o diário por um só com as vendas pendentes"""
+        self.fechar()
+        temporario = self.caminho + ".tmp"
+        with open(temporario, "w", encoding="utf-8") as f:
+            for chave, item in pendentes.items():
+                f.write(json.dumps({"venda": item["venda"]}, ensure_ascii=False) + "\n")
+                if item["id"] is not None:
+                    f.write(json.dumps({"gravada": chave, "id": item["id"]}) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temporario, self.caminho)
+        self.linhas = sum(1 + (item["id"] is not None) for item in pendentes.values())
+    
+    def fechar(self):
+        if self._arquivo is not None:
+            self._arquivo.close()
+            self._arquivo = None
+
+
+class FilaVendas:
+    """Reserva de estoque por livro em memória, com as vendas gravadas em lotes"""
+    
+    def __init__(self, diario=None, lote=LOTE, intervalo=INTERVALO, trabalhadores=TRABALHADORES):
+        self.diario = diario if diario is not None else DiarioVendas()
+        self.lote = lote
+        self.intervalo = intervalo
+        self.trabalhadores = trabalhadores
+        self.api = None
+        self._trava = threading.RLock()
+        self._condicao = threading.Condition(self._trava)
+        self._trava_gravacao = threading.Lock()  # uma rodada de gravação por vez
+        self._livros = {}            # livro_id -> registro usado nas vendas
+        self._disponivel = {}        # livro_id -> estoque ainda não reservado
+        self._reservado = Counter()  # livro_id -> unidades vendidas, estoque ainda não baixado
+        self._pendentes = {}         # chave -> {"venda": ..., "id": id ou None}, em ordem
+        self._conferir = set()       # chaves do diário ou de POST com erro: podem já estar no servidor
+        self._parar = False
+        self._thread = None
+        self.faltas = []             # (livro_id, unidades vendidas sem estoque no servidor)
+        self.ultimo_erro = None
+    
+    def iniciar(self, api):
+        """Retomar o diário e começar a gravar em segundo plano pela api"""
+        self.api = api
+        with self._trava:
+            self._pendentes = self.diario.ler()
+            self._conferir = set(self._pendentes)
+            for item in self._pendentes.values():
+                self._reservado[str(item["venda"]["livro_id"])] += item["venda"]["quantidade"]
+        self._thread = threading.Thread(target=self._trabalhar, name="fila-vendas", daemon=True)
+        self._thread.start()
+    
+    @property
+    def pendentes(self):
+        """Vendas confirmadas ainda não gravadas (ou com estoque não baixado)"""
+        return len(self._pendentes)
+    
+    # ==================== RESERVA ====================
+    
+    def _livro(self, chave):
+        if chave not in self._livros:
+            # Leitura direta do servidor, fora da trava: as outras reservas seguem
+            livro, _ = self.api._ler_para_alterar("livros", chave)
+            with self._trava:
+                if chave not in self._livros:
+                    self._livros[chave] = livro
+                    self._disponivel[chave] = livro['estoque'] - self._reservado[chave]
+        return self._livros[chave]
+    
+    def reservar(self, livro_id, quantidade, cliente, data=None):
+        """Conferir e reservar o estoque, anotar a venda no diário e devolvê-la (ainda sem id)"""
+        from livraria import EstoqueInsuficiente, RegistroNaoEncontrado, nova_venda
+        
+        chave = str(livro_id)
+        self._livro(chave)
+        with self._condicao:
+            if chave not in self._livros:
+                raise RegistroNaoEncontrado()  # removido enquanto era lido
+            disponivel = self._disponivel[chave]
+            if disponivel < quantidade:
+                raise EstoqueInsuficiente(max(disponivel, 0))
+            venda = nova_venda(livro_id, self._livros[chave], quantidade, cliente, data)
+            venda["chave"] = uuid.uuid4().hex
+            self.diario.anotar({"venda": venda})
+            self._disponivel[chave] = disponivel - quantidade
+            self._reservado[chave] += quantidade
+            self._pendentes[venda["chave"]] = {"venda": venda, "id": None}
+            if len(self._pendentes) >= self.lote:
+                self._condicao.notify()
+        return venda
+    
+    # ==================== GRAVAÇÃO ====================
+    
+    def _ja_gravadas(self, chaves):
+        """Vendas que já chegaram ao servidor antes da queda ou do erro: {chave: venda}"""
+        from livraria import ErroAPI
+        
+        encontradas = {}
+        for inicio in range(0, len(chaves), CONFERIR):
+            response = self.api._requisicao("GET", "/vendas", params={"chave": chaves[inicio:inicio + CONFERIR]})
+            if response.status_code != 200:
+                raise ErroAPI(response.status_code)
+            encontradas.update((venda["chave"], venda) for venda in response.json())
+        return encontradas
+    
+    def _gravar_venda(self, venda):
+        from livraria import ErroAPI
+        
+        response = self.api._requisicao("POST", "/vendas", json=venda)
+        if response.status_code != 201:
+            raise ErroAPI(response.status_code)
+        return response.json()
+    
+    def _baixar_estoque(self, livro_id, unidades):
+        """Um PATCH com a soma do lote; sem estoque no servidor, zera e anota a falta"""
+        from livraria import EstoqueInsuficiente, RegistroNaoEncontrado
+        
+        def liberar(novo):
+            # Antes do aviso de registro salvo, que recalcula o disponível
+            with self._trava:
+                self._reservado[livro_id] -= unidades
+                if novo is None and livro_id in self._livros:
+                    self._disponivel[livro_id] = -self._reservado[livro_id]
+        
+        baixar = unidades
+        try:
+            while baixar:
+                try:
+                    self.api._ajustar_estoque(livro_id, -baixar, ao_gravar=liberar)
+                    break
+                except EstoqueInsuficiente as e:
+                    baixar = e.disponivel  # outro cliente vendeu antes: baixar o que resta
+        except RegistroNaoEncontrado:
+            baixar = 0  # livro removido: não há estoque a baixar
+            with self._trava:
+                self._livros.pop(livro_id, None)
+        if baixar == 0:
+            liberar(None)
+        if baixar < unidades:
+            self.faltas.append((livro_id, unidades - baixar))
+    
+    def gravar(self):
+        """Gravar um lote: POST das vendas e um PATCH de estoque por livro; retorna quantas concluíram"""
+        with self._trava_gravacao, ThreadPoolExecutor(self.trabalhadores) as executor:
+            with self._trava:
+                lote = list(self._pendentes.items())[:self.lote]
+            if not lote:
+                return 0
+            
+            a_gravar = [(chave, item) for chave, item in lote if item["id"] is None]
+            conferir = [chave for chave, _ in a_gravar if chave in self._conferir]
+            ja_gravadas = self._ja_gravadas(conferir) if conferir else {}
+            futuros = [executor.submit(self._gravar_venda, item["venda"])
+                       for chave, item in a_gravar if chave not in ja_gravadas]
+            futuros = iter(futuros)
+            gravadas = []
+            for chave, item in a_gravar:
+                venda = ja_gravadas.get(chave)
+                if venda is None:
+                    try:
+                        venda = next(futuros).result()
+                    except Exception as e:
+                        self.ultimo_erro = e
+                        # O POST pode ter chegado ao servidor e só a resposta se perdido
+                        with self._trava:
+                            self._conferir.add(chave)
+                        continue
+                    self.api._registrar_escrita("vendas", registro=venda)
+                item["id"] = venda["id"]
+                gravadas.append({"gravada": chave, "id": venda["id"]})
+            if gravadas:
+                with self._trava:
+                    self.diario.anotar(*gravadas)
+            
+            # Estoque só das vendas já gravadas, somado por livro (livros em paralelo)
+            prontas = [(chave, item) for chave, item in lote if item["id"] is not None]
+            por_livro = Counter()
+            for _, item in prontas:
+                por_livro[str(item["venda"]["livro_id"])] += item["venda"]["quantidade"]
+            baixas = {livro_id: executor.submit(self._baixar_estoque, livro_id, unidades)
+                      for livro_id, unidades in por_livro.items()}
+            for livro_id, futuro in baixas.items():
+                try:
+                    futuro.result()
+                except Exception as e:
+                    self.ultimo_erro = e
+                    prontas = [(c, i) for c, i in prontas if str(i["venda"]["livro_id"]) != livro_id]
+            
+            with self._trava:
+                if prontas:
+                    self.diario.anotar({"baixadas": [chave for chave, _ in prontas]})
+                for chave, _ in prontas:
+                    del self._pendentes[chave]
+                    self._conferir.discard(chave)
+                if not self._pendentes:
+                    self.diario.reescrever({})
+                elif self.diario.linhas > COMPACTAR:
+                    self.diario.reescrever(self._pendentes)
+            return len(prontas)
+    
+    def _trabalhar(self):
+        while True:
+            with self._condicao:
+                if not self._parar and len(self._pendentes) < self.lote:
+                    self._condicao.wait(self.intervalo)
+                if self._parar:
+                    return
+            try:
+                while self.gravar() >= self.lote:
+                    pass
+            except Exception as e:
+                self.ultimo_erro = e
+    
+    def esvaziar(self):
+        """Gravar tudo o que está pendente agora; retorna quantas vendas ficaram pendentes"""
+        while self._pendentes and self.gravar():
+            pass
+        return len(self._pendentes)
+    
+    def fechar(self):
+        """Parar a thread, gravar o que der e fechar o diário (o resto fica para a próxima vez)"""
+        with self._condicao:
+            self._parar = True
+            self._condicao.notify()
+        if self._thread is not None:
+            self._thread.join()
+        if self.api is not None:
+            try:
+                self.esvaziar()
+            except Exception as e:
+                self.ultimo_erro = e
+        self.diario.fechar()
+    
+    # ==================== AVISOS DA LIVRARIAAPI ====================
+    
+    def registro_salvo(self, colecao, registro, anterior=None):
+        if colecao == "livros" and str(registro['id']) in self._livros:
+            with self._trava:
+                chave = str(registro['id'])
+                self._livros[chave] = registro
+                self._disponivel[chave] = registro['estoque'] - self._reservado[chave]
+    
+    def registro_removido(self, colecao, item_id, anterior=None):
+        if colecao == "livros":
+            with self._trava:
+                self._livros.pop(str(item_id), None)